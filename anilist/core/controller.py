@@ -1,45 +1,92 @@
-import inspect
+import json
 import logging
+import os
+from threading import local
 
 from typing import Optional, Dict, List
-from graphql.language.ast import Document
 
+from graphql import DocumentNode, build_ast_schema, parse
 from gql import Client, gql
 from gql.transport.requests import RequestsHTTPTransport
 
-from app import StorageUtil, EventLogHelper
-from ..data import AniListStore, AniListModelHelper, MediaEntry
+from app import StorageUtil, EventLogHelper, Resilience
+from ..data import AniListStore, AniListModelHelper
+from .query import MediaCollectionQuery
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'schema.graphql')
 
 
 class AniListController:
     __request_url = 'https://graphql.anilist.co'
+    __host = 'graphql.anilist.co'
 
-    def __init__(self) -> None:
+    def __init__(self, resilience: Optional[Resilience] = None) -> None:
         super().__init__()
         self.model_helper: AniListModelHelper = AniListModelHelper()
-        transport = RequestsHTTPTransport(url=self.__request_url)
-        self.client = Client(retries=3, transport=transport, fetch_schema_from_transport=True)
+        self.resilience: Resilience = resilience if resilience is not None else Resilience()
+        # the schema is built from the vendored copy instead of an introspection request on every start
+        self.schema = self.__load_schema()
+        self.__clients = local()
 
     @staticmethod
-    def __create_request() -> Document:
-        contents = StorageUtil.read_file('query', 'media_collection.graphql')
-        return gql(contents)
+    def __load_schema():
+        with open(SCHEMA_PATH, 'r', encoding='utf-8') as reader:
+            return build_ast_schema(parse(reader.read()))
+
+    @property
+    def client(self) -> Client:
+        """
+        A gql client can not execute more than one request at a time, so every thread which fetches a list
+        gets its own client and transport, the schema is shared between them
+        :return: client of the calling thread
+        """
+        client: Optional[Client] = getattr(self.__clients, 'client', None)
+        if client is None:
+            transport = RequestsHTTPTransport(url=self.__request_url)
+            # retries are handled by the shared resilience layer so that rate limit headers are respected
+            client = Client(schema=self.schema, transport=transport, retries=0)
+            self.__clients.client = client
+        return client
 
-    def make_request(self, anilist_store: AniListStore):
+    @staticmethod
+    def __create_request() -> DocumentNode:
+        return gql(MediaCollectionQuery.build())
+
+    def make_request(
+            self,
+            anilist_store: AniListStore,
+            statuses: Optional[List[str]] = None,
+            variables: Optional[Dict] = None
+    ):
+        """
+        Fetches the media list collection and stores it
+        :param anilist_store: store to ingest the entries into
+        :param statuses: list statuses to fetch, replaces `statusIn` from anilist.json when given
+        :param variables: query variables of the user to fetch, read from anilist.json when None
+        """
         request = self.__create_request()
-        params = StorageUtil.read_file('config', 'anilist.json')
-        response = self.client.execute(request, variable_values=params)
-        self.__handle_response(response["MediaListCollection"]["lists"], anilist_store)
+        params: Dict = dict(variables) if variables is not None \
+            else json.loads(StorageUtil.read_file('config', 'anilist.json'))
+        if statuses:
+            params['statusIn'] = statuses
+        response = self.resilience.call(self.__host, self.client.execute, request, variable_values=params)
+        self.__handle_response(response["MediaListCollection"]["lists"], anilist_store, params.get('statusIn'))
 
-    def __handle_response(self, media_collection_list: Optional[List[Dict]], anilist_store: AniListStore):
+    def __handle_response(
+            self,
+            media_collection_list: Optional[List[Dict]],
+            anilist_store: AniListStore,
+            statuses: Optional[List[str]]
+    ):
         try:
-            for item in media_collection_list:
-                for entry in item['entries']:
-                    anilist_store.save_or_update(entry)
+            entries: List[Dict] = [entry for item in media_collection_list for entry in item['entries']]
+            ingest_result = anilist_store.bulk_ingest(entries, statuses)
+            EventLogHelper.log_info(
+                "Stored media list collection of %s entries -> %s", args=(len(entries), ingest_result)
+            )
         except Exception as e:
             EventLogHelper.log_error(
-                f"Error handling response -> {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
+                "Error handling response -> %s",
+                log_level=logging.CRITICAL,
+                args=(e,)
             )
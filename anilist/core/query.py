@@ -0,0 +1,69 @@
+from dataclasses import fields, is_dataclass
+from typing import Any, Dict, List, Optional, Union
+
+from ..data import MediaEntry
+
+FieldTree = Dict[str, Optional['FieldTree']]
+
+
+class MediaCollectionQuery:
+    """
+    Builds the media list collection query from the fields of the data classes which consume the response,
+    anything which is not read by `MediaEntry` is never requested from anilist
+    """
+    __variables = '$userId: Int, $userName: String, $type: MediaType, $forceSingleCompletedList: Boolean, ' \
+                  '$sort: [MediaListSort], $statusIn: [MediaListStatus], $scoreFormat: ScoreFormat = POINT_100'
+    __arguments = 'userId: $userId, userName: $userName, type: $type, ' \
+                  'forceSingleCompletedList: $forceSingleCompletedList, sort: $sort, status_in: $statusIn'
+    __field_arguments = {
+        'score': '(format: $scoreFormat)'
+    }
+
+    @staticmethod
+    def __unwrap(field_type: Any) -> Any:
+        """
+        Resolves the class behind Optional[...] and List[...] annotations
+        """
+        while getattr(field_type, '__origin__', None) in (Union, list, List):
+            field_type = next(argument for argument in field_type.__args__ if argument is not type(None))
+        return field_type
+
+    @staticmethod
+    def field_tree(data_class: Any = MediaEntry) -> FieldTree:
+        """
+        Maps each field of the data class to the fields of its nested data class, or None for scalars
+        :param data_class: the data class to walk
+        :return: nested dictionary of field names
+        """
+        tree: FieldTree = dict()
+        for data_field in fields(data_class):
+            field_type = MediaCollectionQuery.__unwrap(data_field.type)
+            tree[data_field.name] = MediaCollectionQuery.field_tree(field_type) if is_dataclass(field_type) else None
+        return tree
+
+    @staticmethod
+    def __selection_of(tree: FieldTree, depth: int) -> str:
+        indent = '  ' * depth
+        lines: List[str] = list()
+        for name, children in tree.items():
+            line = f"{indent}{name}{MediaCollectionQuery.__field_arguments.get(name, '')}"
+            if children is not None:
+                line = f"{line} {{\n{MediaCollectionQuery.__selection_of(children, depth + 1)}\n{indent}}}"
+            lines.append(line)
+        return '\n'.join(lines)
+
+    @staticmethod
+    def build() -> str:
+        """
+        :return: query text for the media list collection of a user
+        """
+        entries = MediaCollectionQuery.__selection_of(MediaCollectionQuery.field_tree(), 4)
+        return f"query MediaListCollection({MediaCollectionQuery.__variables}) {{\n" \
+               f"  MediaListCollection({MediaCollectionQuery.__arguments}) {{\n" \
+               f"    lists {{\n" \
+               f"      entries {{\n" \
+               f"{entries}\n" \
+               f"      }}\n" \
+               f"    }}\n" \
+               f"  }}\n" \
+               f"}}\n"
@@ -1,2 +1,2 @@
 from .database import AniListStore
-from .model import MediaTitle, MediaEntry, AiringSchedule, AniListModelHelper
+from .model import MediaTitle, MediaEntry, AiringSchedule, AniListModelHelper, IngestResult
@@ -1,58 +1,88 @@
-import inspect
 import logging
 
 from typing import Optional, List, Dict, Any
-from tinydb import TinyDB, Query, where
-from tinydb.database import Document, Table
+from tinydb import Query
 
-from app import EventLogHelper, StorageUtil
-from .model import MediaEntry, AniListModelHelper
+from app import EventLogHelper
+from app.util import DocumentStorage, create_document_storage, TINYDB_BACKEND
+from .model import MediaEntry, AniListModelHelper, IngestResult
 
-ANILIST_DATABASE = 'database/anilist.db'
+ANILIST_DATABASE = 'database/anilist'
 
 
 class AniListStore:
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            backend: str = TINYDB_BACKEND,
+            storage: Optional[DocumentStorage] = None,
+            database_name: str = ANILIST_DATABASE
+    ) -> None:
         super().__init__()
-        src = StorageUtil.create_base_path(ANILIST_DATABASE)
         self.model_helper = AniListModelHelper()
-        self.db: Table = TinyDB(src)
+        self.storage: DocumentStorage = storage if storage is not None else create_document_storage(
+            backend, database_name, 'id', ['id', 'mediaId', 'status']
+        )
 
     def save_or_update(self, value: Optional[Dict]):
-        result_ids: List[Any] = self.db.upsert(value, where('id') == value['id'])
-        if result_ids.__len__() < 1:
-            EventLogHelper.log_error(f"Error objects to {ANILIST_DATABASE}",
-                                     self.__class__.__name__,
-                                     inspect.currentframe().f_code.co_name,
-                                     logging.CRITICAL)
+        if not self.storage.upsert(value):
+            EventLogHelper.log_error("Error objects to %s",
+                                     log_level=logging.CRITICAL,
+                                     args=(ANILIST_DATABASE,))
 
-    def search(self, query: Query) -> List[Optional[MediaEntry]]:
+    def bulk_ingest(self, entries: List[Dict], statuses: Optional[List[str]] = None) -> IngestResult:
+        """
+        Diffs the fetched media list entries against the stored entries in memory and applies all inserts,
+        updates and deletions with a single write
+        :param entries: every media list entry returned by anilist
+        :param statuses: list statuses which were requested, stored entries with one of these statuses which
+        are no longer returned are removed, when None every stored entry is considered
+        :return: counts of the applied changes
+        """
+        ingest_result = IngestResult()
+        stored_documents: Dict[Any, Dict] = {document['id']: document for document in self.storage.all()}
+        incoming_ids = set()
+        upserts: List[Dict] = list()
+        for entry in entries:
+            incoming_ids.add(entry['id'])
+            stored_document = stored_documents.get(entry['id'])
+            if stored_document is None:
+                upserts.append(entry)
+                ingest_result.inserted += 1
+            elif dict(stored_document) != entry:
+                upserts.append(entry)
+                ingest_result.updated += 1
+            else:
+                ingest_result.unchanged += 1
+
+        removals = [
+            entry_id for entry_id, document in stored_documents.items()
+            if entry_id not in incoming_ids and (statuses is None or document.get('status') in statuses)
+        ]
+        ingest_result.removed = len(removals)
+
+        if ingest_result.has_changes():
+            self.storage.bulk_write(upserts, removals)
+        return ingest_result
+
+    def __create_data_classes(self, documents: List[Dict]) -> List[Optional[MediaEntry]]:
         query_results: List[Optional[MediaEntry]] = list()
-        documents: List[Document] = self.db.search(query)
         try:
             for document in documents:
                 data_class = self.model_helper.create_data_class(document)
                 query_results.append(data_class)
         except Exception as e:
-            EventLogHelper.log_error(f"Database value is not in a valid format {ANILIST_DATABASE}\n"
-                                     f"Details: {e}",
-                                     self.__class__.__name__,
-                                     inspect.currentframe().f_code.co_name,
-                                     logging.CRITICAL)
+            EventLogHelper.log_error("Database value is not in a valid format %s\n"
+                                     "Details: %s",
+                                     log_level=logging.CRITICAL,
+                                     args=(ANILIST_DATABASE, e))
         return query_results
 
+    def search(self, query: Query) -> List[Optional[MediaEntry]]:
+        return self.__create_data_classes(self.storage.search(query))
+
+    def find_by(self, field: str, value: Any) -> List[Optional[MediaEntry]]:
+        return self.__create_data_classes(self.storage.find_by(field, value))
+
     def get_all(self) -> List[Optional[MediaEntry]]:
-        query_results: List[Optional[MediaEntry]] = list()
-        documents: List[Document] = self.db.all()
-        try:
-            for document in documents:
-                data_class = self.model_helper.create_data_class(document)
-                query_results.append(data_class)
-        except Exception as e:
-            EventLogHelper.log_error(f"Database value is not in a valid format {ANILIST_DATABASE}\n"
-                                     f"Details: {e}",
-                                     self.__class__.__name__,
-                                     inspect.currentframe().f_code.co_name,
-                                     logging.CRITICAL)
-        return query_results
+        return self.__create_data_classes(self.storage.all())
@@ -1,4 +1,3 @@
-import inspect
 from unidecode import unidecode
 from dataclasses import dataclass
 from typing import Optional, List, Dict
@@ -48,21 +47,10 @@ class MediaTitle:
         yield 'userPreferred', self.userPreferred
 
 
-@dataclass()
-class MediaCoverImage:
-    large: str
-    medium: str
-
-    def __iter__(self):
-        yield 'large', self.large
-        yield 'medium', self.medium
-
-
 @dataclass()
 class Media:
     id: int
     title: MediaTitle
-    coverImage: MediaCoverImage
     type: str
     format: str
     season: Optional[str]
@@ -80,7 +68,6 @@ class Media:
     def __iter__(self):
         yield 'id', self.id
         yield 'title', self.title
-        yield 'coverImage', self.coverImage
         yield 'type', self.type
         yield 'format', self.format
         yield 'season', self.season
@@ -136,6 +123,17 @@ class MediaEntry:
             media_entry_maximum = media_next_airing.episode
         return media_entry_maximum
 
+    def get_aired_episode_count(self) -> Optional[int]:
+        """
+        Number of episodes which have aired so far
+        :return: the count or None if it isn't known, e.g. a releasing show without an airing schedule
+        """
+        if self.media.nextAiringEpisode is not None:
+            return self.media.nextAiringEpisode.episode - 1
+        if self.media.status == 'FINISHED':
+            return self.media.episodes
+        return None
+
     def has_user_watched_episode(self, episode_number: str) -> bool:
         """
         Checks if the episode exists in otherwise checks if the user has watched the given episode
@@ -162,6 +160,21 @@ class MediaEntry:
         yield 'media', self.media
 
 
+@dataclass()
+class IngestResult:
+    inserted: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    def has_changes(self) -> bool:
+        return self.inserted > 0 or self.updated > 0 or self.removed > 0
+
+    def __str__(self) -> str:
+        return f"inserted: {self.inserted} | updated: {self.updated} | removed: {self.removed} " \
+               f"| unchanged: {self.unchanged}"
+
+
 # @dataclass
 # class MediaListGroup:
 #     entries: List[MediaEntry]
@@ -179,10 +192,7 @@ class AniListModelHelper:
             parsed_object = from_dict(MediaEntry, response)
         except Exception as e:
             print()
-            EventLogHelper.log_info(f"Error converting dictionary to data class\n"
-                                    f"details -> {e}",
-                                    self.__class__.__name__,
-                                    inspect.currentframe().f_code.co_name)
+            EventLogHelper.log_info("Error converting dictionary to data class\ndetails -> %s", args=(e,))
             print('<------------------------------------------------------------>')
         return parsed_object
 
@@ -192,9 +202,6 @@ class AniListModelHelper:
             parsed_dictionary = dict(response)
         except Exception as e:
             print()
-            EventLogHelper.log_info(f"Error converting data class to dictionary\n"
-                                    f"details -> {e}",
-                                    self.__class__.__name__,
-                                    inspect.currentframe().f_code.co_name)
+            EventLogHelper.log_info("Error converting data class to dictionary\ndetails -> %s", args=(e,))
             print('<------------------------------------------------------------>')
         return parsed_dictionary
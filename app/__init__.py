@@ -1,3 +1,3 @@
-from .util import StorageUtil, EventLogHelper
+from .util import StorageUtil, EventLogHelper, RateLimiter, WorkerPool, TitleMatcher, LruCache, Resilience, Metrics
 from .core.controller import AppController
-from .data.model import DownloadableQueue
+from .data.model import SearchRequest, ReleaseBatch, UserProfile
@@ -1 +1,3 @@
 from .controller import AppController
+from .scheduler import ReleaseScheduler
+from .session import UserSession
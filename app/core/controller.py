@@ -1,253 +1,601 @@
-import inspect
 import json
 
-from typing import Optional, List
+from threading import Lock
+from time import sleep, time
+from typing import Optional, List, Iterable, Dict, Set, Tuple, Union
 from dacite import from_dict
-from tinydb import where
 
-from anilist import AniListController, MediaEntry, AniListStore
-from app import EventLogHelper
-from nyaa import NyaaController, TorrentInfo, AppConfig, NyaaModelHelper
+from anilist import AniListController, MediaEntry
+from app import EventLogHelper, WorkerPool, LruCache, Metrics
+from nyaa import NyaaController, TorrentInfo, AppConfig, NyaaModelHelper, SearchPageCache, NyaaFeedReader, \
+    FeedState, FeedStateStore, ShowSearchState, TorrentDownloader
 
 from transmission import TransmissionController
-from plex import PlexController, Show
+from plex import PlexController
 
-from ..data import AppStore, DownloadableQueue
+from .pipeline import Pipeline, PipelineStage
+from .scheduler import ReleaseScheduler
+from .session import UserSession
+from ..data import SearchRequest, ReleaseBatch, UserProfile
 from ..util import StorageUtil
 
+PARSE_CACHE_FILE = 'database/parse_cache.json'
+SEARCH_CACHE_FILE = 'database/search_cache.json'
+FEED_INGESTION_MODE = 'feed'
+
 
 class AppController:
 
-    def __init__(self, list_name: str) -> None:
+    def __init__(self, list_names: Union[str, List[str]], full_rescan: bool = False) -> None:
         super().__init__()
-        self.list_name = list_name
-        self.anilist_search_query = (where('status') == list_name)
+        self.list_names: List[str] = [list_names] if isinstance(list_names, str) else list(list_names or list())
+
+        self.app_config = self.__get_app_configuration()
+        EventLogHelper.configure(self.app_config.log_level)
 
-        self.transmission_controller: TransmissionController = TransmissionController()
-        self.anilist_controller: AniListController = AniListController()
-        self.plex_controller: PlexController = PlexController()
-        self.nyaa_controller: NyaaController = NyaaController()
+        self.resilience = self.app_config.build_resilience()
+        self.transmission_controller: TransmissionController = TransmissionController(
+            self.app_config.build_transmission_rate_limiter(),
+            self.resilience
+        )
+        self.anilist_controller: AniListController = AniListController(self.resilience)
+        self.plex_controller: PlexController = PlexController(self.resilience)
+        self.plex_controllers: Dict[Optional[str], PlexController] = {None: self.plex_controller}
+        self.sessions: List[UserSession] = [
+            UserSession(profile, self.app_config, self.__get_plex_controller(profile.section_library_name))
+            for profile in UserProfile.load_all(json.loads(StorageUtil.read_file('config', 'anilist.json')))
+        ]
+        self.search_cache = SearchPageCache(
+            self.app_config.nyaa_cache_first_page_ttl,
+            self.app_config.nyaa_cache_page_ttl,
+            self.app_config.nyaa_cache_size
+        )
+        self.search_cache.load(StorageUtil.create_base_path(SEARCH_CACHE_FILE))
+        nyaa_rate_limiter = self.app_config.build_nyaa_rate_limiter()
+        self.torrent_downloader = TorrentDownloader(
+            nyaa_rate_limiter,
+            self.resilience,
+            max(self.app_config.torrent_download_workers, self.app_config.nyaa_search_workers)
+        )
+        self.nyaa_controller: NyaaController = NyaaController(
+            nyaa_rate_limiter,
+            self.plex_controller.episode_cache,
+            self.search_cache,
+            None,
+            full_rescan,
+            self.resilience,
+            self.torrent_downloader
+        )
 
         self.nyaa_model_helper = NyaaModelHelper()
-        self.app_store: AppStore = AppStore()
-        self.app_config = self.__get_app_configuration()
+        TorrentInfo.parse_cache = LruCache(self.app_config.parse_cache_size)
+        TorrentInfo.parse_cache.load(StorageUtil.create_base_path(PARSE_CACHE_FILE))
+
+        self.feed_releases: Optional[Dict[int, List[TorrentInfo]]] = None
+        self.feed_state: Optional[FeedState] = None
+        self.feed_items: List[Dict] = list()
+        self.failed_feed_releases: List[TorrentInfo] = list()
+        self.__feed_lock = Lock()
+        # rating keys of the shows whose episode indexes were refreshed by a targeted cycle,
+        # None when the whole library was refreshed
+        self.refreshed_shows: Optional[Set[int]] = None
+        self.__recorded_cache_counts: Dict[str, Tuple[int, int]] = dict()
+        self.search_counts: Dict[str, int] = dict()
+        self.__search_count_lock = Lock()
 
     @staticmethod
     def __get_app_configuration() -> AppConfig:
         json_string = json.loads(StorageUtil.read_file('config', 'app.json'))
         return from_dict(AppConfig, json_string)
 
+    def __get_plex_controller(self, section_library_name: Optional[str]) -> PlexController:
+        """
+        Users of the same plex section share a controller, every controller shares the server connection
+        and the episode indexes
+        """
+        if section_library_name == getattr(self.plex_controller, 'config', dict()).get('section_library_name'):
+            section_library_name = None
+        plex_controller = self.plex_controllers.get(section_library_name)
+        if plex_controller is None:
+            plex_controller = PlexController(
+                self.resilience,
+                section_library_name,
+                self.plex_controller.episode_cache,
+                getattr(self.plex_controller, 'plex', None)
+            )
+            self.plex_controllers[section_library_name] = plex_controller
+        return plex_controller
+
+    def __fetch_session_list(self, session: UserSession) -> List[MediaEntry]:
+        session.media_entries = dict()
+        self.anilist_controller.make_request(session.anilist_store, self.list_names, session.profile.variables)
+        return session.set_media_entries(self.list_names)
+
     def fetch_anime_list(self) -> List[Optional[MediaEntry]]:
         """
-        Fetches a media group of anime by the passed list name
-        :return: list of anime of the group
+        Fetches the media collection of every user at the same time and picks the entries of every requested list,
+        an entry which is on more than one of the lists or of more than one user is only returned once
+        :return: list of anime of the requested lists
         """
-        anilist_store: AniListStore = AniListStore()
-        if self.list_name is not None:
-            self.anilist_controller.make_request(anilist_store)
-        media_list_entries = anilist_store.search(self.anilist_search_query)
-        return media_list_entries
+        with Metrics.span('fetch_anime_list'):
+            if not self.list_names:
+                return list()
+            worker_pool = WorkerPool(self.app_config.anilist_fetch_workers)
+            task_results = worker_pool.map(self.__fetch_session_list, [(session,) for session in self.sessions])
+            media_list_entries: Dict[int, MediaEntry] = dict()
+            for session, task_result in zip(self.sessions, task_results):
+                if task_result.error is not None:
+                    EventLogHelper.log_error(
+                        "Unable to fetch the list of `%s` -> %s", args=(session, task_result.error)
+                    )
+                    continue
+                for media_entry in task_result.value:
+                    media_list_entries.setdefault(media_entry.mediaId, media_entry)
+            if len(self.sessions) > 1:
+                EventLogHelper.log_info(
+                    "Fetched the lists of %s users in %.2fs, %s entries of %s different shows",
+                    args=(len(self.sessions), worker_pool.report.wall_time,
+                          sum(len(session.media_entries) for session in self.sessions), len(media_list_entries))
+                )
+        return list(media_list_entries.values())
 
     @staticmethod
     def __add_missing_item(media_entry: MediaEntry, append_list: List[Optional[MediaEntry]]):
         append_list.append(media_entry)
 
-    def find_plex_show(self, media_entries: List[MediaEntry]) -> DownloadableQueue:
-        """
-        Fetches a list of shows by title if they exist, if not an empty collection would be returned
-        :param media_entries: a model consisting of various anime names from anilist
-        :return: a list of optional shows
-        """
-        shows_in_plex_matching_users_list: List[Optional[Show]] = list()
-        show_media_entry_mapped_to_plex: List[Optional[MediaEntry]] = list()
-        shows_missing_in_plex_found_on_users_list: List[Optional[MediaEntry]] = list()
-        for entry in media_entries:
-            if entry.media.status != 'NOT_YET_RELEASED':
-                if entry.status != 'COMPLETED':
-                    show = self.plex_controller.find_all_by_title(
-                        entry,
-                        lambda: self.__add_missing_item(
-                            entry,
-                            shows_missing_in_plex_found_on_users_list
-                        )
-                    )
-                    if show:
-                        shows_in_plex_matching_users_list += show
-                        show_media_entry_mapped_to_plex.append(entry)
-        EventLogHelper.log_info(
-            f"Fetched list of shows by title, returned {len(shows_in_plex_matching_users_list)} results.\n"
-            f"Items which could not be found in plex {len(shows_missing_in_plex_found_on_users_list)}.",
-            self.__class__.__name__,
-            inspect.currentframe().f_code.co_name
-        )
-        return DownloadableQueue(
-            shows_in_plex_matching_users_list,
-            shows_missing_in_plex_found_on_users_list,
-            show_media_entry_mapped_to_plex
+    @staticmethod
+    def __is_searchable(media_entry: MediaEntry) -> bool:
+        return media_entry.media.status != 'NOT_YET_RELEASED' and media_entry.status != 'COMPLETED'
+
+    def __find_plex_show_for_entry(self, session: UserSession, media_entry: MediaEntry) -> Iterable[SearchRequest]:
+        """
+        Resolves a single media entry against the plex section of the user
+        :param session: user the media entry belongs to
+        :param media_entry: media entry from the users list
+        :return: a search request for each matching show, or one without a show if it is missing in plex
+        """
+        missing_entries: List[MediaEntry] = list()
+        shows = session.plex_controller.find_all_by_title(
+            media_entry,
+            lambda: self.__add_missing_item(media_entry, missing_entries)
         )
+        for entry in missing_entries:
+            yield SearchRequest(entry, None)
+        for show in shows:
+            if self.refreshed_shows is not None and int(show.ratingKey) not in self.refreshed_shows:
+                self.refreshed_shows.add(int(show.ratingKey))
+                session.plex_controller.episode_cache.invalidate(show)
+            yield SearchRequest(media_entry, show)
 
-    def search_nyaa_for_shows(self, download_queue: DownloadableQueue) -> Optional[List[TorrentInfo]]:
+    def __find_plex_shows_for_group(
+            self,
+            media_group: List[Tuple[UserSession, MediaEntry]]
+    ) -> Iterable[List[Tuple[UserSession, SearchRequest]]]:
         """
-        Searches nyaa.si for torrents matching the tittle name/s
-        :param download_queue: a model consisting of a tuple shows and media entries of missing episodes
-        :return: a list of torrent results
+        Pipeline stage which resolves the media entries of every user who has the same show on their list
+        :param media_group: users and their media entry of a single show
+        :return: the search requests of every user as a single batch
         """
-        torrent_search_result_list: List[TorrentInfo] = list()
-        torrent_search_result_list_for_missing_shows: List[TorrentInfo] = list()
+        yield [
+            (session, search_request)
+            for session, media_entry in media_group
+            for search_request in self.__find_plex_show_for_entry(session, media_entry)
+        ]
 
-        print()
-        print('-------------------------------------------------------')
+    def __collect_feed_releases(self, media_entries: List[MediaEntry]) -> None:
+        """
+        Reads the nyaa.si feed once and matches every release published since the last run against the users list,
+        if the feed does not reach back to the last run the paged search is used instead for this run
+        :param media_entries: media entries which will be searched for
+        :return:
+        """
+        feed_url = self.app_config.nyaa_feed_url
+        feed_state = FeedStateStore(self.app_config.database_backend).get(feed_url)
+        try:
+            feed_reader = NyaaFeedReader(self.nyaa_controller.rate_limiter, self.nyaa_controller.session)
+            feed_page = self.resilience.call('nyaa.si', feed_reader.fetch, feed_url)
+        except Exception as e:
+            EventLogHelper.log_warning(
+                "Unable to read feed `%s`, falling back to searching for each show -> %s", args=(feed_url, e)
+            )
+            return
+        if feed_page.has_gap(feed_state):
+            EventLogHelper.log_warning(
+                "Feed does not reach back to the last seen release `%s`, falling back to searching for each show",
+                args=(feed_state.last_id,)
+            )
+            return
 
+        new_items = feed_page.items_after(feed_state)
+        self.feed_items = new_items
+        self.feed_releases = self.nyaa_controller.match_feed_releases(new_items, media_entries, self.app_config)
+        self.feed_state = FeedState(
+            feed_url,
+            max(feed_page.newest_id, feed_state.last_id),
+            new_items[0]['date'] if new_items else feed_state.last_date
+        )
         EventLogHelper.log_info(
-            f"Searching for missing items in plex",
-            self.__class__.__name__,
-            inspect.currentframe().f_code.co_name
+            "Matched %s of %s new releases to %s show/s on the list",
+            args=(sum(len(releases) for releases in self.feed_releases.values()), len(new_items),
+                  len(self.feed_releases))
         )
-        for media in download_queue.shows_missing_in_plex:
-            torrent_search_results = self.nyaa_controller.search_for_missing_shows(media, self.app_config)
-            if len(torrent_search_results) > 0:
-                torrent_search_result_list_for_missing_shows += torrent_search_results
-            else:
-                EventLogHelper.log_info(
-                    f"Unable to find {media.media.title.userPreferred} from nyaa.si",
-                    self.__class__.__name__,
-                    inspect.currentframe().f_code.co_name
+
+    def __save_feed_state(self, pipeline: Pipeline) -> None:
+        """
+        Moves the feed mark to the newest release only when every matched release was handed over, otherwise
+        the mark stops right before the oldest release which failed so the next run reads it again
+        :param pipeline: pipeline which processed the feed releases
+        :return:
+        """
+        feed_state = self.feed_state
+        if any(stage.failed_count for stage in pipeline.stages):
+            EventLogHelper.log_warning("Keeping the feed mark, a pipeline stage failed to process some of the releases")
+            return
+        if self.failed_feed_releases:
+            oldest_failed_id = min(int(torrent_info.id) for torrent_info in self.failed_feed_releases)
+            # feed items are ordered newest first
+            handed_over_items = [item for item in self.feed_items if int(item['id']) < oldest_failed_id]
+            if not handed_over_items:
+                EventLogHelper.log_warning(
+                    "Keeping the feed mark, %s release/s failed to queue", args=(len(self.failed_feed_releases),)
                 )
-        print('-------------------------------------------------------')
-        print()
+                return
+            feed_state = FeedState(feed_state.feed, int(handed_over_items[0]['id']), handed_over_items[0]['date'])
+            EventLogHelper.log_warning(
+                "Moving the feed mark only to `%s`, %s release/s failed to queue",
+                args=(feed_state.last_id, len(self.failed_feed_releases))
+            )
+        FeedStateStore(self.app_config.database_backend).save(feed_state)
 
-        print()
-        print('-------------------------------------------------------')
-        EventLogHelper.log_info(
-            f"Searching for matching items in plex",
-            self.__class__.__name__,
-            inspect.currentframe().f_code.co_name
-        )
-        for show, media in zip(download_queue.shows_found_in_plex, download_queue.show_media_entry_in_plex):
-            torrent_search_results = self.nyaa_controller.search_for_shows(
-                show, media, self.app_config
+    def __search_nyaa_for_group(
+            self,
+            search_requests: List[Tuple[UserSession, SearchRequest]]
+    ) -> Iterable[Tuple[UserSession, ReleaseBatch]]:
+        """
+        Pipeline stage which searches nyaa.si once for a show, no matter how many users have it on their list
+        :param search_requests: users and their search request of a single show
+        :return: the releases of each user as a single batch, a batch without releases still carries the search state
+        """
+        if not search_requests:
+            return
+        for session, release_batch in self.__find_releases_for_group(search_requests).items():
+            if release_batch.torrent_infos or release_batch.search_state is not None:
+                yield session, release_batch
+
+    def __find_releases_for_group(
+            self,
+            search_requests: List[Tuple[UserSession, SearchRequest]]
+    ) -> Dict[UserSession, ReleaseBatch]:
+        """
+        Searches nyaa.si for a single show, or picks its releases from the feed,
+        then filters the releases against the plex section of each user
+        :param search_requests: users and their search request of a single show
+        :return: the releases of each user
+        """
+        media_entry = search_requests[0][1].media_entry
+        search_states: Dict[UserSession, Optional[ShowSearchState]] = dict()
+        search_results: List[Dict] = list()
+        if self.feed_releases is not None:
+            releases = self.feed_releases.get(media_entry.mediaId, list())
+            if not releases:
+                return dict()
+        else:
+            for session, search_request in search_requests:
+                if session not in search_states:
+                    search_states[session] = self.nyaa_controller.get_search_state(
+                        search_request.media_entry, self.app_config, session.search_state_store
+                    )
+            if all(
+                    self.nyaa_controller.is_search_unchanged(search_states[session], search_request.media_entry,
+                                                             self.app_config)
+                    for session, search_request in search_requests
+            ):
+                self.__count_search('skipped')
+                return dict()
+            self.__count_search('searched')
+            releases, search_results = self.nyaa_controller.search_releases(
+                media_entry, self.app_config, [search_state for search_state in search_states.values() if search_state]
             )
 
-            if len(torrent_search_results) > 0:
-                print()
-                torrent_search_result_list += torrent_search_results
+        session_releases: Dict[UserSession, Dict[str, TorrentInfo]] = dict()
+        session_requests: Dict[UserSession, List[SearchRequest]] = dict()
+        for session, search_request in search_requests:
+            if search_request.is_missing_in_plex():
+                matches = self.nyaa_controller.filter_releases_for_missing_show(releases, self.app_config)
             else:
-                EventLogHelper.log_info(
-                    f"No new releases found for the following torrent/s `{media.generate_search_terms()}` on nyaa.si",
-                    self.__class__.__name__,
-                    inspect.currentframe().f_code.co_name
-                )
-                print()
-        print('-------------------------------------------------------')
-        print()
-        return torrent_search_result_list + torrent_search_result_list_for_missing_shows
+                matches = self.nyaa_controller.filter_releases_for_show(search_request.show, releases, self.app_config)
+            torrent_infos = session_releases.setdefault(session, dict())
+            for torrent_info in matches:
+                torrent_infos.setdefault(torrent_info.name, torrent_info)
+            session_requests.setdefault(session, list()).append(search_request)
+
+        if self.feed_releases is None and not any(session_releases.values()):
+            EventLogHelper.log_info(
+                "No new releases found for `%s` on nyaa.si", args=(media_entry.media.title.userPreferred,)
+            )
 
-    def __find_downloadable_torrents(self, torrent_info: TorrentInfo) -> List[Optional[TorrentInfo]]:
-        return self.app_store.search(where('name') == torrent_info.name)
+        release_batches: Dict[UserSession, ReleaseBatch] = dict()
+        for session, user_requests in session_requests.items():
+            # plex episodes only count as present when a single show was searched for the user
+            release_batches[session] = ReleaseBatch(
+                user_requests[0].media_entry,
+                user_requests[0].show if len(user_requests) == 1 else None,
+                list(session_releases[session].values()),
+                search_states.get(session),
+                search_results
+            )
+        return release_batches
+
+    def __count_search(self, outcome: str) -> None:
+        Metrics.increment('nyaa_searches', outcome=outcome)
+        with self.__search_count_lock:
+            self.search_counts[outcome] = self.search_counts.get(outcome, 0) + 1
 
-    def __download_torrent_file(self, torrent_info: TorrentInfo):
+    def __download_torrent_file(self, session: UserSession, torrent_info: TorrentInfo) -> bool:
         print()
-        EventLogHelper.log_info(f"Downloading torrent for file -> {torrent_info.name}",
-                                self.__class__.__name__,
-                                inspect.currentframe().f_code.co_name)
-        is_download_successful = self.nyaa_controller.download_torrent_file(torrent_info, self.app_config)
+        EventLogHelper.log_info("Downloading torrent for file -> %s", args=(torrent_info.name,))
+        is_download_successful = self.nyaa_controller.download_torrent_file(torrent_info, session.app_config)
+        Metrics.increment('torrents_downloaded' if is_download_successful else 'torrents_failed')
         if is_download_successful:
             model_dictionary = self.nyaa_model_helper.create_dictionary_class(torrent_info)
-            self.app_store.save_or_update(model_dictionary)
+            session.app_store.save_or_update(model_dictionary)
             print()
-            EventLogHelper.log_info(f"Download successful, anime attributes -> {torrent_info.anime_info}",
-                                    self.__class__.__name__,
-                                    inspect.currentframe().f_code.co_name)
-            self.__move_torrent_to_monitored_directory(torrent_info)
+            EventLogHelper.log_info("Download successful, anime attributes -> %s", args=(torrent_info.anime_info,))
+            self.__move_torrent_to_monitored_directory(session, torrent_info)
         else:
             print()
-            EventLogHelper.log_info(f"Failed to download, anime attributes -> {torrent_info.anime_info}",
-                                    self.__class__.__name__,
-                                    inspect.currentframe().f_code.co_name)
+            EventLogHelper.log_info("Failed to download, anime attributes -> %s", args=(torrent_info.anime_info,))
+        return is_download_successful
 
-    def __move_torrent_to_monitored_directory(self, torrent_info: TorrentInfo):
+    def __move_torrent_to_monitored_directory(self, session: UserSession, torrent_info: TorrentInfo):
         try:
             StorageUtil.copy_or_move_file(
                 filename=f"{torrent_info.name}.torrent",
-                directory_path=self.app_config.build_parent_save_path(
+                directory_path=session.app_config.build_parent_save_path(
                     torrent_info.anime_info.anime_title
                 ),
-                destination_path=self.app_config.torrent_monitor_directory,
-                keep_file=self.app_config.torrent_keep_file_after_queuing
+                destination_path=session.app_config.torrent_monitor_directory,
+                keep_file=session.app_config.torrent_keep_file_after_queuing
             )
 
             model = self.nyaa_model_helper.create_dictionary_class(torrent_info)
-            self.app_store.save_or_update(model)
+            session.app_store.save_or_update(model)
         except Exception as e:
             EventLogHelper.log_error(
-                f"__move_torrent_to_monitored_directory -> StorageUtil.copy_or_move_file -> {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
+                "__move_torrent_to_monitored_directory -> StorageUtil.copy_or_move_file -> %s", args=(e,)
             )
 
-    def __queue_downloaded_torrent_file(self, torrent_info: TorrentInfo) -> bool:
+    def __queue_torrent_files(self, session: UserSession, torrent_infos: List[TorrentInfo]) -> List[TorrentInfo]:
+        """
+        Attempts to add the torrents to the client that handles torrent downloads in a single batch
+        :param session: user the torrents are queued for
+        :param torrent_infos: torrent items to queue
+        :return: the torrents which could not be queued
+        """
+        not_queued: List[TorrentInfo] = list()
+        for queue_result in self.transmission_controller.queue_torrents(torrent_infos):
+            torrent_info = queue_result.torrent_info
+            torrent_info.is_queued = queue_result.queued
+            Metrics.increment('torrents_queued' if queue_result.queued else 'torrents_not_queued',
+                              duplicate=queue_result.duplicate)
+            if queue_result.queued:
+                model = self.nyaa_model_helper.create_dictionary_class(torrent_info)
+                session.app_store.save_or_update(model)
+            else:
+                not_queued.append(torrent_info)
+        return not_queued
+
+    def __is_new_torrent(self, session: UserSession, torrent_info: TorrentInfo) -> bool:
+        if torrent_info.anime_info is None:
+            Metrics.increment('torrents_skipped', reason='no_anime_info')
+            print()
+            EventLogHelper.log_info("Skipping torrent without anime info -> %s", args=(torrent_info,))
+            return False
+        if session.app_store.is_downloaded(torrent_info):
+            Metrics.increment('torrents_skipped', reason='already_downloaded')
+            print()
+            EventLogHelper.log_info("Skipping existing download -> %s", args=(torrent_info.anime_info,))
+            return False
+        return True
+
+    def __process_torrents(self, session_batch: Tuple[UserSession, ReleaseBatch]) -> Iterable[TorrentInfo]:
         """
-        Attempts to add the torrent file to the client that handles torrent downloads
-        :param torrent_info: torrent item to queue
-        :return: True if the operation was a success
+        Pipeline stage which skips torrents that the user has already downloaded, queues the rest of the show's
+        torrents in one batch and downloads the .torrent files of those which could not be queued, the search state
+        of the user only counts the episodes which are in their history or have been handed over in this stage
+        :param session_batch: user and the releases of a single show found on nyaa.si
+        :return: each torrent which was handed over to the torrent client or downloaded
         """
-        success = self.transmission_controller.add_torrent_magnet(
-            filename=torrent_info.download_url
+        session, release_batch = session_batch
+        new_torrents: List[TorrentInfo] = list()
+        resolved_torrents: List[TorrentInfo] = list()
+        for torrent_info in release_batch.torrent_infos:
+            if self.__is_new_torrent(session, torrent_info):
+                new_torrents.append(torrent_info)
+            elif torrent_info.anime_info is not None:
+                resolved_torrents.append(torrent_info)
+
+        not_queued = self.__queue_torrent_files(session, new_torrents)
+        handed_over = [torrent_info for torrent_info in new_torrents if torrent_info.is_queued]
+        if not_queued:
+            task_results = WorkerPool(self.app_config.torrent_download_workers).map(
+                self.__download_torrent_file, [(session, torrent_info) for torrent_info in not_queued]
+            )
+            handed_over += [
+                torrent_info for torrent_info, task_result in zip(not_queued, task_results) if task_result.value
+            ]
+        # the page mark only moves once every new release reached the client, otherwise the next search
+        # could stop before the pages holding the releases which failed
+        is_batch_complete = len(handed_over) == len(new_torrents)
+        if self.feed_releases is not None and not is_batch_complete:
+            with self.__feed_lock:
+                self.failed_feed_releases += [
+                    torrent_info for torrent_info in new_torrents if torrent_info not in handed_over
+                ]
+        self.nyaa_controller.save_search_state(
+            release_batch.search_state,
+            resolved_torrents + handed_over,
+            release_batch.media_entry,
+            release_batch.show,
+            session.search_state_store,
+            release_batch.search_results if is_batch_complete else None
         )
+        yield from new_torrents
 
-        torrent_info.is_queued = success
-        if success:
-            model = self.nyaa_model_helper.create_dictionary_class(torrent_info)
-            self.app_store.save_or_update(model)
+    def __create_pipeline(self) -> Pipeline:
+        queue_size = self.app_config.pipeline_queue_size
+        return Pipeline(
+            [
+                PipelineStage('plex', self.__find_plex_shows_for_group, 1, queue_size),
+                PipelineStage('nyaa', self.__search_nyaa_for_group, self.app_config.nyaa_search_workers, queue_size),
+                PipelineStage('queue', self.__process_torrents, 1, queue_size)
+            ],
+            self.app_config.pipeline_report_interval
+        )
 
-        return success
+    def __record_cache_metrics(self) -> None:
+        caches = [
+            ('plex_episodes', self.plex_controller.episode_cache.hits, self.plex_controller.episode_cache.misses),
+            ('release_name_parse', TorrentInfo.parse_cache.hits, TorrentInfo.parse_cache.misses),
+            ('nyaa_search_page', self.search_cache.hits + self.search_cache.revalidated, self.search_cache.misses)
+        ]
+        for cache_name, hits, misses in caches:
+            # cache counters span the lifetime of the process, only the difference to the previous run is recorded
+            previous_hits, previous_misses = self.__recorded_cache_counts.get(cache_name, (0, 0))
+            Metrics.increment('cache_hits', max(0, hits - previous_hits), cache=cache_name)
+            Metrics.increment('cache_misses', max(0, misses - previous_misses), cache=cache_name)
+            self.__recorded_cache_counts[cache_name] = (hits, misses)
 
-    def start_application(self) -> None:
+    def __write_metrics(self) -> None:
+        try:
+            Metrics.write_textfile(StorageUtil.create_base_path(self.app_config.metrics_textfile))
+            Metrics.write_summary(StorageUtil.create_base_path(self.app_config.metrics_summary))
+        except Exception as e:
+            EventLogHelper.log_warning("Unable to write run metrics -> %s", args=(e,))
+
+    def __create_media_groups(self, media_ids: Optional[Set[int]]) -> List[List[Tuple[UserSession, MediaEntry]]]:
         """
-        Application starting point
-        :return:
+        Groups the searchable entries of every user by media id, so each show is searched for once
+        :param media_ids: only keep these shows, every searchable show is kept when None
+        :return: users and their media entry for each show
+        """
+        media_groups: Dict[int, List[Tuple[UserSession, MediaEntry]]] = dict()
+        for session in self.sessions:
+            for media_entry in filter(self.__is_searchable, session.media_entries.values()):
+                if media_ids is None or media_entry.mediaId in media_ids:
+                    media_groups.setdefault(media_entry.mediaId, list()).append((session, media_entry))
+        return list(media_groups.values())
+
+    def __run_cycle(self, media_ids: Optional[Set[int]] = None) -> List[Optional[MediaEntry]]:
+        """
+        Fetches the list of every user and streams the searchable shows through plex lookup, nyaa search and
+        torrent queueing so that torrents are queued as soon as they are found
+        :param media_ids: only search for these shows, every searchable show is searched for when None.
+        The lists and plex library of the last full cycle are reused and only the episodes of these shows are
+        fetched from plex again
+        :return: every entry of the fetched list, or the searched entries when `media_ids` is given
         """
+        anime_list: List[Optional[MediaEntry]] = list()
+        Metrics.configure(self.app_config.metrics_enabled)
+        self.resilience.budget.reset()
+        self.feed_releases = None
+        self.feed_state = None
+        self.feed_items = list()
+        self.failed_feed_releases = list()
+        self.refreshed_shows = set() if media_ids is not None else None
+        self.search_counts = dict()
         try:
-            anime_list: List[Optional[MediaEntry]] = self.fetch_anime_list()
+            if media_ids is None:
+                anime_list = self.fetch_anime_list()
+                media_groups = self.__create_media_groups(media_ids) if anime_list else list()
+            else:
+                media_groups = self.__create_media_groups(media_ids)
+                anime_list = [media_group[0][1] for media_group in media_groups]
             print('-------------------------------------------------------')
             if anime_list:
-                download_queue: DownloadableQueue = self.find_plex_show(anime_list)
+                if self.app_config.nyaa_ingestion_mode == FEED_INGESTION_MODE:
+                    self.__collect_feed_releases([media_group[0][1] for media_group in media_groups])
+                pipeline = self.__create_pipeline()
+                pipeline.run(media_groups)
+                if self.feed_state is not None and media_ids is None:
+                    # a targeted cycle only matched the due shows, the feed items of every other show
+                    # have to stay ahead of the mark until a full cycle matches them
+                    self.__save_feed_state(pipeline)
+                EventLogHelper.log_info(
+                    "Nyaa searches -> searched: %s | skipped with nothing new: %s\n"
+                    "Plex episode index cache -> %s\n"
+                    "Release name parse cache -> %s\n"
+                    "Nyaa search page cache -> %s\n"
+                    "Torrent file downloads -> %s\n"
+                    "Outbound calls -> %s",
+                    args=(self.search_counts.get('searched', 0), self.search_counts.get('skipped', 0),
+                          self.plex_controller.episode_cache, TorrentInfo.parse_cache, self.search_cache,
+                          self.torrent_downloader, self.resilience)
+                )
+                self.__record_cache_metrics()
+                TorrentInfo.parse_cache.save(StorageUtil.create_base_path(PARSE_CACHE_FILE))
+                self.search_cache.save(StorageUtil.create_base_path(SEARCH_CACHE_FILE))
+                if pipeline.stages[-1].emitted_count < 1:
+                    print()
+                    EventLogHelper.log_info("No new episodes to download, ending execution of script")
                 print('-------------------------------------------------------')
-                if download_queue.contains_items():
-                    print('-------------------------------------------------------')
-                    search_results = self.search_nyaa_for_shows(download_queue)
-
-                    if search_results is not None and len(search_results) > 0:
-                        for torrent_info in search_results:
-                            if torrent_info.anime_info is None:
-                                print()
-                                EventLogHelper.log_info(
-                                    f"Skipping torrent without anime info -> {torrent_info}",
-                                    self.__class__.__name__,
-                                    inspect.currentframe().f_code.co_name
-                                )
-                                continue
-                            downloaded_torrent = self.__find_downloadable_torrents(torrent_info)
-                            if downloaded_torrent is None or len(downloaded_torrent) < 1:
-                                queued: bool = self.__queue_downloaded_torrent_file(torrent_info)
-                                if not queued:
-                                    self.__download_torrent_file(torrent_info)
-                            else:
-                                print()
-                                EventLogHelper.log_info(
-                                    f"Skipping existing download -> {torrent_info.anime_info}",
-                                    self.__class__.__name__,
-                                    inspect.currentframe().f_code.co_name
-                                )
-                    else:
-                        print()
+        except Exception as e:
+            Metrics.increment('uncaught_exceptions')
+            EventLogHelper.log_error("Uncaught exception thrown -> %s", args=(e,))
+        finally:
+            self.__write_metrics()
+        return anime_list
+
+    def __refresh_plex(self) -> None:
+        for plex_controller in self.plex_controllers.values():
+            plex_controller.refresh()
+
+    def start_application(self) -> None:
+        """
+        Application starting point, searches for every show on the list once
+        :return:
+        """
+        self.__run_cycle()
+
+    def run_daemon(self) -> None:
+        """
+        Keeps running and only searches for a show once its next episode has aired, plus the expected release lag.
+        Every `daemon_reconcile_interval` seconds the lists are fetched again and the whole list is searched for
+        to pick up anything that was missed, searches for due shows in between reuse the lists of that reconciliation
+        :return:
+        """
+        scheduler = ReleaseScheduler(
+            self.app_config.daemon_release_lag,
+            self.app_config.daemon_retry_interval,
+            self.app_config.daemon_retry_count
+        )
+        next_reconciliation_at = 0.0
+        try:
+            while True:
+                if time() >= next_reconciliation_at:
+                    EventLogHelper.log_info("Running full reconciliation of `%s`", args=(', '.join(self.list_names),))
+                    self.__refresh_plex()
+                    anime_list = self.__run_cycle()
+                    next_reconciliation_at = time() + self.app_config.daemon_reconcile_interval
+                    if anime_list:
+                        scheduled_count = scheduler.schedule(filter(self.__is_searchable, anime_list))
+                        if scheduled_count:
+                            EventLogHelper.log_info(
+                                "Scheduled %s upcoming episode/s, %s search/es pending",
+                                args=(scheduled_count, len(scheduler))
+                            )
+                else:
+                    due_media_ids = scheduler.pop_due(time())
+                    if due_media_ids:
                         EventLogHelper.log_info(
-                            f"No new episodes to download, ending execution of script",
-                            self.__class__.__name__,
-                            inspect.currentframe().f_code.co_name
+                            "Searching for %s show/s with newly aired episodes", args=(len(due_media_ids),)
                         )
-                    print('-------------------------------------------------------')
-        except Exception as e:
-            EventLogHelper.log_error(f"Uncaught exception thrown -> {e}",
-                                     self.__class__.__name__,
-                                     inspect.currentframe().f_code.co_name)
+                        # the lists and airing times of the last reconciliation are reused, the episodes
+                        # after the due ones are scheduled by the next reconciliation
+                        self.__run_cycle(due_media_ids)
+                next_due_at = scheduler.next_due_at()
+                wake_at = min(next_due_at, next_reconciliation_at) if next_due_at is not None \
+                    else next_reconciliation_at
+                sleep(max(1.0, wake_at - time()))
+        except KeyboardInterrupt:
+            EventLogHelper.log_info("Stopping daemon")
@@ -0,0 +1,173 @@
+from queue import Queue
+from threading import Thread, Event, Lock
+from time import monotonic
+from typing import Any, Callable, Iterable, List, Optional, Dict
+
+from app import EventLogHelper, Metrics
+from ..util import PoolReport
+
+PipelineHandler = Callable[[Any], Optional[Iterable[Any]]]
+
+
+class _EndOfStream:
+    """
+    Marker passed through the queues once a stage has no more items to hand over
+    """
+
+
+class PipelineStage:
+    """
+    A single stage of a pipeline, items are read from a bounded input queue by `worker_count` threads
+    and everything yielded by the handler is forwarded to the next stage as soon as it is produced
+    """
+
+    def __init__(self, name: str, handler: PipelineHandler, worker_count: int = 1, queue_size: int = 0) -> None:
+        super().__init__()
+        self.name = name
+        self.handler = handler
+        self.worker_count = max(1, worker_count)
+        self.queue: Queue = Queue(maxsize=queue_size)
+        self.next_stage: Optional['PipelineStage'] = None
+        self.processed_count: int = 0
+        self.emitted_count: int = 0
+        self.failed_count: int = 0
+        self.max_queue_depth: int = 0
+        self.first_output_at: Optional[float] = None
+        self.first_started_at: Optional[float] = None
+        self.last_finished_at: Optional[float] = None
+        self.busy_time: float = 0.0
+        self.__lock = Lock()
+        self.__active_workers: int = self.worker_count
+
+    def put(self, item: Any) -> None:
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def report(self) -> PoolReport:
+        """
+        Compares the time the workers spent on items with the time from the first item until the last one finished
+        :return: pool report of the stage
+        """
+        wall_time = self.last_finished_at - self.first_started_at if self.first_started_at is not None else 0.0
+        return PoolReport(self.processed_count, wall_time, self.busy_time)
+
+    def __emit(self, item: Any) -> None:
+        with self.__lock:
+            self.emitted_count += 1
+            if self.first_output_at is None:
+                self.first_output_at = monotonic()
+        if self.next_stage is not None:
+            self.next_stage.put(item)
+
+    def __close(self) -> None:
+        with self.__lock:
+            self.__active_workers -= 1
+            is_last_worker = self.__active_workers == 0
+        if is_last_worker and self.next_stage is not None:
+            for _ in range(self.next_stage.worker_count):
+                self.next_stage.put(_EndOfStream())
+
+    def work(self) -> None:
+        while True:
+            item = self.queue.get()
+            if isinstance(item, _EndOfStream):
+                self.__close()
+                return
+            started = monotonic()
+            with self.__lock:
+                if self.first_started_at is None:
+                    self.first_started_at = started
+            try:
+                with Metrics.span('pipeline_stage', stage=self.name):
+                    outputs = self.handler(item)
+                    if outputs is not None:
+                        for output in outputs:
+                            self.__emit(output)
+            except Exception as e:
+                with self.__lock:
+                    self.failed_count += 1
+                EventLogHelper.log_error("Pipeline stage `%s` failed to process item -> %s", args=(self.name, e))
+            finally:
+                finished = monotonic()
+                with self.__lock:
+                    self.processed_count += 1
+                    self.busy_time += finished - started
+                    self.last_finished_at = finished
+
+
+class Pipeline:
+    """
+    Streams items through a chain of stages connected by bounded queues, so every stage
+    can work on an item as soon as the previous stage has produced it
+    """
+
+    def __init__(self, stages: List[PipelineStage], report_interval: float = 10.0) -> None:
+        super().__init__()
+        self.stages = stages
+        self.report_interval = report_interval
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage = next_stage
+
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        Snapshot of the number of items waiting in front of each stage
+        :return: dictionary of stage name to queue depth
+        """
+        return {stage.name: stage.queue.qsize() for stage in self.stages}
+
+    def __report_queue_depths(self, finished: Event) -> None:
+        while not finished.wait(self.report_interval):
+            depths = ' | '.join(f"{name}: {depth}" for name, depth in self.queue_depths().items())
+            EventLogHelper.log_info("Pipeline queue depths -> %s", args=(depths,))
+
+    def run(self, source: Iterable[Any]) -> None:
+        """
+        Feeds every item from the source into the first stage and blocks until all stages have drained
+        :param source: iterable of items for the first stage
+        :return:
+        """
+        started = monotonic()
+        workers: List[Thread] = list()
+        for stage in self.stages:
+            for index in range(stage.worker_count):
+                worker = Thread(target=stage.work, name=f"{stage.name}-{index}", daemon=True)
+                worker.start()
+                workers.append(worker)
+
+        finished = Event()
+        reporter = Thread(target=self.__report_queue_depths, args=(finished,), daemon=True)
+        reporter.start()
+
+        first_stage = self.stages[0]
+        with Metrics.span('pipeline_run'):
+            try:
+                for item in source:
+                    first_stage.put(item)
+            finally:
+                for _ in range(first_stage.worker_count):
+                    first_stage.put(_EndOfStream())
+                for worker in workers:
+                    worker.join()
+                finished.set()
+
+        for stage in self.stages:
+            Metrics.increment('pipeline_items', stage.processed_count, stage=stage.name, outcome='processed')
+            Metrics.increment('pipeline_items', stage.emitted_count, stage=stage.name, outcome='emitted')
+            Metrics.increment('pipeline_items', stage.failed_count, stage=stage.name, outcome='failed')
+            time_to_first_output = f"{stage.first_output_at - started:.2f}s" \
+                if stage.first_output_at is not None else "n/a"
+            EventLogHelper.log_info(
+                "Pipeline stage `%s` -> processed: %s | emitted: %s | failed: %s | max queue depth: %s"
+                " | first output after: %s",
+                args=(stage.name, stage.processed_count, stage.emitted_count, stage.failed_count,
+                      stage.max_queue_depth, time_to_first_output)
+            )
+            if stage.worker_count > 1:
+                report = stage.report()
+                EventLogHelper.log_info(
+                    "Pipeline stage `%s` ran %s items on %s workers in %.2fs | busy: %.2fs | speedup vs serial: %.2fx",
+                    args=(stage.name, report.task_count, stage.worker_count, report.wall_time, report.busy_time,
+                          report.speedup())
+                )
@@ -0,0 +1,81 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from anilist import MediaEntry
+
+
+class ReleaseScheduler:
+    """
+    Priority queue of the next expected release of each show, keyed on when the episode airs plus the usual delay
+    before a release shows up on nyaa.si. Each aired episode is searched for once when it is due and then
+    `retry_count` more times, `retry_interval` seconds apart, in case the release took longer than expected
+    """
+
+    def __init__(self, release_lag: float, retry_interval: float, retry_count: int) -> None:
+        super().__init__()
+        self.release_lag = release_lag
+        self.retry_interval = retry_interval
+        self.retry_count = retry_count
+        self.__queue: List[Tuple[float, int, int]] = list()
+        # (media id, episode) -> number of searches which have been made for it
+        self.__attempts: Dict[Tuple[int, int], int] = dict()
+
+    def schedule(self, media_entries: Iterable[MediaEntry]) -> int:
+        """
+        Adds the next airing episode of each show, episodes which are already scheduled are left as they are
+        and shows which are no longer on the list are dropped
+        :param media_entries: searchable media entries of the users list
+        :return: number of newly scheduled episodes
+        """
+        next_episodes: Dict[int, int] = dict()
+        scheduled_count = 0
+        for media_entry in media_entries:
+            next_airing = media_entry.media.nextAiringEpisode
+            next_episodes[media_entry.mediaId] = next_airing.episode if next_airing is not None else 0
+            if next_airing is None:
+                continue
+            key = (media_entry.mediaId, next_airing.episode)
+            if key not in self.__attempts:
+                self.__attempts[key] = 0
+                heapq.heappush(self.__queue, (next_airing.airingAt + self.release_lag, *key))
+                scheduled_count += 1
+        # searched out episodes are kept while anilist still reports them as next, so they aren't scheduled again
+        stale_keys = [
+            key for key, attempts in self.__attempts.items()
+            if key[0] not in next_episodes or (attempts > self.retry_count and key[1] < next_episodes[key[0]])
+        ]
+        for key in stale_keys:
+            del self.__attempts[key]
+        return scheduled_count
+
+    def pop_due(self, now: float) -> Set[int]:
+        """
+        Removes every episode which is due and schedules its next retry
+        :param now: current unix time
+        :return: media ids of the shows which should be searched for
+        """
+        due_media_ids: Set[int] = set()
+        retries: List[Tuple[float, int, int]] = list()
+        while self.__queue and self.__queue[0][0] <= now:
+            due_at, media_id, episode = heapq.heappop(self.__queue)
+            key = (media_id, episode)
+            if key not in self.__attempts:
+                continue
+            due_media_ids.add(media_id)
+            self.__attempts[key] += 1
+            if self.__attempts[key] <= self.retry_count:
+                retries.append((now + self.retry_interval, media_id, episode))
+        for retry in retries:
+            heapq.heappush(self.__queue, retry)
+        return due_media_ids
+
+    def next_due_at(self) -> Optional[float]:
+        """
+        :return: unix time of the earliest scheduled search or None if nothing is scheduled
+        """
+        while self.__queue and (self.__queue[0][1], self.__queue[0][2]) not in self.__attempts:
+            heapq.heappop(self.__queue)
+        return self.__queue[0][0] if self.__queue else None
+
+    def __len__(self) -> int:
+        return len(self.__queue)
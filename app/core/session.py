@@ -0,0 +1,67 @@
+import os
+from dataclasses import replace
+from typing import Dict, List
+
+from anilist import AniListStore, MediaEntry
+from anilist.data.database import ANILIST_DATABASE
+from nyaa import AppConfig, ShowSearchStateStore
+from nyaa.data.state import SEARCH_STATE_DATABASE
+from plex import PlexController
+
+from ..data import AppStore, UserProfile
+from ..data.database import APP_DATABASE
+
+
+class UserSession:
+    """
+    Everything which belongs to a single user, their list, download history, search state, plex section and
+    download paths, searches on nyaa.si and the caches are shared by every session of the application
+    """
+
+    def __init__(self, profile: UserProfile, app_config: AppConfig, plex_controller: PlexController) -> None:
+        super().__init__()
+        self.profile = profile
+        self.name: str = profile.name or 'default'
+        self.plex_controller = plex_controller
+        self.app_config: AppConfig = self.__create_app_config(profile, app_config)
+        self.anilist_store = AniListStore(
+            app_config.database_backend, database_name=profile.database_name(ANILIST_DATABASE)
+        )
+        self.app_store = AppStore(app_config.database_backend, database_name=profile.database_name(APP_DATABASE))
+        self.search_state_store = ShowSearchStateStore(
+            app_config.database_backend, database_name=profile.database_name(SEARCH_STATE_DATABASE)
+        )
+        self.media_entries: Dict[int, MediaEntry] = dict()
+
+    @staticmethod
+    def __create_app_config(profile: UserProfile, app_config: AppConfig) -> AppConfig:
+        """
+        Uses the download paths of the user, torrent files of a named user go into their own sub directory
+        unless a download directory is configured for them
+        """
+        download_directory = profile.torrent_download_directory
+        if download_directory is None and profile.name is not None:
+            download_directory = os.path.join(app_config.torrent_download_directory, profile.name)
+        return replace(
+            app_config,
+            torrent_download_directory=download_directory or app_config.torrent_download_directory,
+            torrent_monitor_directory=profile.torrent_monitor_directory or app_config.torrent_monitor_directory
+        )
+
+    def set_media_entries(self, list_names: List[str]) -> List[MediaEntry]:
+        """
+        Picks the entries of every requested list from the users stored collection,
+        an entry which is on more than one of the lists is only kept once
+        :param list_names: anilist list statuses
+        :return: the users entries
+        """
+        media_entries: Dict[int, MediaEntry] = dict()
+        for list_name in list_names:
+            for media_entry in self.anilist_store.find_by('status', list_name):
+                if media_entry is not None:
+                    media_entries.setdefault(media_entry.mediaId, media_entry)
+        self.media_entries = media_entries
+        return list(media_entries.values())
+
+    def __str__(self) -> str:
+        return self.name
@@ -1,2 +1,3 @@
+from .index import DownloadHistoryIndex
 from .database import AppStore
-from .model import DownloadableQueue
+from .model import SearchRequest, ReleaseBatch, UserProfile
@@ -1,76 +1,95 @@
-import inspect
 import logging
 
+from threading import Lock
 from typing import Optional, List, Dict, Any
-from tinydb import TinyDB, Query, where
-from tinydb.database import Document, Table
+from tinydb import Query
 
-from app import EventLogHelper, StorageUtil
+from app import EventLogHelper
+from app.util import DocumentStorage, create_document_storage, TINYDB_BACKEND
 from nyaa import TorrentInfo, NyaaModelHelper
+from .index import DownloadHistoryIndex
 
-APP_DATABASE = 'database/history.db'
+APP_DATABASE = 'database/history'
 
 
 class AppStore:
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            backend: str = TINYDB_BACKEND,
+            storage: Optional[DocumentStorage] = None,
+            database_name: str = APP_DATABASE
+    ) -> None:
         super().__init__()
-        src = StorageUtil.create_base_path(APP_DATABASE)
         self.model_helper = NyaaModelHelper()
-        self.db: TinyDB = TinyDB(src)
+        self.storage: DocumentStorage = storage if storage is not None else create_document_storage(
+            backend, database_name, 'name', ['name', 'hash']
+        )
+        self.__history_index: Optional[DownloadHistoryIndex] = None
+        self.__history_index_lock = Lock()
+
+    def get_history_index(self) -> DownloadHistoryIndex:
+        """
+        Loads the download history into an in-memory index the first time it is needed
+        :return: index of previously downloaded torrents
+        """
+        with self.__history_index_lock:
+            if self.__history_index is None:
+                history_index = DownloadHistoryIndex()
+                history_index.add_all(self.storage.all())
+                self.__history_index = history_index
+            return self.__history_index
+
+    def is_downloaded(self, torrent_info: TorrentInfo) -> bool:
+        """
+        Checks if the torrent or the same episode from the same release group is already in the history
+        :param torrent_info: torrent found on nyaa.si
+        :return: True if it has been downloaded before
+        """
+        return self.get_history_index().contains(self.model_helper.create_dictionary_class(torrent_info))
 
     def save_or_update(self, value: Optional[Dict]):
-        result_ids: List[Any] = list()
+        is_saved = False
 
         try:
-            result_ids += self.db.upsert(value, where('name') == value['name'])
+            is_saved = self.storage.upsert(value)
+            if is_saved and self.__history_index is not None:
+                self.__history_index.add(value)
         except Exception as e:
             EventLogHelper.log_error(
-                f"Error saving or updating model to {value}\n"
-                f"Details: {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
+                "Error saving or updating model to %s\n"
+                "Details: %s",
+                log_level=logging.CRITICAL,
+                args=(value, e)
             )
 
-        if len(result_ids) < 1:
+        if not is_saved:
             EventLogHelper.log_error(
-                f"Error objects to {APP_DATABASE}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
+                "Error objects to %s",
+                log_level=logging.CRITICAL,
+                args=(APP_DATABASE,)
             )
 
-    def search(self, query: Query) -> List[Optional[TorrentInfo]]:
+    def __create_data_classes(self, documents: List[Dict]) -> List[Optional[TorrentInfo]]:
         query_results: List[Optional[TorrentInfo]] = list()
-        documents: List[Document] = self.db.search(query)
         try:
             for document in documents:
                 data_class = self.model_helper.create_data_class(document)
                 query_results.append(data_class)
         except Exception as e:
             EventLogHelper.log_error(
-                f"Database value is not in a valid format {APP_DATABASE}\n"
-                f"Details: {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
+                "Database value is not in a valid format %s\n"
+                "Details: %s",
+                log_level=logging.CRITICAL,
+                args=(APP_DATABASE, e)
             )
         return query_results
 
+    def search(self, query: Query) -> List[Optional[TorrentInfo]]:
+        return self.__create_data_classes(self.storage.search(query))
+
+    def find_by(self, field: str, value: Any) -> List[Optional[TorrentInfo]]:
+        return self.__create_data_classes(self.storage.find_by(field, value))
+
     def get_all(self) -> List[Optional[TorrentInfo]]:
-        query_results: List[Optional[TorrentInfo]] = list()
-        documents: List[Document] = self.db.all()
-        try:
-            for document in documents:
-                data_class = self.model_helper.create_data_class(document)
-                query_results.append(data_class)
-        except Exception as e:
-            EventLogHelper.log_error(
-                f"Database value is not in a valid format {APP_DATABASE}\n"
-                f"Details: {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
-            )
-        return query_results
+        return self.__create_data_classes(self.storage.all())
@@ -0,0 +1,107 @@
+import re
+from threading import Lock
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from app.util import TitleMatcher
+
+
+class DownloadHistoryIndex:
+    """
+    In-memory index of the download history loaded once per run and kept in sync on writes, a torrent is
+    considered downloaded when its info hash, normalized release name or
+    (anime title, season, episode, release group, resolution) is already known, which also catches the same
+    episode re-uploaded under a slightly different name
+    """
+
+    __checksum_pattern = re.compile(r'\[[0-9a-f]{8}\]', re.IGNORECASE)
+    __extension_pattern = re.compile(r'\.(mkv|mp4|avi|torrent)$', re.IGNORECASE)
+    __version_pattern = re.compile(r'(\d)v\d+\b', re.IGNORECASE)
+    __season_pattern = re.compile(r'(?<![a-z0-9])(?:s|season[ ._]?)(\d{1,3})(?![0-9])', re.IGNORECASE)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__lock = Lock()
+        self.__hashes: Set[str] = set()
+        self.__names: Set[str] = set()
+        self.__episodes: Set[Tuple[str, str, str, str, str]] = set()
+
+    @staticmethod
+    def normalize_name(name: Optional[str]) -> str:
+        if not name:
+            return ""
+        name = DownloadHistoryIndex.__extension_pattern.sub('', name.strip())
+        name = DownloadHistoryIndex.__checksum_pattern.sub('', name)
+        name = DownloadHistoryIndex.__version_pattern.sub(r'\1', name)
+        return TitleMatcher.normalize(name)
+
+    @staticmethod
+    def __season_of(anime_info: Dict) -> str:
+        """
+        Season of the release, anitopy keeps `S3` or `Season 3` out of the title so records written before
+        the season was parsed fall back to the file name. Releases without a season count as the first one
+        """
+        season_number = anime_info.get('season_number')
+        if season_number is None:
+            for text in (anime_info.get('anime_title'), anime_info.get('file_name')):
+                season_match = DownloadHistoryIndex.__season_pattern.search(text or '')
+                if season_match is not None:
+                    season_number = season_match.group(1)
+                    break
+        try:
+            return str(int(season_number)) if season_number is not None else '1'
+        except (TypeError, ValueError):
+            return str(season_number)
+
+    @staticmethod
+    def __episode_key(anime_info: Optional[Dict]) -> Optional[Tuple[str, str, str, str, str]]:
+        if not anime_info or not anime_info.get('anime_title') or anime_info.get('episode_number') is None:
+            return None
+        try:
+            episode_number = f"{float(anime_info['episode_number']):g}"
+        except (TypeError, ValueError):
+            episode_number = str(anime_info['episode_number'])
+        return (
+            TitleMatcher.normalize(anime_info['anime_title']),
+            DownloadHistoryIndex.__season_of(anime_info),
+            episode_number,
+            (anime_info.get('release_group') or '').lower(),
+            (anime_info.get('video_resolution') or '').lower()
+        )
+
+    def __keys_of(self, document: Dict) -> Tuple[Optional[str], str, Optional[Tuple[str, str, str, str, str]]]:
+        info_hash = document.get('hash')
+        return (
+            info_hash.lower() if info_hash else None,
+            self.normalize_name(document.get('name')),
+            self.__episode_key(document.get('anime_info'))
+        )
+
+    def add(self, document: Dict) -> None:
+        """
+        Adds a history record, the dictionary form of a `TorrentInfo`
+        """
+        info_hash, name, episode_key = self.__keys_of(document)
+        with self.__lock:
+            if info_hash:
+                self.__hashes.add(info_hash)
+            if name:
+                self.__names.add(name)
+            if episode_key is not None:
+                self.__episodes.add(episode_key)
+
+    def add_all(self, documents: Iterable[Dict]) -> None:
+        for document in documents:
+            self.add(document)
+
+    def contains(self, document: Dict) -> bool:
+        """
+        Checks in constant time if a torrent, in its dictionary form, has already been downloaded
+        """
+        info_hash, name, episode_key = self.__keys_of(document)
+        with self.__lock:
+            return (info_hash is not None and info_hash in self.__hashes) \
+                   or (bool(name) and name in self.__names) \
+                   or (episode_key is not None and episode_key in self.__episodes)
+
+    def __len__(self) -> int:
+        return len(self.__names)
@@ -1,15 +1,81 @@
-from dataclasses import dataclass
-from typing import List, Optional
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 from plexapi.video import Show
 from anilist import MediaEntry
+from nyaa import TorrentInfo, ShowSearchState
 
 
 @dataclass()
-class DownloadableQueue:
-    shows_found_in_plex: List[Optional[Show]]
-    shows_missing_in_plex: List[Optional[MediaEntry]]
-    show_media_entry_in_plex: List[Optional[MediaEntry]]
+class SearchRequest:
+    media_entry: MediaEntry
+    show: Optional[Show]
 
-    def contains_items(self):
-        return self.shows_found_in_plex or self.shows_missing_in_plex or self.show_media_entry_in_plex
+    def is_missing_in_plex(self) -> bool:
+        return self.show is None
+
+
+@dataclass()
+class ReleaseBatch:
+    """
+    Releases of a single show which are handed over to the queue for a user, the search state and its page mark
+    are only saved once they have been queued so that they can't skip a release which never reached the client
+    """
+    media_entry: MediaEntry
+    show: Optional[Show]
+    torrent_infos: List[TorrentInfo]
+    search_state: Optional[ShowSearchState] = None
+    search_results: List[Dict] = field(default_factory=list)
+
+
+@dataclass()
+class UserProfile:
+    """
+    A user from anilist.json, `name` is None for a configuration without `users` which keeps the original storage
+    """
+    name: Optional[str]
+    variables: Dict = field(default_factory=dict)
+    section_library_name: Optional[str] = None
+    torrent_monitor_directory: Optional[str] = None
+    torrent_download_directory: Optional[str] = None
+
+    __settings = ('section_library_name', 'torrent_monitor_directory', 'torrent_download_directory')
+
+    def database_name(self, database_name: str) -> str:
+        """
+        Places a database of the user in its own directory, e.g. `database/history` -> `database/users/wax911/history`
+        :param database_name: path of the database relative to the app directory without extension
+        :return: path of the users database
+        """
+        if self.name is None:
+            return database_name
+        directory_path, file_name = os.path.split(database_name)
+        return os.path.join(directory_path, 'users', self.name, file_name)
+
+    @staticmethod
+    def load_all(anilist_config: Dict) -> List['UserProfile']:
+        """
+        Reads the users from anilist.json, every key outside of `users` is shared by all of them and
+        `section_library_name`, `torrent_monitor_directory` and `torrent_download_directory` are kept out of
+        the query variables
+        :param anilist_config: contents of anilist.json
+        :return: a profile for each user, or a single unnamed profile when there is no `users` key
+        """
+        users: Optional[List[Dict]] = anilist_config.get('users')
+        shared_variables = {key: value for key, value in anilist_config.items() if key != 'users'}
+        if users is None:
+            return [UserProfile(None, shared_variables)]
+
+        profiles: List[UserProfile] = list()
+        for user in users:
+            variables = dict(shared_variables)
+            variables.update({key: value for key, value in user.items() if key not in UserProfile.__settings})
+            user_name = str(user.get('userName') or user.get('userId'))
+            profiles.append(UserProfile(
+                re.sub(r'[^\w.-]', '_', user_name),
+                variables,
+                **{key: user[key] for key in UserProfile.__settings if key in user}
+            ))
+        return profiles
@@ -1 +1,9 @@
 from .io import StorageUtil, EventLogHelper
+from .limiter import RateLimiter
+from .concurrency import WorkerPool, TaskResult, PoolReport
+from .matcher import TitleMatcher, TitleMatch
+from .database import DocumentStorage, TinyDocumentStorage, SqliteDocumentStorage, create_document_storage, \
+    TINYDB_BACKEND, SQLITE_BACKEND
+from .cache import LruCache
+from .resilience import Resilience, CircuitBreaker, CircuitOpenError, RetryBudget
+from .metrics import Metrics
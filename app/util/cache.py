@@ -0,0 +1,85 @@
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Optional
+
+from .io import EventLogHelper
+
+
+class LruCache:
+    """
+    Thread safe least recently used cache with a bounded number of entries, values must be json serializable
+    so the cache can be persisted between runs
+    """
+
+    MISSING = object()
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__()
+        self.max_size = max(1, max_size)
+        self.hits: int = 0
+        self.misses: int = 0
+        self.__lock = Lock()
+        self.__entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        """
+        Looks up a value and marks it as recently used
+        :param key: cache key
+        :param default: returned when the key is not cached, `LruCache.MISSING` unless specified
+        :return: cached value or default
+        """
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return self.__entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any) -> None:
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def load(self, file_path: str) -> None:
+        """
+        Restores previously persisted entries, a missing or corrupt file leaves the cache empty
+        :param file_path: path of the json file
+        """
+        if not os.path.exists(file_path):
+            return
+        try:
+            with open(file_path, 'r') as reader:
+                entries = json.load(reader)
+            with self.__lock:
+                for key, value in entries[-self.max_size:]:
+                    self.__entries[key] = value
+        except Exception as e:
+            EventLogHelper.log_warning("Unable to load cache from %s -> %s", args=(file_path, e))
+
+    def save(self, file_path: Optional[str]) -> None:
+        """
+        Persists the entries from least to most recently used, the file is replaced atomically
+        :param file_path: path of the json file
+        """
+        with self.__lock:
+            entries = list(self.__entries.items())
+        temporary_file_path = f"{file_path}.tmp"
+        with open(temporary_file_path, 'w') as writer:
+            json.dump(entries, writer)
+        os.replace(temporary_file_path, file_path)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __str__(self) -> str:
+        return f"entries: {len(self.__entries)} | hits: {self.hits} | misses: {self.misses} " \
+               f"| hit rate: {self.hit_rate():.2%}"
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Callable, Iterable, List, Optional
+
+
+@dataclass()
+class TaskResult:
+    value: Any
+    elapsed: float
+    error: Optional[Exception]
+
+
+@dataclass()
+class PoolReport:
+    task_count: int
+    wall_time: float
+    busy_time: float
+
+    def speedup(self) -> float:
+        """
+        Estimated speedup against running every task one after another,
+        the serial cost is approximated by the sum of each task's own duration
+        :return: ratio of serial time to wall time
+        """
+        if self.wall_time <= 0:
+            return 1.0
+        return self.busy_time / self.wall_time
+
+
+class WorkerPool:
+    """
+    Bounded pool of worker threads which runs a function over a collection of items,
+    results are returned in the same order the items were submitted
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        super().__init__()
+        self.max_workers = max(1, max_workers)
+        self.report: Optional[PoolReport] = None
+
+    @staticmethod
+    def __run_timed(function: Callable, item: Any) -> TaskResult:
+        started = monotonic()
+        try:
+            return TaskResult(function(*item), monotonic() - started, None)
+        except Exception as e:
+            return TaskResult(None, monotonic() - started, e)
+
+    def map(self, function: Callable, items: Iterable[tuple]) -> List[TaskResult]:
+        """
+        Runs `function` for each tuple of arguments in `items`
+        :param function: callable which will be invoked with the unpacked tuple
+        :param items: argument tuples for each invocation
+        :return: list of task results in submission order
+        """
+        started = monotonic()
+        if self.max_workers < 2:
+            results = [self.__run_timed(function, item) for item in items]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self.__run_timed, function, item) for item in items]
+                results = [future.result() for future in futures]
+        self.report = PoolReport(
+            task_count=len(results),
+            wall_time=monotonic() - started,
+            busy_time=sum(result.elapsed for result in results)
+        )
+        return results
@@ -0,0 +1,284 @@
+import json
+import os
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+from threading import RLock
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tinydb import TinyDB, where
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
+
+from .io import StorageUtil, EventLogHelper
+
+TINYDB_BACKEND = 'tinydb'
+SQLITE_BACKEND = 'sqlite'
+
+
+class DocumentStorage(ABC):
+    """
+    Storage interface shared by the application stores, documents are plain dictionaries identified
+    by a key field and may be looked up through a set of indexed fields
+    """
+
+    def __init__(self, key_field: str, indexed_fields: List[str]) -> None:
+        super().__init__()
+        self.key_field = key_field
+        self.indexed_fields = indexed_fields
+
+    @abstractmethod
+    def upsert(self, document: Dict) -> bool:
+        """
+        Inserts the document or replaces the stored document with the same key
+        :return: True if the document was written
+        """
+
+    @abstractmethod
+    def bulk_write(self, upserts: Iterable[Dict], removals: Iterable[Any]) -> None:
+        """
+        Applies all upserts and removals (by key) with a single write
+        """
+
+    @abstractmethod
+    def find_by(self, field: str, value: Any) -> List[Dict]:
+        """
+        Finds every document where `field` equals `value`, indexed fields are resolved without a full scan
+        """
+
+    def search(self, query: Callable[[Dict], bool]) -> List[Dict]:
+        """
+        Finds every document matching a tinydb query or any other predicate
+        """
+        return [document for document in self.all() if query(document)]
+
+    @abstractmethod
+    def all(self) -> List[Dict]:
+        """
+        :return: every stored document
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class TinyDocumentStorage(DocumentStorage):
+
+    def __init__(self, file_path: str, key_field: str, indexed_fields: List[str]) -> None:
+        super().__init__(key_field, indexed_fields)
+        self.file_path = file_path
+        self.db: TinyDB = TinyDB(file_path)
+        self.__lock = RLock()
+
+    @staticmethod
+    def __replace_with(document: Dict) -> Callable[[Dict], None]:
+        """
+        TinyDB merges the fields of an update into the stored document, fields which are no longer
+        part of the document would stay around, so the stored document is cleared first
+        """
+        def transform(stored_document: Dict) -> None:
+            stored_document.clear()
+            stored_document.update(document)
+        return transform
+
+    def upsert(self, document: Dict) -> bool:
+        with self.__lock:
+            doc_ids = [stored.doc_id for stored in self.db.search(where(self.key_field) == document[self.key_field])]
+            if doc_ids:
+                return len(self.db.update(self.__replace_with(document), doc_ids=doc_ids)) > 0
+            self.db.insert(document)
+            return True
+
+    def bulk_write(self, upserts: Iterable[Dict], removals: Iterable[Any]) -> None:
+        write_cache = CachingMiddleware(JSONStorage)
+        write_cache.WRITE_CACHE_SIZE = sys.maxsize
+        self.__lock.acquire()
+        db = TinyDB(self.file_path, storage=write_cache)
+        try:
+            stored_ids: Dict[Any, int] = {document[self.key_field]: document.doc_id for document in db.all()}
+            insertions: List[Dict] = list()
+            for document in upserts:
+                doc_id = stored_ids.get(document[self.key_field])
+                if doc_id is None:
+                    insertions.append(document)
+                else:
+                    db.update(self.__replace_with(document), doc_ids=[doc_id])
+            if insertions:
+                db.insert_multiple(insertions)
+            removal_ids = [stored_ids[key] for key in removals if key in stored_ids]
+            if removal_ids:
+                db.remove(doc_ids=removal_ids)
+        finally:
+            db.close()
+            self.db.clear_cache()
+            self.__lock.release()
+
+    def find_by(self, field: str, value: Any) -> List[Dict]:
+        with self.__lock:
+            return self.db.search(where(field) == value)
+
+    def search(self, query: Callable[[Dict], bool]) -> List[Dict]:
+        with self.__lock:
+            return self.db.search(query)
+
+    def all(self) -> List[Dict]:
+        with self.__lock:
+            return self.db.all()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.db.close()
+
+
+class SqliteDocumentStorage(DocumentStorage):
+    """
+    SQLite backed storage, documents are stored as json alongside a column with an index for each indexed field.
+    The database runs in WAL mode, and `batch` groups several writes into one transaction.
+    """
+
+    def __init__(self, file_path: str, key_field: str, indexed_fields: List[str]) -> None:
+        super().__init__(key_field, indexed_fields)
+        self.file_path = file_path
+        self.__lock = RLock()
+        self.__batch_depth: int = 0
+        self.__columns: List[str] = [self.__column_of(field) for field in indexed_fields]
+        self.connection = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.__create_schema()
+
+    @staticmethod
+    def __column_of(field: str) -> str:
+        return f"field_{field}"
+
+    def __create_schema(self) -> None:
+        columns = ''.join(f", {column}" for column in self.__columns)
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS documents (document_key TEXT PRIMARY KEY, document TEXT NOT NULL{columns})"
+        )
+        for column in self.__columns:
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS index_{column} ON documents ({column})")
+
+    def __row_of(self, document: Dict) -> tuple:
+        return (
+            str(document[self.key_field]),
+            json.dumps(document),
+            *(document.get(field) for field in self.indexed_fields)
+        )
+
+    def __write(self, statement: str, parameters: Iterable[tuple]) -> None:
+        with self.__lock:
+            if self.__batch_depth > 0:
+                self.connection.executemany(statement, parameters)
+            else:
+                self.connection.execute('BEGIN')
+                try:
+                    self.connection.executemany(statement, parameters)
+                    self.connection.execute('COMMIT')
+                except Exception:
+                    self.connection.execute('ROLLBACK')
+                    raise
+
+    def __upsert_statement(self) -> str:
+        columns = ''.join(f", {column}" for column in self.__columns)
+        placeholders = ', ?' * len(self.__columns)
+        return f"INSERT OR REPLACE INTO documents (document_key, document{columns}) VALUES (?, ?{placeholders})"
+
+    def batch(self) -> 'SqliteDocumentStorage':
+        """
+        Context manager which groups every write made inside it into a single transaction
+        """
+        return self
+
+    def __enter__(self) -> 'SqliteDocumentStorage':
+        self.__lock.acquire()
+        if self.__batch_depth == 0:
+            self.connection.execute('BEGIN')
+        self.__batch_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.__batch_depth -= 1
+        try:
+            if self.__batch_depth == 0:
+                self.connection.execute('ROLLBACK' if exc_type is not None else 'COMMIT')
+        finally:
+            self.__lock.release()
+
+    def upsert(self, document: Dict) -> bool:
+        self.__write(self.__upsert_statement(), [self.__row_of(document)])
+        return True
+
+    def bulk_write(self, upserts: Iterable[Dict], removals: Iterable[Any]) -> None:
+        with self.batch():
+            self.__write(self.__upsert_statement(), [self.__row_of(document) for document in upserts])
+            self.__write('DELETE FROM documents WHERE document_key = ?', [(str(key),) for key in removals])
+
+    def __select(self, statement: str, parameters: tuple = ()) -> List[Dict]:
+        with self.__lock:
+            rows = self.connection.execute(statement, parameters).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def find_by(self, field: str, value: Any) -> List[Dict]:
+        if field == self.key_field:
+            return self.__select('SELECT document FROM documents WHERE document_key = ?', (str(value),))
+        if field in self.indexed_fields:
+            return self.__select(f"SELECT document FROM documents WHERE {self.__column_of(field)} = ?", (value,))
+        return [document for document in self.all() if document.get(field) == value]
+
+    def all(self) -> List[Dict]:
+        return self.__select('SELECT document FROM documents')
+
+    def count(self) -> int:
+        with self.__lock:
+            return self.connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def migrate_from(self, tinydb_file_path: str) -> int:
+        """
+        One-shot import of an existing tinydb file, the file is renamed once its documents have been copied
+        :param tinydb_file_path: path of the tinydb json file
+        :return: number of migrated documents
+        """
+        if not os.path.exists(tinydb_file_path) or self.count() > 0:
+            return 0
+        source = TinyDB(tinydb_file_path)
+        try:
+            documents = source.all()
+        finally:
+            source.close()
+        self.bulk_write(documents, list())
+        os.rename(tinydb_file_path, f"{tinydb_file_path}.migrated")
+        EventLogHelper.log_info(
+            "Migrated %s documents from %s to %s", args=(len(documents), tinydb_file_path, self.file_path)
+        )
+        return len(documents)
+
+    def close(self) -> None:
+        with self.__lock:
+            self.connection.close()
+
+
+def create_document_storage(
+        backend: Optional[str],
+        database_name: str,
+        key_field: str,
+        indexed_fields: List[str]
+) -> DocumentStorage:
+    """
+    Creates the storage for a database, e.g. `database/history` becomes `database/history.db` for tinydb
+    and `database/history.sqlite3` for sqlite, in which case any existing tinydb file is migrated on first use
+    :param backend: `tinydb` or `sqlite`
+    :param database_name: path of the database relative to the app directory without extension
+    :param key_field: field which identifies a document
+    :param indexed_fields: fields which are used for look ups
+    :return: document storage
+    """
+    tinydb_file_path = StorageUtil.create_base_path(f"{database_name}.db")
+    os.makedirs(os.path.dirname(tinydb_file_path), exist_ok=True)
+    if backend == SQLITE_BACKEND:
+        storage = SqliteDocumentStorage(
+            StorageUtil.create_base_path(f"{database_name}.sqlite3"), key_field, indexed_fields
+        )
+        storage.migrate_from(tinydb_file_path)
+        return storage
+    return TinyDocumentStorage(tinydb_file_path, key_field, indexed_fields)
@@ -1,16 +1,20 @@
-import inspect
+import atexit
 import os
+import sys
 import json
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Any, Union
+from queue import Queue
+from threading import Lock
+from typing import Optional, Any, Tuple, Union
 
 from requests import Response
 
 
 class StorageUtil:
-    __file_buffer_size: int = 1024
+    __file_buffer_size: int = 64 * 1024
 
     @staticmethod
     def __get_base_dir():
@@ -44,9 +48,7 @@ class StorageUtil:
                 contents = reader.read()
             return contents
         else:
-            EventLogHelper.log_warning(f"File cannot be found file_path -> {file_path}",
-                                       __name__,
-                                       inspect.currentframe().f_code.co_name)
+            EventLogHelper.log_warning("File cannot be found file_path -> %s", args=(file_path,))
             return None
 
     @staticmethod
@@ -64,20 +66,15 @@ class StorageUtil:
         if not os.path.exists(creation_path):
             path = Path(creation_path)
             path.mkdir(parents=True, exist_ok=True)
-        with open(os.path.join(creation_path, filename), write_mode) as writer:
-            EventLogHelper.log_info(
-                f"Downloading file -> {filename}",
-                __name__,
-                inspect.currentframe().f_code.co_name
-            )
+        file_path = os.path.join(creation_path, filename)
+        temporary_path = f"{file_path}.part"
+        written = 0
+        with open(temporary_path, write_mode) as writer:
             for chunk in contents.iter_content(chunk_size=StorageUtil.__file_buffer_size):
                 if chunk:
-                    written = writer.write(chunk)
-                    EventLogHelper.log_info(
-                        f"Downloading {written}",
-                        __name__,
-                        inspect.currentframe().f_code.co_name
-                    )
+                    written += writer.write(chunk)
+        os.replace(temporary_path, file_path)
+        EventLogHelper.log_info("Downloaded file -> %s | %s bytes", args=(filename, written))
 
     @staticmethod
     def create_file(directory_path: str, filename: str, contents: Any) -> str:
@@ -112,57 +109,120 @@ class StorageUtil:
                 os.remove(source_file_path)
             return True
         else:
-            EventLogHelper.log_info(f"Destination directory does not exist",
-                                    "copy_or_move_file",
-                                    inspect.currentframe().f_code.co_name)
+            EventLogHelper.log_info("Destination directory does not exist")
         return False
 
 
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Hands the record over to the listener thread as is, formatting is left to the listener's handlers
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _ScreenFilter(logging.Filter):
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return getattr(record, 'print_to_screen', True)
+
+
 class EventLogHelper:
-    LOG_FORMAT = '%(asctime)s | %(levelname)s | %(module)s | %(source)s | %(message)s'
+    LOG_FORMAT = '%(asctime)s | %(levelname)s | %(module_name)s | %(source)s | %(message)s'
     TIME_FORMAT = '%d/%m/%Y %I:%M:%S %p'
+    LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT = 5
+
+    __logger: Optional[logging.Logger] = None
+    __listener: Optional[QueueListener] = None
+    __lock = Lock()
 
     @staticmethod
     def __get_current_date_time() -> Any:
         return datetime.now().strftime("%d_%b_%Y")
 
     @staticmethod
-    def __get_log_file(postfix: str) -> str:
+    def __get_log_file() -> str:
         file_name = f'{EventLogHelper.__get_current_date_time()}.log'
         current_directory = os.path.abspath(os.path.dirname(__file__))
         directory_path = os.path.join(current_directory, '..', 'logs')
-        return StorageUtil.create_file(directory_path, file_name, '')
-
-    @staticmethod
-    def log_info(message: Any, module_name: str, function_name: str, print_to_screen=True):
-        logging.basicConfig(filename=EventLogHelper.__get_log_file("INFO"),
-                            format=EventLogHelper.LOG_FORMAT,
-                            datefmt=EventLogHelper.TIME_FORMAT,
-                            level=logging.INFO)
-        bundle = {'module_name': module_name, 'source': function_name}
-        logger = logging.getLogger(__name__)
-        logger.info(f"{message}", extra=bundle)
-        if print_to_screen:
-            print(f"{message}")
-
-    @staticmethod
-    def log_warning(message: Any, module_name: str, function_name: str):
-        logging.basicConfig(filename=EventLogHelper.__get_log_file("WARNING"),
-                            format=EventLogHelper.LOG_FORMAT,
-                            datefmt=EventLogHelper.TIME_FORMAT,
-                            level=logging.WARNING)
-        bundle = {'module_name': module_name, 'source': function_name}
-        logger = logging.getLogger(__name__)
-        logger.warning(f"{message}", extra=bundle)
-        print(f"{message}")
-
-    @staticmethod
-    def log_error(message: Any, module_name: str, function_name: str, log_level=logging.ERROR):
-        logging.basicConfig(filename=EventLogHelper.__get_log_file("ERROR"),
-                            format=EventLogHelper.LOG_FORMAT,
-                            datefmt=EventLogHelper.TIME_FORMAT,
-                            level=log_level)
-        bundle = {'module_name': module_name, 'source': function_name}
-        logger = logging.getLogger(__name__)
-        logger.error(f"{message}", extra=bundle)
-        print(f"{message}")
+        Path(directory_path).mkdir(parents=True, exist_ok=True)
+        return os.path.join(directory_path, file_name)
+
+    @staticmethod
+    def configure(level: Union[int, str] = logging.INFO, log_file: Optional[str] = None) -> logging.Logger:
+        """
+        Sets up logging once for the whole process, records are put on a queue and written to a rotating
+        log file and the screen by a background listener so that callers never wait on I/O.
+        Calling this again only changes the level
+        :param level: minimum level which will be logged
+        :param log_file: path of the log file, defaults to a dated file in the app/logs directory
+        :return: the configured logger
+        """
+        with EventLogHelper.__lock:
+            if EventLogHelper.__logger is None:
+                file_handler = RotatingFileHandler(
+                    log_file or EventLogHelper.__get_log_file(),
+                    maxBytes=EventLogHelper.LOG_FILE_MAX_BYTES,
+                    backupCount=EventLogHelper.LOG_FILE_BACKUP_COUNT,
+                    encoding='utf-8'
+                )
+                file_handler.setFormatter(logging.Formatter(EventLogHelper.LOG_FORMAT, EventLogHelper.TIME_FORMAT))
+                screen_handler = logging.StreamHandler(sys.stdout)
+                screen_handler.setFormatter(logging.Formatter('%(message)s'))
+                screen_handler.addFilter(_ScreenFilter())
+
+                log_queue: Queue = Queue()
+                logger = logging.getLogger(__name__)
+                logger.propagate = False
+                logger.addHandler(_DeferredQueueHandler(log_queue))
+                EventLogHelper.__listener = QueueListener(
+                    log_queue, file_handler, screen_handler, respect_handler_level=True
+                )
+                EventLogHelper.__listener.start()
+                atexit.register(EventLogHelper.shutdown)
+                EventLogHelper.__logger = logger
+            EventLogHelper.__logger.setLevel(level)
+            return EventLogHelper.__logger
+
+    @staticmethod
+    def shutdown() -> None:
+        """
+        Writes out every queued record and stops the background listener
+        """
+        with EventLogHelper.__lock:
+            if EventLogHelper.__listener is not None:
+                EventLogHelper.__listener.stop()
+                EventLogHelper.__listener = None
+
+    @staticmethod
+    def __log(level: int, message: Any, module_name: Optional[str], function_name: Optional[str],
+              print_to_screen: bool = True, args: Tuple = ()) -> None:
+        logger = EventLogHelper.__logger or EventLogHelper.configure()
+        if not logger.isEnabledFor(level):
+            return
+        if function_name is None or module_name is None:
+            # frame of the caller of log_info / log_warning / log_error
+            caller = sys._getframe(2)
+            function_name = function_name or caller.f_code.co_name
+            module_name = module_name or caller.f_globals.get('__name__')
+        bundle = {'module_name': module_name, 'source': function_name, 'print_to_screen': print_to_screen}
+        # the call site is already known, so skip the stack walk `logger.log` would do to find it,
+        # `message % args` is left to the handlers on the listener thread
+        logger.handle(logger.makeRecord(logger.name, level, '', 0, message, args or None, None, extra=bundle))
+
+    @staticmethod
+    def log_info(message: Any, module_name: Optional[str] = None, function_name: Optional[str] = None,
+                 print_to_screen=True, args: Tuple = ()):
+        EventLogHelper.__log(logging.INFO, message, module_name, function_name, print_to_screen, args)
+
+    @staticmethod
+    def log_warning(message: Any, module_name: Optional[str] = None, function_name: Optional[str] = None,
+                    args: Tuple = ()):
+        EventLogHelper.__log(logging.WARNING, message, module_name, function_name, args=args)
+
+    @staticmethod
+    def log_error(message: Any, module_name: Optional[str] = None, function_name: Optional[str] = None,
+                  log_level=logging.ERROR, args: Tuple = ()):
+        EventLogHelper.__log(max(log_level, logging.ERROR), message, module_name, function_name, args=args)
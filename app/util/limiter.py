@@ -0,0 +1,40 @@
+from threading import Lock
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    """
+    Token bucket shared between workers, each outbound request takes one token and tokens are refilled
+    at one per `interval` seconds up to `burst` tokens. Only network calls should acquire from the limiter,
+    local parsing and filtering should never be throttled.
+    """
+
+    def __init__(self, interval: float, burst: int = 1) -> None:
+        super().__init__()
+        self.interval = max(0.0, interval)
+        self.burst = max(1, burst)
+        self.__lock = Lock()
+        self.__tokens: float = float(self.burst)
+        self.__updated_at: float = monotonic()
+
+    def __refill(self, now: float) -> None:
+        if self.interval > 0:
+            elapsed = now - self.__updated_at
+            self.__tokens = min(float(self.burst), self.__tokens + elapsed / self.interval)
+        else:
+            self.__tokens = float(self.burst)
+        self.__updated_at = now
+
+    def acquire(self) -> float:
+        """
+        Takes a token from the bucket, blocking the calling thread until one is available.
+        When the bucket is empty the token is reserved ahead of time so waiting threads are served in order.
+        :return: the number of seconds the caller had to wait
+        """
+        with self.__lock:
+            self.__refill(monotonic())
+            self.__tokens -= 1
+            wait_time = -self.__tokens * self.interval if self.__tokens < 0 else 0.0
+        if wait_time > 0:
+            sleep(wait_time)
+        return wait_time
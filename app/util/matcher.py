@@ -0,0 +1,154 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from heapq import nlargest
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from unidecode import unidecode
+
+
+@dataclass()
+class TitleMatch:
+    item: Any
+    title: str
+    search_term: str
+    score: float
+
+
+class TitleMatcher:
+    """
+    Fuzzy title matching over a large collection of titles. Every title is normalized and split into
+    character trigrams once, an inverted index from trigram to title bounds the candidates for each search term
+    and candidates are ranked by the Sørensen–Dice coefficient of their trigram sets.
+    """
+
+    __non_word_pattern = re.compile(r'[^a-z0-9]+')
+
+    def __init__(self, candidate_limit: int = 32) -> None:
+        super().__init__()
+        self.candidate_limit = candidate_limit
+        self.__items: List[Any] = list()
+        self.__titles: List[str] = list()
+        self.__title_trigrams: List[FrozenSet[str]] = list()
+        self.__exact_index: Dict[str, List[int]] = dict()
+        self.__trigram_index: Dict[str, List[int]] = dict()
+
+    @staticmethod
+    def normalize(title: Optional[str]) -> str:
+        """
+        Transliterates, lowercases and strips punctuation so that minor differences in naming still match
+        :param title: title to normalize
+        :return: normalized title
+        """
+        if not title:
+            return ""
+        return TitleMatcher.__non_word_pattern.sub(' ', unidecode(title).lower()).strip()
+
+    @staticmethod
+    def trigrams(normalized_title: str) -> FrozenSet[str]:
+        padded_title = f"  {normalized_title} "
+        return frozenset(padded_title[index:index + 3] for index in range(len(padded_title) - 2))
+
+    @staticmethod
+    def similarity(title: Optional[str], other_title: Optional[str]) -> float:
+        """
+        Dice coefficient of the trigram sets of two titles
+        :return: score between 0 and 1
+        """
+        normalized_title = TitleMatcher.normalize(title)
+        normalized_other_title = TitleMatcher.normalize(other_title)
+        if not normalized_title or not normalized_other_title:
+            return 0.0
+        if normalized_title == normalized_other_title:
+            return 1.0
+        trigrams = TitleMatcher.trigrams(normalized_title)
+        other_trigrams = TitleMatcher.trigrams(normalized_other_title)
+        return 2 * len(trigrams & other_trigrams) / (len(trigrams) + len(other_trigrams))
+
+    def add(self, item: Any, titles: Iterable[Optional[str]]) -> None:
+        """
+        Indexes an item under each of its titles
+        :param item: value returned when one of the titles matches
+        :param titles: titles the item is known by
+        """
+        for title in titles:
+            normalized_title = self.normalize(title)
+            if not normalized_title:
+                continue
+            entry_id = len(self.__titles)
+            trigrams = self.trigrams(normalized_title)
+            self.__items.append(item)
+            self.__titles.append(title)
+            self.__title_trigrams.append(trigrams)
+            self.__exact_index.setdefault(normalized_title, list()).append(entry_id)
+            for trigram in trigrams:
+                self.__trigram_index.setdefault(trigram, list()).append(entry_id)
+
+    def __score_candidates(self, search_term: str) -> List[Tuple[int, float]]:
+        normalized_term = self.normalize(search_term)
+        if not normalized_term:
+            return list()
+        exact_matches = self.__exact_index.get(normalized_term)
+        if exact_matches:
+            return [(entry_id, 1.0) for entry_id in exact_matches]
+
+        term_trigrams = self.trigrams(normalized_term)
+        shared_counts: Counter = Counter()
+        for trigram in term_trigrams:
+            postings = self.__trigram_index.get(trigram)
+            if postings:
+                shared_counts.update(postings)
+
+        term_size = len(term_trigrams)
+        scored_candidates = (
+            (entry_id, 2 * shared / (term_size + len(self.__title_trigrams[entry_id])))
+            for entry_id, shared in shared_counts.items()
+        )
+        return nlargest(self.candidate_limit, scored_candidates, key=lambda candidate: candidate[1])
+
+    def match(
+            self,
+            search_terms: Iterable[str],
+            threshold: float = 0.0,
+            limit: Optional[int] = None
+    ) -> List[TitleMatch]:
+        """
+        Matches all search terms against every indexed title in one pass, each item is ranked by its best score
+        :param search_terms: alternative titles to look for
+        :param threshold: minimum score a match should have
+        :param limit: maximum number of matches to return
+        :return: matches ordered from best to worst score
+        """
+        best_matches: Dict[int, TitleMatch] = dict()
+        for search_term in search_terms:
+            for entry_id, score in self.__score_candidates(search_term):
+                if score < threshold:
+                    continue
+                item = self.__items[entry_id]
+                best_match = best_matches.get(id(item))
+                if best_match is None or score > best_match.score:
+                    best_matches[id(item)] = TitleMatch(item, self.__titles[entry_id], search_term, score)
+        ranked_matches = sorted(best_matches.values(), key=lambda title_match: title_match.score, reverse=True)
+        return ranked_matches[:limit] if limit is not None else ranked_matches
+
+    def best_match(self, search_terms: Iterable[str], threshold: float = 0.0) -> Optional[TitleMatch]:
+        """
+        Picks the single highest scoring title, so that sequels and specials with similar titles are not matched
+        along with it. Ties go to a title which is equal to its search term once normalized
+        :param search_terms: alternative titles to look for
+        :param threshold: minimum score a match should have
+        :return: the best match or None if nothing scored at least `threshold`
+        """
+        title_matches = self.match(search_terms, threshold)
+        if not title_matches:
+            return None
+        best_score = title_matches[0].score
+        for title_match in title_matches:
+            if title_match.score < best_score:
+                break
+            if self.normalize(title_match.title) == self.normalize(title_match.search_term):
+                return title_match
+        return title_matches[0]
+
+    def __len__(self) -> int:
+        return len(self.__titles)
@@ -0,0 +1,193 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, time
+from typing import Dict, Optional, Tuple
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _NullSpan:
+    """
+    Shared span used while metrics are disabled, entering and leaving it does nothing
+    """
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+class _Span:
+
+    def __init__(self, key: LabelKey) -> None:
+        self.key = key
+        self.started = 0.0
+
+    def __enter__(self) -> '_Span':
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        Metrics.observe(self.key, perf_counter() - self.started, exc_type is not None)
+
+
+class Metrics:
+    """
+    Process wide timing spans and counters for a single run, written out as a prometheus textfile and a
+    json summary once the run is over. Every method returns immediately while metrics are disabled
+    """
+    PREFIX = 'anime_scrobbler'
+
+    enabled: bool = False
+    __null_span = _NullSpan()
+    __lock = Lock()
+    __started_at: Optional[float] = None
+    __counters: Dict[LabelKey, float] = dict()
+    # span key -> [count, total seconds, max seconds, errors]
+    __spans: Dict[LabelKey, list] = dict()
+
+    @staticmethod
+    def __key_of(name: str, labels: Dict[str, str]) -> LabelKey:
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    @staticmethod
+    def configure(enabled: bool) -> None:
+        """
+        Enables or disables collection and starts a new run
+        :param enabled: when False spans and counters cost a single attribute check
+        """
+        with Metrics.__lock:
+            Metrics.enabled = enabled
+            Metrics.__started_at = time()
+            Metrics.__counters = dict()
+            Metrics.__spans = dict()
+
+    @staticmethod
+    def span(name: str, **labels):
+        """
+        Times the enclosed block, e.g. `with Metrics.span('outbound_call', host='nyaa.si'):`
+        :param name: name of the span
+        :param labels: optional labels to tell spans of the same name apart
+        :return: context manager
+        """
+        if not Metrics.enabled:
+            return Metrics.__null_span
+        return _Span(Metrics.__key_of(name, labels))
+
+    @staticmethod
+    def observe(key: LabelKey, seconds: float, failed: bool = False) -> None:
+        with Metrics.__lock:
+            observation = Metrics.__spans.setdefault(key, [0, 0.0, 0.0, 0])
+            observation[0] += 1
+            observation[1] += seconds
+            observation[2] = max(observation[2], seconds)
+            observation[3] += 1 if failed else 0
+
+    @staticmethod
+    def increment(name: str, value: float = 1, **labels) -> None:
+        """
+        Adds to a counter, e.g. `Metrics.increment('requests', host='nyaa.si')`
+        """
+        if not Metrics.enabled:
+            return
+        key = Metrics.__key_of(name, labels)
+        with Metrics.__lock:
+            Metrics.__counters[key] = Metrics.__counters.get(key, 0) + value
+
+    @staticmethod
+    def __escape(value: str) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @staticmethod
+    def __format_labels(labels: Tuple[Tuple[str, str], ...], **extra_labels) -> str:
+        pairs = list(labels) + sorted(extra_labels.items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{label}="{Metrics.__escape(value)}"' for label, value in pairs) + '}'
+
+    @staticmethod
+    def __write_atomically(file_path: str, contents: str) -> None:
+        Path(os.path.dirname(file_path)).mkdir(parents=True, exist_ok=True)
+        temporary_path = f"{file_path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as writer:
+            writer.write(contents)
+        os.replace(temporary_path, file_path)
+
+    @staticmethod
+    def write_textfile(file_path: str) -> None:
+        """
+        Writes the last run in the prometheus text format, for the node exporter textfile collector
+        :param file_path: should end with .prom
+        """
+        if not Metrics.enabled:
+            return
+        prefix = Metrics.PREFIX
+        finished_at = time()
+        lines = [
+            f"# HELP {prefix}_last_run_timestamp_seconds Unix time the last run finished",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {finished_at:.3f}",
+            f"# HELP {prefix}_last_run_duration_seconds Duration of the last run",
+            f"# TYPE {prefix}_last_run_duration_seconds gauge",
+            f"{prefix}_last_run_duration_seconds {finished_at - (Metrics.__started_at or finished_at):.6f}",
+        ]
+        with Metrics.__lock:
+            spans = sorted(Metrics.__spans.items())
+            counters = sorted(Metrics.__counters.items())
+        span_metrics = [
+            ('span_count', 'Number of times the span was entered in the last run', 0),
+            ('span_seconds', 'Total time spent in the span in the last run', 1),
+            ('span_max_seconds', 'Longest single span in the last run', 2),
+            ('span_errors', 'Spans which ended with an exception in the last run', 3),
+        ]
+        for metric_name, description, index in span_metrics:
+            lines.append(f"# HELP {prefix}_last_run_{metric_name} {description}")
+            lines.append(f"# TYPE {prefix}_last_run_{metric_name} gauge")
+            for (name, labels), observation in spans:
+                lines.append(f"{prefix}_last_run_{metric_name}{Metrics.__format_labels(labels, span=name)} "
+                             f"{observation[index]:g}")
+        described = set()
+        for (name, labels), value in counters:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {prefix}_last_run_{name} Count of {name.replace('_', ' ')} in the last run")
+                lines.append(f"# TYPE {prefix}_last_run_{name} gauge")
+            lines.append(f"{prefix}_last_run_{name}{Metrics.__format_labels(labels)} {value:g}")
+        Metrics.__write_atomically(file_path, '\n'.join(lines) + '\n')
+
+    @staticmethod
+    def summary() -> Dict:
+        """
+        :return: spans and counters of the run as a json serializable dictionary
+        """
+        finished_at = time()
+        with Metrics.__lock:
+            spans = sorted(Metrics.__spans.items())
+            counters = sorted(Metrics.__counters.items())
+        return {
+            'started_at': datetime.fromtimestamp(Metrics.__started_at or finished_at).isoformat(timespec='seconds'),
+            'finished_at': datetime.fromtimestamp(finished_at).isoformat(timespec='seconds'),
+            'duration_seconds': round(finished_at - (Metrics.__started_at or finished_at), 3),
+            'spans': [
+                {
+                    'name': name, 'labels': dict(labels), 'count': observation[0],
+                    'seconds': round(observation[1], 6), 'max_seconds': round(observation[2], 6),
+                    'errors': observation[3]
+                }
+                for (name, labels), observation in spans
+            ],
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in counters]
+        }
+
+    @staticmethod
+    def write_summary(file_path: str) -> None:
+        """
+        Writes the json summary of the run
+        """
+        if not Metrics.enabled:
+            return
+        Metrics.__write_atomically(file_path, json.dumps(Metrics.summary(), indent=2))
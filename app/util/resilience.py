@@ -0,0 +1,225 @@
+import random
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from time import monotonic, sleep, time
+from typing import Any, Callable, Dict, Optional
+
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout, ChunkedEncodingError
+
+from .io import EventLogHelper
+from .metrics import Metrics
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling a service which has failed repeatedly and is assumed to be down
+    """
+
+
+class RetryBudget:
+    """
+    Upper bound on the number of retries across all services for the whole run
+    """
+
+    def __init__(self, max_retries: int) -> None:
+        super().__init__()
+        self.max_retries = max_retries
+        self.used: int = 0
+        self.__lock = Lock()
+
+    def reset(self) -> None:
+        """
+        Starts a new run with the full budget
+        """
+        with self.__lock:
+            self.used = 0
+
+    def consume(self) -> bool:
+        """
+        :return: True if a retry may be made, the retry is counted against the budget
+        """
+        with self.__lock:
+            if self.used >= self.max_retries:
+                return False
+            self.used += 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, calls fail fast while the circuit is open
+    and after `reset_timeout` seconds a single trial call is let through to probe if the service is back
+    """
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: float) -> None:
+        super().__init__()
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_count: int = 0
+        self.opened_at: Optional[float] = None
+        self.__trial_in_progress = False
+        self.__lock = Lock()
+
+    def before_call(self) -> None:
+        with self.__lock:
+            if self.opened_at is None:
+                return
+            if monotonic() - self.opened_at >= self.reset_timeout and not self.__trial_in_progress:
+                self.__trial_in_progress = True
+                return
+        raise CircuitOpenError(f"Circuit for `{self.host}` is open, skipping call")
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.failure_count = 0
+            self.opened_at = None
+            self.__trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.failure_count += 1
+            if self.__trial_in_progress or self.failure_count >= self.failure_threshold:
+                self.opened_at = monotonic()
+            self.__trial_in_progress = False
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+
+class Resilience:
+    """
+    Shared retry layer for outbound calls, failed calls are retried with jittered exponential backoff
+    (or after the delay requested through a Retry-After / X-RateLimit-Reset header), every host has its own
+    circuit breaker and all retries are drawn from a single budget for the run
+    """
+
+    __transport_errors = (RequestsConnectionError, Timeout, ChunkedEncodingError, ConnectionError)
+
+    def __init__(
+            self,
+            max_attempts: int = 4,
+            base_delay: float = 2.0,
+            max_delay: float = 60.0,
+            retry_budget: int = 50,
+            failure_threshold: int = 5,
+            reset_timeout: float = 120.0
+    ) -> None:
+        super().__init__()
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = RetryBudget(retry_budget)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.retry_count: int = 0
+        self.__breakers: Dict[str, CircuitBreaker] = dict()
+        self.__lock = Lock()
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self.__lock:
+            if host not in self.__breakers:
+                self.__breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return self.__breakers[host]
+
+    @staticmethod
+    def __status_code_of(error: Exception) -> Optional[int]:
+        response = getattr(error, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+        if status_code is None:
+            # gql reports the status of a failed http request through `code`
+            status_code = getattr(error, 'code', None)
+        return status_code if isinstance(status_code, int) else None
+
+    @staticmethod
+    def requested_delay(error: Exception) -> Optional[float]:
+        """
+        Reads the delay a server asked for through the Retry-After or X-RateLimit-Reset headers
+        :param error: exception raised by the call, usually a requests HTTPError
+        :return: delay in seconds or None if the server did not ask for one
+        """
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if not headers:
+            return None
+        retry_after = headers.get('Retry-After')
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time())
+                except (TypeError, ValueError):
+                    pass
+        rate_limit_reset = headers.get('X-RateLimit-Reset')
+        if rate_limit_reset and headers.get('X-RateLimit-Remaining') == '0':
+            try:
+                return max(0.0, float(rate_limit_reset) - time())
+            except ValueError:
+                pass
+        return None
+
+    def __backoff_delay(self, attempt: int, error: Exception) -> float:
+        requested_delay = self.requested_delay(error)
+        if requested_delay is not None:
+            return min(requested_delay, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def is_retryable(self, error: Exception) -> bool:
+        return self.is_host_failure(error)
+
+    def is_host_failure(self, error: Exception) -> bool:
+        """
+        Only transport errors, server errors and rate limiting are retried and count towards opening a circuit,
+        a client error such as a 404, an invalid response or a bug means the host answered just fine
+        """
+        if isinstance(error, self.__transport_errors):
+            return True
+        status_code = self.__status_code_of(error)
+        return status_code is not None and (status_code >= 500 or status_code == 429)
+
+    def call(self, host: str, function: Callable, *args, **kwargs) -> Any:
+        """
+        Calls the function guarded by the circuit breaker of the host, retrying failures while attempts
+        and the retry budget allow it
+        :param host: name of the service being called e.g. `nyaa.si`
+        :param function: the outbound call
+        :return: the return value of the function
+        """
+        breaker = self.breaker(host)
+        attempt = 0
+        while True:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                Metrics.increment('circuit_open_skips', host=host)
+                raise
+            Metrics.increment('requests', host=host)
+            try:
+                with Metrics.span('outbound_call', host=host, operation=function.__name__):
+                    result = function(*args, **kwargs)
+                breaker.record_success()
+                return result
+            except Exception as e:
+                Metrics.increment('request_failures', host=host)
+                if self.is_host_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                attempt += 1
+                if attempt >= self.max_attempts or not self.is_retryable(e) or breaker.is_open() \
+                        or not self.budget.consume():
+                    raise
+                delay = self.__backoff_delay(attempt, e)
+                with self.__lock:
+                    self.retry_count += 1
+                Metrics.increment('retries', host=host)
+                EventLogHelper.log_warning(
+                    "Call to `%s` failed, retrying in %.1fs -> attempt: `%s` | reason: `%s`",
+                    args=(host, delay, attempt, e)
+                )
+                sleep(delay)
+
+    def __str__(self) -> str:
+        open_circuits = [host for host, breaker in self.__breakers.items() if breaker.is_open()]
+        return f"retries: {self.retry_count} | retry budget used: {self.budget.used}/{self.budget.max_retries} " \
+               f"| open circuits: {open_circuits}"
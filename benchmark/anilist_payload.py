@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from graphql import build_ast_schema, parse
+
+import app  # noqa: F401, app has to be imported before the other packages
+from anilist.core.query import MediaCollectionQuery, FieldTree
+from anilist.core.controller import SCHEMA_PATH
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'anilist_media_collection.json')
+
+
+def project(value: Any, tree: Optional[FieldTree]) -> Any:
+    """
+    Keeps only the fields present in the tree, which is what anilist returns for the built query
+    """
+    if tree is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    return {name: project(value.get(name), children) for name, children in tree.items() if name in value}
+
+
+def payload_size(lists: List[Dict]) -> int:
+    return len(json.dumps({'data': {'MediaListCollection': {'lists': lists}}}, separators=(',', ':')).encode('utf-8'))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compares the anilist payload of the full and the built query")
+    parser.add_argument('--lists', nargs='+', default=['CURRENT'], help="Statuses passed through statusIn")
+    args = parser.parse_args()
+
+    with open(FIXTURE_PATH, encoding='utf-8') as reader:
+        lists: List[Dict] = json.load(reader)['MediaListCollection']['lists']
+
+    tree = MediaCollectionQuery.field_tree()
+    trimmed_lists = [{'entries': project(media_list['entries'], tree)} for media_list in lists]
+    filtered_lists = [
+        media_list for media_list in trimmed_lists
+        if media_list['entries'] and media_list['entries'][0]['status'] in args.lists
+    ]
+
+    full_size = payload_size(lists)
+    trimmed_size = payload_size(trimmed_lists)
+    filtered_size = payload_size(filtered_lists)
+    print(f"entries: {sum(len(media_list['entries']) for media_list in lists)}")
+    print(f"full query, every list: {full_size} bytes")
+    print(f"built query, every list: {trimmed_size} bytes ({trimmed_size / full_size - 1:+.1%})")
+    print(f"built query, {' '.join(args.lists)}: {filtered_size} bytes ({filtered_size / full_size - 1:+.1%})")
+
+    started = perf_counter()
+    with open(SCHEMA_PATH, encoding='utf-8') as reader:
+        build_ast_schema(parse(reader.read()))
+    print(f"schema from {os.path.basename(SCHEMA_PATH)}: {(perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
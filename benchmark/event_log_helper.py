@@ -0,0 +1,74 @@
+import argparse
+import inspect
+import logging
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from time import perf_counter
+from typing import Any, Callable
+
+from app.util.io import EventLogHelper
+
+
+class LegacyEventLogHelper:
+    """
+    Previous implementation, logging is configured, the log file opened and the message printed on every call
+    """
+
+    def __init__(self, directory_path: str) -> None:
+        self.directory_path = directory_path
+
+    def __get_log_file(self) -> str:
+        file_path = os.path.join(self.directory_path, 'legacy.log')
+        with open(file_path, "a+") as writer:
+            writer.write('')
+        return file_path
+
+    def log_info(self, message: Any, module_name: str, function_name: str):
+        logging.basicConfig(filename=self.__get_log_file(),
+                            format=EventLogHelper.LOG_FORMAT.replace('%(module_name)s', '%(module)s'),
+                            datefmt=EventLogHelper.TIME_FORMAT,
+                            level=logging.INFO)
+        bundle = {'module_name': module_name, 'source': function_name}
+        logger = logging.getLogger(__name__)
+        logger.info(f"{message}", extra=bundle)
+        print(f"{message}")
+
+
+def measure(calls: int, log: Callable[[int], None]) -> float:
+    started = perf_counter()
+    for index in range(calls):
+        log(index)
+    return (perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per call cost of EventLogHelper before and after the queue backend")
+    parser.add_argument('--calls', type=int, default=20000, help="Number of log calls per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory_path, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        legacy_helper = LegacyEventLogHelper(directory_path)
+        legacy_cost = measure(args.calls, lambda index: legacy_helper.log_info(
+            f"Downloading {index}", 'Benchmark', inspect.currentframe().f_code.co_name
+        ))
+
+        EventLogHelper.configure(logging.INFO, os.path.join(directory_path, 'queue.log'))
+        queued_cost = measure(args.calls, lambda index: EventLogHelper.log_info("Downloading %s", args=(index,)))
+        EventLogHelper.configure(logging.WARNING)
+        filtered_cost = measure(args.calls, lambda index: EventLogHelper.log_info("Downloading %s", args=(index,)))
+        started = perf_counter()
+        EventLogHelper.shutdown()
+        drain_time = perf_counter() - started
+
+    print(f"calls: {args.calls}", file=sys.stderr)
+    print(f"legacy basicConfig + open + print : {legacy_cost:.1f}us per call", file=sys.stderr)
+    print(f"queue handler                     : {queued_cost:.1f}us per call "
+          f"(+{drain_time:.3f}s to drain the queue at exit)", file=sys.stderr)
+    print(f"queue handler, below level        : {filtered_cost:.1f}us per call", file=sys.stderr)
+    print(f"speedup x{legacy_cost / queued_cost:.1f}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
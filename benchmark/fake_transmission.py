@@ -0,0 +1,144 @@
+import argparse
+import json
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, sleep
+from typing import Dict, List, Optional, Set
+
+import app  # noqa: F401, app has to be imported before the other packages
+from transmission import TransmissionController
+
+
+class FakeTransmissionServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the transmission rpc which supports `torrent-get` and `torrent-add`,
+    requests without the current `X-Transmission-Session-Id` are answered with 409 like transmission does,
+    sources in `rejected` are refused like a corrupt torrent file would be
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0) -> None:
+        super().__init__(('127.0.0.1', port), FakeTransmissionHandler)
+        self.session_id = uuid.uuid4().hex
+        self.latency = latency
+        self.torrents: Dict[str, str] = dict()
+        self.rejected: Set[str] = set()
+        self.request_counts: Dict[str, int] = dict()
+        self.connection_count: int = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/transmission/rpc"
+
+    def get_request(self):
+        with self.lock:
+            self.connection_count += 1
+        return super().get_request()
+
+    def count(self, method: str) -> None:
+        with self.lock:
+            self.request_counts[method] = self.request_counts.get(method, 0) + 1
+
+    def start(self) -> 'FakeTransmissionServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FakeTransmissionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server: FakeTransmissionServer
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def __reply(self, status: int, body: Optional[Dict] = None) -> None:
+        contents = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        self.send_header('X-Transmission-Session-Id', self.server.session_id)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        if self.headers.get('X-Transmission-Session-Id') != self.server.session_id:
+            self.server.count('409')
+            self.__reply(409)
+            return
+        method, arguments = request.get('method'), request.get('arguments', dict())
+        self.server.count(method)
+        sleep(self.server.latency)
+        if method == 'torrent-get':
+            torrents = [{'hashString': info_hash} for info_hash in self.server.torrents]
+            self.__reply(200, {'result': 'success', 'arguments': {'torrents': torrents}})
+        elif method == 'torrent-add':
+            source = arguments.get('filename') or arguments.get('metainfo', '')
+            if source in self.server.rejected:
+                self.__reply(200, {'result': 'invalid or corrupt torrent file'})
+                return
+            magnet_hash = re.search(r'btih:([0-9a-f]{40})', source, re.IGNORECASE)
+            info_hash = magnet_hash.group(1).lower() if magnet_hash else sha1(source.encode('utf-8')).hexdigest()
+            with self.server.lock:
+                duplicate = info_hash in self.server.torrents
+                self.server.torrents[info_hash] = source
+            key = 'torrent-duplicate' if duplicate else 'torrent-added'
+            self.__reply(200, {'result': 'success', 'arguments': {key: {'hashString': info_hash}}})
+        else:
+            self.__reply(200, {'result': f"method name not recognized: {method}"})
+
+
+@dataclass()
+class FakeTorrent:
+    name: str
+    download_url: str
+    magnet: str
+    hash: str
+
+
+def generate_torrents(count: int) -> List[FakeTorrent]:
+    torrents = list()
+    for index in range(count):
+        info_hash = sha1(f"episode-{index}".encode('utf-8')).hexdigest()
+        torrents.append(FakeTorrent(
+            f"[HorribleSubs] Show - {index:02d} [720p].mkv",
+            f"https://nyaa.si/download/{1150000 + index}.torrent",
+            f"magnet:?xt=urn:btih:{info_hash}",
+            info_hash
+        ))
+    return torrents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Queues torrents against a local fake transmission rpc server")
+    parser.add_argument('--torrents', type=int, default=60, help="Number of torrents in the batch")
+    parser.add_argument('--existing', type=int, default=10, help="How many of them transmission already has")
+    parser.add_argument('--latency', type=float, default=.005, help="Server side latency of each rpc call")
+    args = parser.parse_args()
+
+    server = FakeTransmissionServer(latency=args.latency).start()
+    host, port = server.server_address
+    controller = TransmissionController(credentials={'host': host, 'port': port})
+    torrents = generate_torrents(args.torrents)
+    for torrent in torrents[:args.existing]:
+        server.torrents[torrent.hash] = torrent.magnet
+
+    started = perf_counter()
+    # noinspection PyTypeChecker
+    queue_results = controller.queue_torrents(torrents)
+    elapsed = perf_counter() - started
+    server.shutdown()
+
+    print(f"torrents: {len(torrents)} | queued: {sum(1 for result in queue_results if result.queued)} "
+          f"| already present: {sum(1 for result in queue_results if result.duplicate)}")
+    print(f"batch took {elapsed:.3f}s | rpc requests: {server.request_counts} | connections: {server.connection_count}")
+    print(f"previous per item sleeps alone would take {len(torrents) * .5:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
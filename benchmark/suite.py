@@ -0,0 +1,222 @@
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from copy import deepcopy
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tinydb import Query
+
+from app import EventLogHelper, LruCache
+from app.data import AppStore
+from app.util import TinyDocumentStorage, SqliteDocumentStorage, TINYDB_BACKEND, SQLITE_BACKEND
+from anilist.data import AniListModelHelper, MediaEntry
+from nyaa import NyaaModelHelper, TorrentInfo
+from plex import PlexController
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@dataclass()
+class BenchmarkResult:
+    name: str
+    operations: int
+    seconds: float
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+    def per_operation_us(self) -> float:
+        return self.seconds / self.operations * 1e6 if self.operations else 0.0
+
+    def key(self) -> str:
+        return ' '.join([self.name] + [f"{name}={value}" for name, value in sorted(self.parameters.items())])
+
+    def __iter__(self):
+        yield 'name', self.name
+        yield 'parameters', self.parameters
+        yield 'operations', self.operations
+        yield 'seconds', round(self.seconds, 6)
+        yield 'per_operation_us', round(self.per_operation_us(), 3)
+
+
+def load_fixture(file_name: str) -> Any:
+    with open(os.path.join(FIXTURES_DIRECTORY, file_name), encoding='utf-8') as reader:
+        return json.load(reader)
+
+
+def measure(
+        name: str,
+        function: Callable[[Any], Any],
+        items: List[Any],
+        rounds: int,
+        setup: Optional[Callable[[], None]] = None,
+        **parameters
+) -> BenchmarkResult:
+    """
+    Calls `function` for every item, the best of `rounds` runs is kept to reduce noise
+    :param setup: called before every round and excluded from the measurement
+    """
+    best = float('inf')
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        started = perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, perf_counter() - started)
+    return BenchmarkResult(name, len(items), best, parameters)
+
+
+def model_benchmarks(rounds: int) -> Iterable[BenchmarkResult]:
+    search_page: List[Dict] = load_fixture('nyaa_search_page.json')
+    collection: Dict = load_fixture('anilist_media_collection.json')
+    plex_section: Dict = load_fixture('plex_section.json')
+    entries = [entry for media_list in collection['MediaListCollection']['lists'] for entry in media_list['entries']]
+
+    nyaa_model_helper = NyaaModelHelper()
+    yield measure('nyaa.create_data_class', nyaa_model_helper.create_data_class, search_page * 20, rounds)
+
+    torrent_infos: List[TorrentInfo] = [nyaa_model_helper.create_data_class(item) for item in search_page]
+
+    def clear_parse_cache() -> None:
+        TorrentInfo.parse_cache = LruCache(50000)
+
+    yield measure('torrent_info.added_anime_info', TorrentInfo.added_anime_info, torrent_infos, rounds,
+                  clear_parse_cache, parse_cache='cold')
+    yield measure('torrent_info.added_anime_info', TorrentInfo.added_anime_info, torrent_infos * 20, rounds,
+                  parse_cache='warm')
+
+    parsed_torrent_infos = [torrent_info for torrent_info in torrent_infos if torrent_info.anime_info is not None]
+    yield measure('nyaa.create_dictionary_class', nyaa_model_helper.create_dictionary_class,
+                  parsed_torrent_infos * 20, rounds)
+
+    anilist_model_helper = AniListModelHelper()
+    yield measure('anilist.create_data_class', anilist_model_helper.create_data_class, entries * 20, rounds)
+
+    media_entries: List[MediaEntry] = [anilist_model_helper.create_data_class(entry) for entry in entries]
+    yield measure('media_entry.generate_search_terms', MediaEntry.generate_search_terms, media_entries * 20, rounds)
+
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    matches_search_term = PlexController._PlexController__matches_search_term
+    pairs = [
+        (show['title'], search_term)
+        for show in plex_section['shows']
+        for media_entry in media_entries
+        for search_term in media_entry.generate_search_terms()
+    ]
+    yield measure('plex.matches_search_term', lambda pair: matches_search_term(*pair), pairs, rounds)
+
+
+def create_history(size: int) -> List[Dict]:
+    search_page: List[Dict] = load_fixture('nyaa_search_page.json')
+    nyaa_model_helper = NyaaModelHelper()
+    templates = list()
+    for item in search_page:
+        torrent_info = nyaa_model_helper.create_data_class(item)
+        if torrent_info is not None and torrent_info.added_anime_info():
+            templates.append(nyaa_model_helper.create_dictionary_class(torrent_info))
+    history = list()
+    for index in range(size):
+        document = deepcopy(templates[index % len(templates)])
+        document['name'] = f"{document['name']} #{index}"
+        document['hash'] = f"{index:040x}"
+        history.append(document)
+    return history
+
+
+def store_benchmarks(rounds: int, sizes: List[int], backends: List[str]) -> Iterable[BenchmarkResult]:
+    for backend in backends:
+        for size in sizes:
+            history = create_history(size)
+            operations = max(3, min(200, 200000 // size))
+            sample = [history[(index * 7919) % size] for index in range(operations)]
+            with tempfile.TemporaryDirectory() as directory_path:
+                if backend == SQLITE_BACKEND:
+                    storage = SqliteDocumentStorage(os.path.join(directory_path, 'history.sqlite3'), 'name',
+                                                    ['name', 'hash'])
+                else:
+                    storage = TinyDocumentStorage(os.path.join(directory_path, 'history.db'), 'name', ['name', 'hash'])
+                storage.bulk_write(history, list())
+                app_store = AppStore(backend, storage)
+                yield measure('app_store.search', lambda document: app_store.search(Query().name == document['name']),
+                              sample, rounds, backend=backend, history_size=size)
+                yield measure('app_store.save_or_update', app_store.save_or_update, sample, rounds,
+                              backend=backend, history_size=size)
+                storage.close()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, cwd=FIXTURES_DIRECTORY
+        ).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[BenchmarkResult], baseline_path: str, tolerance: float) -> bool:
+    """
+    Prints the change of each benchmark against a previous report
+    :return: True if no benchmark got slower by more than the tolerance
+    """
+    with open(baseline_path, encoding='utf-8') as reader:
+        baseline = {
+            BenchmarkResult(item['name'], item['operations'], item['seconds'], item['parameters']).key(): item
+            for item in json.load(reader)['results']
+        }
+    is_within_tolerance = True
+    for result in results:
+        previous = baseline.get(result.key())
+        if previous is None or not previous['per_operation_us']:
+            continue
+        change = result.per_operation_us() / previous['per_operation_us'] - 1
+        is_regression = change > tolerance
+        is_within_tolerance = is_within_tolerance and not is_regression
+        print(f"{'REGRESSION ' if is_regression else ''}{result.key()}: {previous['per_operation_us']:.2f}us -> "
+              f"{result.per_operation_us():.2f}us ({change:+.1%})", file=sys.stderr)
+    return is_within_tolerance
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the hot paths using recorded fixtures")
+    parser.add_argument('--rounds', type=int, default=3, help="Runs of each benchmark, the fastest is reported")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="History sizes")
+    parser.add_argument('--backends', nargs='+', default=[TINYDB_BACKEND, SQLITE_BACKEND],
+                        choices=[TINYDB_BACKEND, SQLITE_BACKEND])
+    parser.add_argument('--output', help="Write the json report to this file instead of stdout")
+    parser.add_argument('--compare', help="Previous json report to compare against")
+    parser.add_argument('--tolerance', type=float, default=.2, help="Allowed slowdown before failing, .2 is 20%%")
+    args = parser.parse_args()
+
+    # models print and log while parsing, keep that out of the report
+    with redirect_stdout(io.StringIO()):
+        EventLogHelper.configure(logging.ERROR)
+        results = list(model_benchmarks(args.rounds)) + list(store_benchmarks(args.rounds, args.sizes, args.backends))
+
+    report = json.dumps({
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [dict(result) for result in results]
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as writer:
+            writer.write(report)
+    else:
+        print(report)
+
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
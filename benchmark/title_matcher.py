@@ -0,0 +1,86 @@
+import argparse
+import random
+from difflib import SequenceMatcher
+from time import perf_counter
+from typing import List, Tuple
+
+from app.util.matcher import TitleMatcher
+
+WORDS = [
+    'shingeki', 'kyojin', 'kimetsu', 'yaiba', 'boku', 'hero', 'academia', 'kaguya', 'sama', 'love', 'war',
+    'tensei', 'shitara', 'slime', 'datta', 'ken', 'sword', 'art', 'online', 're', 'zero', 'kara', 'hajimeru',
+    'isekai', 'seikatsu', 'one', 'piece', 'hunter', 'mahou', 'shoujo', 'no', 'wa', 'to', 'ga', 'kanojo',
+    'okarishimasu', 'spy', 'family', 'chainsaw', 'man', 'jujutsu', 'kaisen', 'vinland', 'saga', 'dr', 'stone',
+    'season', 'part', 'final', 'movie', 'special', 'gakuen', 'tokyo', 'revengers', 'yakusoku', 'neverland'
+]
+
+
+def generate_titles(count: int, seed: int) -> List[str]:
+    generator = random.Random(seed)
+    titles = set()
+    while len(titles) < count:
+        titles.add(' '.join(generator.choice(WORDS) for _ in range(generator.randint(2, 6))).title())
+    return sorted(titles)
+
+
+def perturb(title: str, generator: random.Random) -> str:
+    """
+    Simulates the differences between anilist and plex naming, punctuation, casing and a dropped or added word
+    """
+    words = title.split(' ')
+    choice = generator.randint(0, 3)
+    if choice == 0:
+        return title.upper()
+    if choice == 1:
+        return ': '.join(words[:1] + [' '.join(words[1:])])
+    if choice == 2 and len(words) > 2:
+        return ' '.join(words[:-1])
+    return f"{title} 2nd Season"
+
+
+def sequence_matcher_baseline(titles: List[str], queries: List[str]) -> Tuple[float, int]:
+    started = perf_counter()
+    matched = 0
+    for query in queries:
+        normalized_query = query.lower()
+        if any(SequenceMatcher(a=title.lower(), b=normalized_query).ratio() >= .98 for title in titles):
+            matched += 1
+    return perf_counter() - started, matched
+
+
+def title_matcher(titles: List[str], queries: List[str], threshold: float) -> Tuple[float, float, int]:
+    started = perf_counter()
+    matcher = TitleMatcher()
+    for title in titles:
+        matcher.add(title, [title])
+    build_time = perf_counter() - started
+
+    started = perf_counter()
+    matched = sum(1 for query in queries if matcher.match([query], threshold, limit=5))
+    return build_time, perf_counter() - started, matched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compares TitleMatcher against pairwise SequenceMatcher matching")
+    parser.add_argument('--titles', type=int, default=5000, help="Number of titles in the synthetic library")
+    parser.add_argument('--queries', type=int, default=200, help="Number of search terms to match")
+    parser.add_argument('--threshold', type=float, default=.85, help="Minimum TitleMatcher score")
+    parser.add_argument('--seed', type=int, default=911)
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+    titles = generate_titles(args.titles, args.seed)
+    queries = [perturb(generator.choice(titles), generator) for _ in range(args.queries)]
+
+    baseline_time, baseline_matched = sequence_matcher_baseline(titles, queries)
+    build_time, match_time, matched = title_matcher(titles, queries, args.threshold)
+
+    print(f"library: {len(titles)} titles | queries: {len(queries)}")
+    print(f"SequenceMatcher >= .98 : {baseline_time:.3f}s | matched {baseline_matched}/{len(queries)}")
+    print(f"TitleMatcher >= {args.threshold}  : {match_time:.3f}s (+{build_time:.3f}s index build) "
+          f"| matched {matched}/{len(queries)}")
+    print(f"speedup x{baseline_time / match_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
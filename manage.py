@@ -1,5 +1,5 @@
-import inspect
 import argparse
+from typing import List, Set
 from app import AppController
 from app.util.io import EventLogHelper
 
@@ -8,6 +8,9 @@ LIST_KEY_PLANNING = "PLANNING"
 LIST_KEY_COMPLETED = "COMPLETED"
 LIST_KEY_PAUSED = "PAUSED"
 LIST_KEY_REPEATING = "REPEATING"
+LIST_KEY_ALL = "ALL"
+
+LIST_KEYS = [LIST_KEY_CURRENT, LIST_KEY_PLANNING, LIST_KEY_COMPLETED, LIST_KEY_PAUSED, LIST_KEY_REPEATING]
 
 
 def __description() -> str:
@@ -15,20 +18,47 @@ def __description() -> str:
 
 
 def __usage() -> str:
-    return f"manage.py --from-list list_name\n\n" \
-           f"Where list_name is one of the following:\n" \
-           f"{LIST_KEY_CURRENT}, {LIST_KEY_PLANNING}, {LIST_KEY_COMPLETED}, {LIST_KEY_PAUSED}, {LIST_KEY_REPEATING}\n"
+    return f"manage.py --from-list list_name [list_name ...] [--full-rescan] [--daemon]\n\n" \
+           f"Where list_name is one or more of the following, or {LIST_KEY_ALL} for every list:\n" \
+           f"{', '.join(LIST_KEYS)}\n"
 
 
 def __init_cli() -> argparse:
     parser = argparse.ArgumentParser(description=__description(), usage=__usage())
     parser.add_argument(
-        '-fl', '--from-list', default=LIST_KEY_CURRENT,
-        help="Run the utility and download torrent files in the defined list types"
+        '-fl', '--from-list', nargs='+', default=[LIST_KEY_CURRENT],
+        help="Run the utility and download torrent files in the defined list types, lists are fetched together "
+             "in a single run and shows found in more than one list are only searched once"
+    )
+    parser.add_argument(
+        '-fr', '--full-rescan', action='store_true',
+        help="Search every page on nyaa.si instead of stopping at results seen by the previous run"
+    )
+    parser.add_argument(
+        '-d', '--daemon', action='store_true',
+        help="Keep running and search for shows as their episodes air instead of exiting after a single run"
     )
     return parser
 
 
+def __resolve_list_names(list_names: List[str]) -> List[str]:
+    resolved_names: List[str] = list()
+    seen_names: Set[str] = set()
+    for list_name in list_names:
+        list_name = list_name.upper()
+        if list_name == LIST_KEY_ALL:
+            candidates = LIST_KEYS
+        elif list_name in LIST_KEYS:
+            candidates = [list_name]
+        else:
+            raise ValueError(f"Unknown list name `{list_name}`, expected one of: {', '.join(LIST_KEYS)}, {LIST_KEY_ALL}")
+        for candidate in candidates:
+            if candidate not in seen_names:
+                seen_names.add(candidate)
+                resolved_names.append(candidate)
+    return resolved_names
+
+
 def __print_program_end() -> None:
     print("-----------------------------------")
     print("End of execution")
@@ -38,12 +68,12 @@ def __print_program_end() -> None:
 def __init_app(args: argparse) -> None:
     if args.from_list is not None:
         print('\n-------------------        Anime Scrobbler        -------------------\n')
-        EventLogHelper.log_info(
-            f"Starting application with parameter agr.from_list -> {args.from_list}",
-            'manage.py',
-            inspect.currentframe().f_code.co_name
-        )
-        AppController(args.from_list).start_application()
+        EventLogHelper.log_info("Starting application with parameter agr.from_list -> %s", args=(args.from_list,))
+        app_controller = AppController(__resolve_list_names(args.from_list), args.full_rescan)
+        if args.daemon:
+            app_controller.run_daemon()
+        else:
+            app_controller.start_application()
     else:
         print()
         print("For instructions on how to use this program, please run:\nmanage.py --help")
@@ -54,8 +84,4 @@ if __name__ == '__main__':
         cli_args = __init_cli().parse_args()
         __init_app(cli_args)
     except Exception as e:
-        EventLogHelper.log_error(
-            f"Uncaught exception thrown while starting app -> {e}",
-            __name__,
-            inspect.currentframe().f_code.co_name
-        )
+        EventLogHelper.log_error("Uncaught exception thrown while starting app -> %s", args=(e,))
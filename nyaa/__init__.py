@@ -1,2 +1,3 @@
-from .core import NyaaController
-from .data import TorrentInfo, AppConfig, NyaaModelHelper
+from .core import NyaaController, NyaaFeedReader, TorrentDownloader
+from .data import TorrentInfo, AppConfig, NyaaModelHelper, SearchPageCache, FeedState, FeedStateStore, \
+    ShowSearchState, ShowSearchStateStore
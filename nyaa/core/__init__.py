@@ -1 +1,4 @@
 from .controller import NyaaController
+from .feed import NyaaFeedReader
+from .planner import SearchQueryPlanner, PlannedQuery
+from .downloader import TorrentDownloader
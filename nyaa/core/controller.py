@@ -1,15 +1,17 @@
-import inspect
-import logging
-from time import sleep
+from time import time
 from typing import Optional, List, Tuple, Dict
 
 from NyaaPy import Nyaa
-from requests import get, Response
+from requests import Session
 
 from anilist import MediaEntry
-from app import StorageUtil, EventLogHelper
-from plex import Show, Season
-from ..data import NyaaModelHelper, TorrentInfo, TorrentAnimeInfo, AppConfig
+from app import EventLogHelper, RateLimiter, TitleMatcher, Resilience
+from plex import Show, EpisodeIndex, EpisodeIndexCache
+from ..data import NyaaModelHelper, TorrentInfo, AppConfig, SearchPageCache, \
+    ShowSearchState, ShowSearchStateStore
+from ..data.cache import SEARCH_URL
+from .planner import SearchQueryPlanner, PlannedQuery
+from .downloader import TorrentDownloader
 
 
 class NyaaControllerHelper:
@@ -17,44 +19,47 @@ class NyaaControllerHelper:
     Helper class for Nyaa Controller
     """
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            episode_cache: Optional[EpisodeIndexCache] = None,
+            search_cache: Optional[SearchPageCache] = None,
+            search_state_store: Optional[ShowSearchStateStore] = None,
+            full_rescan: bool = False,
+            resilience: Optional[Resilience] = None,
+            downloader: Optional[TorrentDownloader] = None
+    ) -> None:
         super().__init__()
-        self.sleep_duration: float = .25
+        self.search_cache: Optional[SearchPageCache] = search_cache
+        self.search_state_store: Optional[ShowSearchStateStore] = search_state_store
+        self.full_rescan = full_rescan
         self.model_helper = NyaaModelHelper()
         self.config: Optional[AppConfig] = None
+        self.rate_limiter: RateLimiter = rate_limiter if rate_limiter is not None else RateLimiter(.25)
+        self.episode_cache: EpisodeIndexCache = episode_cache if episode_cache is not None else EpisodeIndexCache()
+        self.resilience: Resilience = resilience if resilience is not None else Resilience()
+        self.downloader: TorrentDownloader = downloader if downloader is not None \
+            else TorrentDownloader(self.rate_limiter, self.resilience)
+        self.session: Session = self.downloader.session
 
     @staticmethod
-    def _build_search_terms(config: Optional[AppConfig], media_entry: MediaEntry) -> List[str]:
+    def _plan_search_queries(config: Optional[AppConfig], media_entry: MediaEntry) -> List[PlannedQuery]:
         """
-        Builds a search term which will match the kind of release group and quality we're looking for,
-        see the app.json file for more details regarding configuration
+        Combines the titles of the media entry into as few queries as possible, each matching the kind of
+        release group and quality we're looking for, see the app.json file for more details regarding configuration
         :param media_entry:
         :return:
         """
-        search_terms: List[str] = list(map(
-            lambda s: f"{config.torrent_preferred_group} {s} {config.torrent_preferred_quality}",
+        return SearchQueryPlanner(config.nyaa_query_max_length).plan(
+            config.torrent_preferred_group,
+            config.torrent_preferred_quality,
             media_entry.generate_search_terms()
-        ))
-        return search_terms
-
-    @staticmethod
-    def __has_seasonal_information(show: Optional[Show], anime_info: TorrentAnimeInfo) -> Tuple[bool, Optional[Season]]:
-        if show is not None:
-            show_seasons: List[Optional[Season]] = show.seasons()
-            for season_item in show_seasons:
-                is_finished_watching: bool = season_item.isWatched
-                if len(show_seasons) < 2:
-                    is_finished_watching = False
-                """Do some magic here :')"""
-                if not is_finished_watching:
-                    return anime_info.has_season_information(), season_item
-        return False, None
+        )
 
     def _add_anime_info(self, search_results: Optional[List[TorrentInfo]]):
         torrents: List[Optional[TorrentInfo]] = list()
 
         for search_result in search_results:
-            sleep(self.sleep_duration)
             if not search_result.added_anime_info():
                 continue
 
@@ -75,9 +80,9 @@ class NyaaControllerHelper:
         :return:
         """
         torrent_matches: List[Optional[TorrentInfo]] = list()
+        episode_index: Optional[EpisodeIndex] = None
 
         for search_result in search_results:
-            sleep(self.sleep_duration)
             if not search_result.added_anime_info():
                 continue
 
@@ -85,174 +90,307 @@ class NyaaControllerHelper:
             if f"[{anime_info.release_group}]" != self.config.torrent_preferred_group:
                 continue
 
-            is_episode_present = False
-            for episode in show.episodes():
-                is_episode_present = episode.index == int(float(anime_info.episode_number))
-                if is_episode_present:
-                    break
+            if episode_index is None:
+                episode_index = self.episode_cache.get(show)
 
-            if not is_episode_present:
-                EventLogHelper.log_info(
-                    f"Adding missing episode: `{anime_info.file_name}`",
-                    self.__class__.__name__,
-                    inspect.currentframe().f_code.co_name
-                )
+            if not episode_index.contains(int(float(anime_info.episode_number))):
+                EventLogHelper.log_info("Adding missing episode: `%s`", args=(anime_info.file_name,))
                 torrent_matches.append(search_result)
 
         return torrent_matches
 
 
 class NyaaController(NyaaControllerHelper):
+    __host = 'nyaa.si'
+
+    def __revalidate(self, search_term: str, category: str, search_page: int) -> Tuple[bool, Dict[str, str]]:
+        """
+        Sends a conditional HEAD request for an expired page
+        :return: whether the page is unchanged and the validators the server returned
+        """
+        stale_entry = self.search_cache.get_stale(search_term, category, search_page)
+        if stale_entry is None or (stale_entry['validators_checked'] and not (
+                stale_entry['etag'] or stale_entry['last_modified'])):
+            return False, dict()
+        self.rate_limiter.acquire()
+        response = self.session.head(
+            SEARCH_URL,
+            params=SearchPageCache.create_url_params(search_term, category, search_page),
+            headers=SearchPageCache.conditional_headers(stale_entry),
+            timeout=30.0
+        )
+        if response.status_code == 304:
+            self.search_cache.mark_revalidated(search_term, category, search_page, stale_entry)
+            return True, dict()
+        return False, {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+
+    def __search_page(self, search_term: str, search_page: int, category: str = '1') -> Optional[List[Dict]]:
+        """
+        Fetches a single search result page, going through the search page cache when one is configured
+        """
+        if self.search_cache is not None:
+            cached_results = self.search_cache.get_fresh(search_term, category, search_page)
+            if cached_results is not None:
+                return cached_results
+        return self.resilience.call(self.__host, self.__fetch_page, search_term, search_page, category)
+
+    def __fetch_page(self, search_term: str, search_page: int, category: str) -> Optional[List[Dict]]:
+        validators: Dict[str, Optional[str]] = dict()
+        if self.search_cache is not None:
+            is_unchanged, validators = self.__revalidate(search_term, category, search_page)
+            if is_unchanged:
+                return self.search_cache.get_stale(search_term, category, search_page)['results']
+
+        self.rate_limiter.acquire()
+        # noinspection PyTypeChecker,PyCallByClass
+        search_results = Nyaa.search(keyword=search_term, category=category, page=search_page)
+        if self.search_cache is not None and search_results is not None:
+            self.search_cache.store(
+                search_term, category, search_page, search_results,
+                etag=validators.get('etag'),
+                last_modified=validators.get('last_modified'),
+                validators_checked=len(validators) > 0
+            )
+        return search_results
 
     @staticmethod
-    def __search_for_matching_until_found(search_page: int, search_terms: List[str], retry_count: int = 0):
-        try:
-            for search_term in search_terms:
-                # noinspection PyTypeChecker,PyCallByClass
-                search_results = Nyaa.search(keyword=search_term, category='1', page=search_page)
-                if search_results:
-                    EventLogHelper.log_info(
-                        f"Nyaa search results found for search term: `{search_term}` | on page: `{search_page}`"
-                        f" | found `{len(search_results)}` results",
-                        "NyaaController",
-                        inspect.currentframe().f_code.co_name
-                    )
-                    return search_results
-        except Exception as e:
-            if retry_count != 3:
-                retries = retry_count + 1
-                print('\n<------------------------------------------------------------>\n')
-                EventLogHelper.log_warning(
-                    f"Error encountered searching for search terms: `{search_terms}`, retrying in 1 minute! -> "
-                    f"current attempt count: `{retries}` | failure reason: `{e}`",
-                    "__search_for_matching_until_found",
-                    inspect.currentframe().f_code.co_name
+    def __attribute_search_results(planned_query: PlannedQuery, search_results: List[Dict]) -> Dict[str, int]:
+        result_counts: Dict[str, int] = dict()
+        for search_result in search_results:
+            term = SearchQueryPlanner.attribute(planned_query.terms, search_result.get('name'))
+            result_counts[term or 'unattributed'] = result_counts.get(term or 'unattributed', 0) + 1
+        return result_counts
+
+    def __search_for_matching_until_found(self, search_page: int, search_terms: List[PlannedQuery]):
+        for planned_query in search_terms:
+            search_results = self.__search_page(planned_query.keyword, search_page)
+            if search_results:
+                EventLogHelper.log_info(
+                    "Nyaa search results found for search term: `%s` | on page: `%s` | found `%s` results "
+                    "| by term: %s",
+                    args=(planned_query.keyword, search_page, len(search_results),
+                          self.__attribute_search_results(planned_query, search_results))
                 )
-                sleep(60)
-                print('\n<------------------------------------------------------------>\n')
-                NyaaController.__search_for_matching_until_found(search_page, search_terms, retries)
-            else:
-                raise RuntimeError("Aborting search operation after 3 consecutive failed retry attempts!")
+                return search_results
+
+    @staticmethod
+    def __state_query(search_terms: List[PlannedQuery]) -> str:
+        return ' | '.join(planned_query.keyword for planned_query in search_terms)
 
-    def search_for_shows(
+    def get_search_state(
             self,
-            show: Optional[Show],
+            media_entry: MediaEntry,
+            config: AppConfig,
+            search_state_store: Optional[ShowSearchStateStore] = None
+    ) -> Optional[ShowSearchState]:
+        """
+        :param media_entry: anilist users media entry to search for
+        :param config: configuration file from app.json parsed as a data class
+        :param search_state_store: store of the user who searches for the show, the store of the controller when None
+        :return: the stored search state of the show, None without a store
+        """
+        search_state_store = search_state_store if search_state_store is not None else self.search_state_store
+        if search_state_store is None:
+            return None
+        return search_state_store.get(
+            media_entry.mediaId, self.__state_query(self._plan_search_queries(config, media_entry))
+        )
+
+    def is_search_unchanged(
+            self,
+            search_state: Optional[ShowSearchState],
             media_entry: MediaEntry,
             config: AppConfig
-    ) -> List[Optional[TorrentInfo]]:
+    ) -> bool:
         """
-        Search for a torrent or torrents using the configuration for release groups and quality
-        :param show: plex show item which has information about episodes & seasons
-        :param media_entry: anilist users media entry containing media information and user progress, status & score
+        Checks the search state of the show to tell if a search can't find anything which isn't
+        already in plex or the download history
+        :param search_state: state returned by `get_search_state`
+        :param media_entry: anilist users media entry to search for
         :param config: configuration file from app.json parsed as a data class
-        :return: list of optional torrent info data classes
+        :return: True if the search can be skipped
+        """
+        if search_state is None or self.full_rescan or not config.nyaa_skip_unchanged:
+            return False
+        return search_state.is_up_to_date(
+            media_entry.get_episode_backlog(),
+            media_entry.get_aired_episode_count(),
+            time(),
+            config.nyaa_skip_max_age
+        )
+
+    def __search_all_pages(self, media_entry: MediaEntry, search_states: List[ShowSearchState]) -> List[Dict]:
+        """
+        Requests search pages until nyaa.si returns nothing, or until a page only holds results that were already
+        seen by the previous search of everyone searching for this show unless a full rescan was requested
+        :param media_entry: anilist users media entry to search for
+        :param search_states: search state of the show for everyone who has it on their list
+        :return: every search result
         """
         has_more_results = True
         search_page: int = 1
-        self.config = config
+        search_terms = self._plan_search_queries(self.config, media_entry)
         search_results: List[Dict[Optional[str], Optional[str]]] = list()
 
         while has_more_results:
-            sleep(self.sleep_duration)
-            temp_search_results = self.__search_for_matching_until_found(
-                search_page, self._build_search_terms(self.config, media_entry)
-            )
+            temp_search_results = self.__search_for_matching_until_found(search_page, search_terms)
             if temp_search_results is not None and len(temp_search_results) > 0:
                 search_results += temp_search_results
                 search_page += 1
+                if not self.full_rescan and search_states and all(
+                        search_state.is_page_seen(temp_search_results) for search_state in search_states):
+                    EventLogHelper.log_info(
+                        "Stopping search for `%s` on page `%s`, no results newer than `%s`",
+                        args=(media_entry.media.title.userPreferred, search_page - 1,
+                              min(search_state.newest_id for search_state in search_states))
+                    )
+                    has_more_results = False
             else:
                 has_more_results = False
+        return search_results
+
+    def save_search_state(
+            self,
+            search_state: Optional[ShowSearchState],
+            resolved_releases: List[TorrentInfo],
+            media_entry: MediaEntry,
+            show: Optional[Show] = None,
+            search_state_store: Optional[ShowSearchStateStore] = None,
+            search_results: Optional[List[Dict]] = None
+    ) -> None:
+        """
+        Records what a search found so the next one can stop early or be skipped
+        :param search_state: state returned by `get_search_state`
+        :param resolved_releases: releases which are in the download history or were queued by this run
+        :param media_entry: anilist users media entry which was searched for
+        :param show: plex show whose episodes count as present, None to only count the resolved releases
+        :param search_state_store: store the state was read from, the store of the controller when None
+        :param search_results: results returned by `search_releases`, the page mark is only moved to the newest
+        of them once every release was queued, None keeps the mark so the next search pages through them again
+        """
+        search_state_store = search_state_store if search_state_store is not None else self.search_state_store
+        if search_state is None or search_state_store is None:
+            return
+        if search_results is not None:
+            search_state.advance(search_results)
+        resolved_episodes = set(search_state.resolved_episodes)
+        for torrent_info in resolved_releases:
+            anime_info = torrent_info.anime_info
+            if anime_info is not None and anime_info.episode_number is not None \
+                    and f"[{anime_info.release_group}]" == self.config.torrent_preferred_group:
+                resolved_episodes.add(anime_info.episode_number)
+        search_state.resolved_episodes = sorted(resolved_episodes)
+
+        episodes_present = set()
+        for episode_number in search_state.resolved_episodes:
+            try:
+                episodes_present.add(int(float(episode_number)))
+            except ValueError:
+                continue
+        if show is not None:
+            episodes_present.update(self.episode_cache.get(show).episode_numbers)
+        search_state.episodes_present = sorted(episodes_present)
+        search_state.last_backlog = media_entry.get_episode_backlog()
+        search_state.last_searched_at = time()
+        search_state_store.save(search_state)
 
+    def __create_torrent_info_results(self, search_results: List[Dict]) -> List[Optional[TorrentInfo]]:
         torrent_info_results: List[Optional[TorrentInfo]] = list()
         for search_result in search_results:
-            sleep(self.sleep_duration)
             torrent_info = self.model_helper.create_data_class(search_result)
             if torrent_info is not None:
                 torrent_info_results.append(torrent_info)
+        return torrent_info_results
 
-        # return self._find_matching_episodes(show, media_entry, torrent_info_results)
-        return self._find_missing_episodes(show, torrent_info_results)
-
-    def search_for_missing_shows(
+    def search_releases(
             self,
             media_entry: MediaEntry,
+            config: AppConfig,
+            search_states: Optional[List[ShowSearchState]] = None
+    ) -> Tuple[List[Optional[TorrentInfo]], List[Dict]]:
+        """
+        Searches nyaa.si for every release of a show without filtering them against plex, so that the results
+        can be shared by everyone who has the show on their list
+        :param media_entry: anilist users media entry containing media information
+        :param config: configuration file from app.json parsed as a data class
+        :param search_states: search state of the show for everyone who has it on their list
+        :return: the releases found and the search results to pass to `save_search_state` once they are queued
+        """
+        self.config = config
+        search_results = self.__search_all_pages(media_entry, search_states or list())
+        return self.__create_torrent_info_results(search_results), search_results
+
+    def match_feed_releases(
+            self,
+            feed_items: List[Dict],
+            media_entries: List[MediaEntry],
             config: AppConfig
-    ) -> List[Optional[TorrentInfo]]:
+    ) -> Dict[int, List[TorrentInfo]]:
         """
-        Search for a torrent or torrents using the configuration for release groups and quality
-        :param media_entry: anilist users media entry containing media information and user progress, status & score
+        Matches releases from a feed locally against the titles of the users media entries,
+        only releases from the preferred group and quality are kept
+        :param feed_items: feed items in the same structure as search results
+        :param media_entries: anilist users media entries to match against
         :param config: configuration file from app.json parsed as a data class
-        :return: list of optional torrent info data classes
+        :return: matching releases grouped by media id
         """
-        has_more_results = True
-        search_page: int = 1
         self.config = config
-        search_results: List[Dict[Optional[str], Optional[str]]] = list()
+        title_matcher = TitleMatcher()
+        for media_entry in media_entries:
+            title_matcher.add(media_entry, media_entry.generate_search_terms())
 
-        while has_more_results:
-            temp_search_results = self.__search_for_matching_until_found(
-                search_page, self._build_search_terms(self.config, media_entry)
+        releases: Dict[int, List[TorrentInfo]] = dict()
+        for feed_item in feed_items:
+            torrent_info = self.model_helper.create_data_class(feed_item)
+            if torrent_info is None or not torrent_info.added_anime_info():
+                continue
+            if not config.is_preferred_release(torrent_info.anime_info):
+                continue
+            title_match = title_matcher.best_match(
+                [torrent_info.anime_info.anime_title], config.nyaa_feed_match_threshold
             )
-            if temp_search_results is not None and len(temp_search_results) > 0:
-                search_results += temp_search_results
-                search_page += 1
-            else:
-                has_more_results = False
-            sleep(self.sleep_duration)
+            if title_match is not None:
+                releases.setdefault(title_match.item.mediaId, list()).append(torrent_info)
+        return releases
 
-        torrent_info_results: List[Optional[TorrentInfo]] = list()
-        for search_result in search_results:
-            torrent_info = self.model_helper.create_data_class(search_result)
-            if torrent_info is not None:
-                torrent_info_results.append(torrent_info)
-            sleep(self.sleep_duration)
+    def filter_releases_for_show(
+            self,
+            show: Optional[Show],
+            releases: List[TorrentInfo],
+            config: AppConfig
+    ) -> List[Optional[TorrentInfo]]:
+        """
+        Keeps the releases from the preferred group which are missing from the plex show
+        :param show: plex show item which has information about episodes & seasons
+        :param releases: releases found by a search or matched from a feed
+        :param config: configuration file from app.json parsed as a data class
+        :return: list of optional torrent info data classes
+        """
+        self.config = config
+        return self._find_missing_episodes(show, releases)
 
-        return self._add_anime_info(torrent_info_results)
+    def filter_releases_for_missing_show(
+            self,
+            releases: List[TorrentInfo],
+            config: AppConfig
+    ) -> List[Optional[TorrentInfo]]:
+        """
+        Keeps the releases from the preferred group of a show which is not in plex yet
+        :param releases: releases found by a search or matched from a feed
+        :param config: configuration file from app.json parsed as a data class
+        :return: list of optional torrent info data classes
+        """
+        self.config = config
+        return self._add_anime_info(releases)
 
-    @staticmethod
-    def download_torrent_file(torrent_info: TorrentInfo, config: AppConfig) -> bool:
+    def download_torrent_file(self, torrent_info: TorrentInfo, config: AppConfig) -> bool:
         """
         Downloads a .torrent file and saves it into the app/torrents/ directory
         :param config: configuration class
         :param torrent_info:
         :return: True if the operation was successful otherwise False
         """
-        try:
-            print()
-            torrent_file_name = f"{torrent_info.anime_info.file_name}.torrent"
-            response: Response = get(
-                url=torrent_info.download_url,
-                allow_redirects=True,
-                stream=True,
-                timeout=30.0
-            )
-
-            if response.ok:
-                StorageUtil.write_file_in_app(
-                    directory_path=config.build_parent_save_path(
-                        torrent_info.anime_info.anime_title
-                    ),
-                    filename=torrent_file_name,
-                    contents=response,
-                    write_mode='wb'
-                )
-            else:
-                print('\n<------------------------------------------------------------>\n')
-                EventLogHelper.log_info(
-                    f"Requesting torrent for download failed : {response}\n"
-                    f"Retrying in 5 seconds..",
-                    "NyaaController",
-                    inspect.currentframe().f_code.co_name
-                )
-                sleep(5)
-                NyaaController.download_torrent_file(torrent_info, config)
-                print('\n<------------------------------------------------------------>\n')
-        except Exception as e:
-            EventLogHelper.log_error(
-                f"Encountered exception while downloading torrent file -> {e}",
-                "NyaaController",
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
-            )
-            return False
-        return True
+        return self.downloader.download(
+            torrent_info,
+            config.build_parent_save_path(torrent_info.anime_info.anime_title)
+        )
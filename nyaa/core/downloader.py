@@ -0,0 +1,181 @@
+import os
+import re
+from hashlib import sha1
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+
+from app import StorageUtil, EventLogHelper, RateLimiter, Resilience
+from ..data import TorrentInfo
+
+
+class TorrentDownloader:
+    """
+    Downloads .torrent files over a pooled keep-alive session, each file is written to a temporary file
+    which is only renamed into place once its size and info hash have been verified
+    """
+    # own circuit so a few broken .torrent files can't block the searches on nyaa.si
+    __host = 'nyaa.si/download'
+    __buffer_size: int = 64 * 1024
+    __magnet_hash_pattern = re.compile(r'btih:([0-9a-f]{40})', re.IGNORECASE)
+
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            resilience: Optional[Resilience] = None,
+            max_connections: int = 4
+    ) -> None:
+        super().__init__()
+        self.rate_limiter: RateLimiter = rate_limiter if rate_limiter is not None else RateLimiter(.25)
+        self.resilience: Resilience = resilience if resilience is not None else Resilience()
+        self.session: Session = self.create_session(max_connections)
+        self.file_count: int = 0
+        self.failed_count: int = 0
+        self.byte_count: int = 0
+        self.__first_started_at: Optional[float] = None
+        self.__last_finished_at: Optional[float] = None
+        self.__lock = Lock()
+
+    @staticmethod
+    def create_session(max_connections: int) -> Session:
+        """
+        Creates a session which keeps up to `max_connections` connections per host alive between requests
+        :param max_connections: size of the connection pool, should match the number of parallel downloads
+        :return: requests session
+        """
+        session = Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def __skip_bencoded_value(data: bytes, index: int) -> int:
+        token = data[index:index + 1]
+        if token == b'i':
+            return data.index(b'e', index) + 1
+        if token in (b'l', b'd'):
+            index += 1
+            while data[index:index + 1] != b'e':
+                index = TorrentDownloader.__skip_bencoded_value(data, index)
+            return index + 1
+        if token.isdigit():
+            separator = data.index(b':', index)
+            return separator + 1 + int(data[index:separator])
+        raise ValueError(f"Invalid bencoded value at offset {index}")
+
+    @staticmethod
+    def info_hash(data: bytes) -> str:
+        """
+        Calculates the info hash of a .torrent file, which is the sha1 of the bencoded info dictionary
+        :param data: contents of the .torrent file
+        :return: lowercase hex digest
+        """
+        if data[:1] != b'd':
+            raise ValueError("Torrent file does not start with a dictionary")
+        index = 1
+        while data[index:index + 1] != b'e':
+            key_end = TorrentDownloader.__skip_bencoded_value(data, index)
+            key = data[data.index(b':', index) + 1:key_end]
+            value_end = TorrentDownloader.__skip_bencoded_value(data, key_end)
+            if key == b'info':
+                return sha1(data[key_end:value_end]).hexdigest()
+            index = value_end
+        raise ValueError("Torrent file has no info dictionary")
+
+    @staticmethod
+    def expected_info_hash(torrent_info: TorrentInfo) -> Optional[str]:
+        if torrent_info.hash and len(torrent_info.hash) == 40:
+            return torrent_info.hash.lower()
+        if torrent_info.magnet:
+            magnet_hash = TorrentDownloader.__magnet_hash_pattern.search(torrent_info.magnet)
+            if magnet_hash is not None:
+                return magnet_hash.group(1).lower()
+        return None
+
+    def __verify(self, torrent_info: TorrentInfo, response: Response, file_path: str, size: int) -> None:
+        content_length = response.headers.get('Content-Length')
+        if content_length is not None and 'Content-Encoding' not in response.headers \
+                and int(content_length) != size:
+            raise IOError(f"Incomplete download, received {size} of {content_length} bytes")
+        expected_hash = self.expected_info_hash(torrent_info)
+        if expected_hash is not None:
+            with open(file_path, 'rb') as reader:
+                actual_hash = self.info_hash(reader.read())
+            if actual_hash != expected_hash:
+                raise ValueError(f"Info hash mismatch, expected {expected_hash} but received {actual_hash}")
+
+    def __download(self, torrent_info: TorrentInfo, file_path: str) -> int:
+        self.rate_limiter.acquire()
+        response: Response = self.session.get(
+            url=torrent_info.download_url,
+            allow_redirects=True,
+            stream=True,
+            timeout=30.0
+        )
+        response.raise_for_status()
+        size = 0
+        writer = NamedTemporaryFile('wb', dir=os.path.dirname(file_path), suffix='.part', delete=False)
+        temporary_path = writer.name
+        try:
+            with writer:
+                for chunk in response.iter_content(chunk_size=self.__buffer_size):
+                    size += writer.write(chunk)
+            self.__verify(torrent_info, response, temporary_path, size)
+            os.replace(temporary_path, file_path)
+        except Exception:
+            os.remove(temporary_path)
+            raise
+        finally:
+            response.close()
+        return size
+
+    def download(self, torrent_info: TorrentInfo, directory_path: str) -> bool:
+        """
+        Downloads the .torrent file of the torrent into the directory
+        :param torrent_info: torrent to download
+        :param directory_path: directory relative to the app directory
+        :return: True if the file was downloaded and verified otherwise False
+        """
+        started = monotonic()
+        with self.__lock:
+            if self.__first_started_at is None:
+                self.__first_started_at = started
+        try:
+            creation_path = StorageUtil.create_base_path(directory_path)
+            Path(creation_path).mkdir(parents=True, exist_ok=True)
+            file_path = os.path.join(creation_path, f"{torrent_info.anime_info.file_name}.torrent")
+            size = self.resilience.call(self.__host, self.__download, torrent_info, file_path)
+            with self.__lock:
+                self.file_count += 1
+                self.byte_count += size
+            EventLogHelper.log_info(
+                "Downloaded `%s` (%s bytes) in %.2fs", args=(os.path.basename(file_path), size, monotonic() - started)
+            )
+            return True
+        except Exception as e:
+            with self.__lock:
+                self.failed_count += 1
+            EventLogHelper.log_warning("Unable to download torrent file `%s` -> %s", args=(torrent_info.name, e))
+            return False
+        finally:
+            with self.__lock:
+                self.__last_finished_at = monotonic()
+
+    def throughput(self) -> float:
+        """
+        :return: bytes per second from the start of the first download until the last one finished
+        """
+        if self.__first_started_at is None or self.__last_finished_at is None:
+            return 0.0
+        wall_time = self.__last_finished_at - self.__first_started_at
+        return self.byte_count / wall_time if wall_time > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"files: {self.file_count} | failed: {self.failed_count} | bytes: {self.byte_count} " \
+               f"| throughput: {self.throughput() / 1024:.1f} KiB/s"
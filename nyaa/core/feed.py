@@ -0,0 +1,78 @@
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from xml.etree import ElementTree
+
+from requests import Session
+
+from app import EventLogHelper, RateLimiter
+from ..data.feed import FeedPage
+
+NYAA_NAMESPACE = {'nyaa': 'https://nyaa.si/xmlns/nyaa'}
+
+
+class NyaaFeedReader:
+    """
+    Reads a nyaa.si rss feed, e.g. `https://nyaa.si/?page=rss&c=1_2&f=0`, local feeds can be read
+    through `file://` urls which makes it possible to run against recorded fixtures
+    """
+
+    def __init__(self, rate_limiter: RateLimiter, session: Optional[Session] = None) -> None:
+        super().__init__()
+        self.rate_limiter = rate_limiter
+        self.session: Session = session if session is not None else Session()
+
+    @staticmethod
+    def __text(item: ElementTree.Element, path: str) -> Optional[str]:
+        element = item.find(path, NYAA_NAMESPACE)
+        return element.text if element is not None else None
+
+    @staticmethod
+    def parse(feed_contents: str) -> FeedPage:
+        """
+        Converts the rss items into the same dictionary structure returned by nyaa searches
+        :param feed_contents: rss document
+        :return: the items of the feed, newest first
+        """
+        items: List[Dict] = list()
+        for item in ElementTree.fromstring(feed_contents).iter('item'):
+            view_url = NyaaFeedReader.__text(item, 'guid')
+            info_hash = NyaaFeedReader.__text(item, 'nyaa:infoHash')
+            name = NyaaFeedReader.__text(item, 'title')
+            items.append({
+                'id': view_url.rstrip('/').split('/')[-1],
+                'category': NyaaFeedReader.__text(item, 'nyaa:category'),
+                'uploader': None,
+                'website': None,
+                'url': view_url,
+                'name': name,
+                'download_url': NyaaFeedReader.__text(item, 'link'),
+                'magnet': f"magnet:?xt=urn:btih:{info_hash}" if info_hash else None,
+                'size': NyaaFeedReader.__text(item, 'nyaa:size'),
+                'date': NyaaFeedReader.__text(item, 'pubDate'),
+                'seeders': NyaaFeedReader.__text(item, 'nyaa:seeders'),
+                'leechers': NyaaFeedReader.__text(item, 'nyaa:leechers'),
+                'hash': info_hash,
+                'anime_info': None,
+                'is_queued': None
+            })
+        item_ids = [int(item['id']) for item in items]
+        return FeedPage(items, max(item_ids, default=0), min(item_ids, default=0))
+
+    def fetch(self, feed_url: str) -> FeedPage:
+        """
+        Fetches and parses the feed
+        :param feed_url: http(s) or file url of the feed
+        :return: the items of the feed
+        """
+        parsed_url = urlparse(feed_url)
+        if parsed_url.scheme == 'file':
+            with open(f"{parsed_url.netloc}{parsed_url.path}", 'r') as reader:
+                feed_contents = reader.read()
+        else:
+            self.rate_limiter.acquire()
+            response = self.session.get(feed_url, timeout=30.0)
+            response.raise_for_status()
+            feed_contents = response.text
+        feed_page = self.parse(feed_contents)
+        EventLogHelper.log_info("Fetched %s releases from feed `%s`", args=(len(feed_page.items), feed_url))
+        return feed_page
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app import TitleMatcher
+
+
+@dataclass()
+class PlannedQuery:
+    keyword: str
+    terms: List[str]
+
+
+class SearchQueryPlanner:
+    """
+    Collapses the alternative titles of a show into as few nyaa.si queries as possible,
+    titles are combined with the OR operator e.g. `[Group] ("Title A"|"Title B") [720p]`
+    while keeping each keyword within `max_keyword_length` characters
+    """
+
+    def __init__(self, max_keyword_length: int = 200) -> None:
+        super().__init__()
+        self.max_keyword_length = max_keyword_length
+
+    @staticmethod
+    def __phrase(term: str) -> str:
+        phrase = term.replace('"', ' ').strip()
+        return f'"{phrase}"'
+
+    @staticmethod
+    def __build_keyword(group: str, phrases: List[str], quality: str) -> str:
+        alternatives = phrases[0] if len(phrases) == 1 else f"({'|'.join(phrases)})"
+        return ' '.join(part for part in (group, alternatives, quality) if part)
+
+    @staticmethod
+    def deduplicate(terms: List[str]) -> List[str]:
+        """
+        Drops terms which are identical to an earlier term once transliterated, lowercased and stripped of punctuation
+        :param terms: alternative titles
+        :return: distinct titles in their original order
+        """
+        distinct_terms: Dict[str, str] = dict()
+        for term in terms:
+            normalized_term = TitleMatcher.normalize(term)
+            if normalized_term and normalized_term not in distinct_terms:
+                distinct_terms[normalized_term] = term
+        return list(distinct_terms.values())
+
+    def plan(self, group: Optional[str], quality: Optional[str], terms: List[str]) -> List[PlannedQuery]:
+        """
+        Packs the distinct terms into keywords in their original order
+        :param group: preferred release group e.g. `[HorribleSubs]`
+        :param quality: preferred quality e.g. `[720p]`
+        :param terms: alternative titles of the show
+        :return: planned queries, each with the terms it covers
+        """
+        planned_queries: List[PlannedQuery] = list()
+        pending_terms: List[str] = list()
+        for term in self.deduplicate(terms):
+            candidate_terms = pending_terms + [term]
+            keyword = self.__build_keyword(group, [self.__phrase(t) for t in candidate_terms], quality)
+            if pending_terms and len(keyword) > self.max_keyword_length:
+                planned_queries.append(PlannedQuery(
+                    self.__build_keyword(group, [self.__phrase(t) for t in pending_terms], quality), pending_terms
+                ))
+                pending_terms = [term]
+            else:
+                pending_terms = candidate_terms
+        if pending_terms:
+            planned_queries.append(PlannedQuery(
+                self.__build_keyword(group, [self.__phrase(t) for t in pending_terms], quality), pending_terms
+            ))
+        return planned_queries
+
+    @staticmethod
+    def attribute(terms: List[str], result_name: Optional[str]) -> Optional[str]:
+        """
+        Finds which of the combined terms a search result was returned for
+        :param terms: terms of the planned query
+        :param result_name: name of the search result
+        :return: the longest term contained in the result name, or None if no term is contained verbatim
+        """
+        normalized_name = f" {TitleMatcher.normalize(result_name)} "
+        matching_terms = [term for term in terms if f" {TitleMatcher.normalize(term)} " in normalized_name]
+        return max(matching_terms, key=len) if matching_terms else None
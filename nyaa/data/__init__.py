@@ -1 +1,4 @@
 from .model import TorrentInfo, TorrentAnimeInfo, NyaaModelHelper, AppConfig
+from .cache import SearchPageCache
+from .feed import FeedState, FeedPage, FeedStateStore
+from .state import ShowSearchState, ShowSearchStateStore
@@ -0,0 +1,105 @@
+from threading import Lock
+from time import time
+from typing import Dict, List, Optional
+
+from app import LruCache
+
+SEARCH_URL = 'https://nyaa.si/'
+
+
+class SearchPageCache:
+    """
+    On-disk cache of nyaa.si search result pages keyed by (keyword, category, page), fresh pages are served
+    from the cache, stale pages with validators are revalidated with a conditional request before being fetched
+    again. The first page of a search changes most often so it expires sooner than deeper pages.
+    """
+
+    def __init__(self, first_page_ttl: float, page_ttl: float, max_size: int) -> None:
+        super().__init__()
+        self.first_page_ttl = first_page_ttl
+        self.page_ttl = page_ttl
+        self.entries: LruCache = LruCache(max_size)
+        self.hits: int = 0
+        self.revalidated: int = 0
+        self.misses: int = 0
+        self.__lock = Lock()
+
+    @staticmethod
+    def create_key(keyword: str, category: str, page: int) -> str:
+        return f"{category}|{page}|{keyword}"
+
+    @staticmethod
+    def create_url_params(keyword: str, category: str, page: int) -> Dict[str, str]:
+        return {'f': '0', 'c': f"{category}_0", 'q': keyword, 'p': str(page)}
+
+    def __time_to_live(self, page: int) -> float:
+        return self.first_page_ttl if page <= 1 else self.page_ttl
+
+    def __count(self, counter: str) -> None:
+        with self.__lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_fresh(self, keyword: str, category: str, page: int) -> Optional[List[Dict]]:
+        """
+        :return: cached results if they have not expired yet, otherwise None
+        """
+        entry = self.entries.get(self.create_key(keyword, category, page), None)
+        if entry is not None and time() - entry['fetched_at'] < self.__time_to_live(page):
+            self.__count('hits')
+            return entry['results']
+        return None
+
+    def get_stale(self, keyword: str, category: str, page: int) -> Optional[Dict]:
+        """
+        :return: the expired entry including its validators, if any
+        """
+        return self.entries.get(self.create_key(keyword, category, page), None)
+
+    @staticmethod
+    def conditional_headers(entry: Dict) -> Dict[str, str]:
+        headers: Dict[str, str] = dict()
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def mark_revalidated(self, keyword: str, category: str, page: int, entry: Dict) -> List[Dict]:
+        """
+        The server confirmed that the page is unchanged, the entry is kept for another time to live
+        """
+        self.__count('revalidated')
+        entry['fetched_at'] = time()
+        self.entries.put(self.create_key(keyword, category, page), entry)
+        return entry['results']
+
+    def store(
+            self,
+            keyword: str,
+            category: str,
+            page: int,
+            results: List[Dict],
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+            validators_checked: bool = False
+    ) -> None:
+        self.__count('misses')
+        self.entries.put(self.create_key(keyword, category, page), {
+            'results': results,
+            'fetched_at': time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'validators_checked': validators_checked
+        })
+
+    def load(self, file_path: str) -> None:
+        self.entries.load(file_path)
+
+    def save(self, file_path: str) -> None:
+        self.entries.save(file_path)
+
+    def __str__(self) -> str:
+        total = self.hits + self.revalidated + self.misses
+        hit_rate = (self.hits + self.revalidated) / total if total > 0 else 0.0
+        return f"pages: {len(self.entries)} | hits: {self.hits} | revalidated: {self.revalidated} " \
+               f"| misses: {self.misses} | hit rate: {hit_rate:.2%}"
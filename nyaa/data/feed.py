@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.util import DocumentStorage, create_document_storage, TINYDB_BACKEND
+
+FEED_DATABASE = 'database/feed'
+
+
+@dataclass()
+class FeedState:
+    feed: str
+    last_id: int
+    last_date: Optional[str]
+
+    def __iter__(self):
+        yield 'feed', self.feed
+        yield 'last_id', self.last_id
+        yield 'last_date', self.last_date
+
+
+@dataclass()
+class FeedPage:
+    items: List[Dict]
+    newest_id: int
+    oldest_id: int
+
+    def has_gap(self, feed_state: FeedState) -> bool:
+        """
+        Checks if releases might have been published between the last run and the oldest item of this page
+        :param feed_state: high-water mark of the previous run
+        :return: True if the feed does not reach back to the last seen release
+        """
+        return feed_state.last_id > 0 and len(self.items) > 0 and self.oldest_id > feed_state.last_id + 1
+
+    def items_after(self, feed_state: FeedState) -> List[Dict]:
+        return [item for item in self.items if int(item['id']) > feed_state.last_id]
+
+
+class FeedStateStore:
+    """
+    Persists the high-water mark (newest release id and date) of each feed between runs
+    """
+
+    def __init__(self, backend: str = TINYDB_BACKEND, storage: Optional[DocumentStorage] = None) -> None:
+        super().__init__()
+        self.storage: DocumentStorage = storage if storage is not None else create_document_storage(
+            backend, FEED_DATABASE, 'feed', ['feed']
+        )
+
+    def get(self, feed: str) -> FeedState:
+        documents = self.storage.find_by('feed', feed)
+        if documents:
+            return FeedState(feed, int(documents[0]['last_id']), documents[0].get('last_date'))
+        return FeedState(feed, 0, None)
+
+    def save(self, feed_state: FeedState) -> None:
+        self.storage.upsert(dict(feed_state))
@@ -1,12 +1,11 @@
-import inspect
 from dataclasses import dataclass
 from re import match, IGNORECASE
-from typing import Optional, Dict, Union
+from typing import Optional, Dict, Union, ClassVar
 
 from anitopy import anitopy
 from dacite import from_dict
 
-from app import EventLogHelper
+from app import EventLogHelper, RateLimiter, LruCache, Resilience
 
 
 @dataclass()
@@ -17,6 +16,66 @@ class AppConfig:
     torrent_preferred_group: str
     torrent_queued_postfix: str
     torrent_keep_file_after_queuing: bool
+    nyaa_search_workers: int = 1
+    nyaa_request_interval: float = .25
+    nyaa_request_burst: int = 1
+    transmission_request_interval: float = .5
+    transmission_request_burst: int = 1
+    pipeline_queue_size: int = 32
+    pipeline_report_interval: float = 10.0
+    database_backend: str = 'tinydb'
+    parse_cache_size: int = 50000
+    nyaa_cache_first_page_ttl: float = 900
+    nyaa_cache_page_ttl: float = 86400
+    nyaa_cache_size: int = 5000
+    nyaa_ingestion_mode: str = 'search'
+    nyaa_feed_url: str = 'https://nyaa.si/?page=rss&c=1_2&f=0'
+    nyaa_feed_match_threshold: float = .85
+    nyaa_query_max_length: int = 200
+    retry_max_attempts: int = 4
+    retry_base_delay: float = 2.0
+    retry_max_delay: float = 60.0
+    retry_budget: int = 50
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 120.0
+    torrent_download_workers: int = 4
+    log_level: str = 'INFO'
+    metrics_enabled: bool = False
+    metrics_textfile: str = 'metrics/anime_scrobbler.prom'
+    metrics_summary: str = 'metrics/last_run.json'
+    daemon_release_lag: float = 1800.0
+    daemon_retry_interval: float = 1800.0
+    daemon_retry_count: int = 4
+    daemon_reconcile_interval: float = 86400.0
+    nyaa_skip_unchanged: bool = True
+    nyaa_skip_max_age: float = 604800.0
+    anilist_fetch_workers: int = 4
+
+    def is_preferred_release(self, anime_info: 'TorrentAnimeInfo') -> bool:
+        """
+        Checks the release group and video resolution of a release against the preferred group and quality
+        :param anime_info: parsed release name
+        :return: True if the release matches the configuration
+        """
+        preferred_quality = self.torrent_preferred_quality.strip('[]').lower()
+        return f"[{anime_info.release_group}]" == self.torrent_preferred_group \
+            and preferred_quality in (anime_info.video_resolution or '').lower()
+
+    def build_nyaa_rate_limiter(self) -> RateLimiter:
+        return RateLimiter(self.nyaa_request_interval, self.nyaa_request_burst)
+
+    def build_transmission_rate_limiter(self) -> RateLimiter:
+        return RateLimiter(self.transmission_request_interval, self.transmission_request_burst)
+
+    def build_resilience(self) -> Resilience:
+        return Resilience(
+            self.retry_max_attempts,
+            self.retry_base_delay,
+            self.retry_max_delay,
+            self.retry_budget,
+            self.circuit_failure_threshold,
+            self.circuit_reset_timeout
+        )
 
     def build_parent_save_path(self, child_directory: str) -> Union[bytes, str]:
         import os
@@ -74,10 +133,12 @@ class TorrentInfo:
     anime_info: Optional[TorrentAnimeInfo]
     is_queued: Optional[bool]
 
-    def added_anime_info(self) -> bool:
+    parse_cache: ClassVar[LruCache] = LruCache(50000)
+
+    def __parse_anime_info(self) -> Optional[Dict]:
         """
-        Added anime info for the the current torrent
-        :return: true if successful otherwise false if the release is a Batch
+        Parses the release name with anitopy
+        :return: the anime info fields or None if the release is a Batch or cannot be parsed
         """
         parsed_file_name = ""
         try:
@@ -86,27 +147,34 @@ class TorrentInfo:
                     or parsed_file_name.__contains__('release_information') \
                     and parsed_file_name['release_information'] == 'Batch':
                 print()
-                EventLogHelper.log_info(
-                    f"Skipping torrent : `{self.name}` | {parsed_file_name}",
-                    self.__class__.__name__,
-                    inspect.currentframe().f_code.co_name
-                )
+                EventLogHelper.log_info("Skipping torrent : `%s` | %s", args=(self.name, parsed_file_name))
                 print('<------------------------------------------------------------>')
-                return False
-            else:
-                torrent_name_info = from_dict(TorrentAnimeInfo, parsed_file_name)
-                self.anime_info = torrent_name_info
-                return True
+                return None
+            anime_season = parsed_file_name.get('anime_season')
+            if isinstance(anime_season, str) and anime_season.isdigit():
+                parsed_file_name['season_number'] = int(anime_season)
+            return dict(from_dict(TorrentAnimeInfo, parsed_file_name))
         except Exception as e:
             print()
             EventLogHelper.log_info(
-                f"Error converting dictionary to data class\n"
-                f"Details: {e} | {parsed_file_name}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
+                "Error converting dictionary to data class\nDetails: %s | %s", args=(e, parsed_file_name)
             )
             print('<------------------------------------------------------------>')
+            return None
+
+    def added_anime_info(self) -> bool:
+        """
+        Added anime info for the the current torrent, parse results are memoized by release name in `parse_cache`
+        :return: true if successful otherwise false if the release is a Batch
+        """
+        anime_info = TorrentInfo.parse_cache.get(self.name)
+        if anime_info is LruCache.MISSING:
+            anime_info = self.__parse_anime_info()
+            TorrentInfo.parse_cache.put(self.name, anime_info)
+        if anime_info is None:
             return False
+        self.anime_info = TorrentAnimeInfo(**anime_info)
+        return True
 
     def __iter__(self):
         yield 'id', self.id
@@ -135,10 +203,9 @@ class NyaaModelHelper:
         except Exception as e:
             print()
             EventLogHelper.log_info(
-                f"Error converting dictionary to data class\n"
-                f"Details: {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
+                "Error converting dictionary to data class\n"
+                "Details: %s",
+                args=(e,)
             )
             print('<------------------------------------------------------------>')
         return parsed_object
@@ -150,10 +217,9 @@ class NyaaModelHelper:
         except Exception as e:
             print()
             EventLogHelper.log_info(
-                f"Error converting data class to dictionary\n"
-                f"Details: {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
+                "Error converting data class to dictionary\n"
+                "Details: %s",
+                args=(e,)
             )
             print('<------------------------------------------------------------>')
         return parsed_dictionary
@@ -0,0 +1,113 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.util import DocumentStorage, create_document_storage, TINYDB_BACKEND
+
+SEARCH_STATE_DATABASE = 'database/search_state'
+
+
+@dataclass()
+class ShowSearchState:
+    mediaId: int
+    query: str
+    newest_id: int = 0
+    newest_date: Optional[str] = None
+    resolved_episodes: List[str] = field(default_factory=list)
+    last_backlog: Optional[int] = None
+    episodes_present: List[int] = field(default_factory=list)
+    last_searched_at: Optional[float] = None
+
+    def is_page_seen(self, search_results: List[Dict]) -> bool:
+        """
+        Checks if every result on a page is older than or the same as the newest result of the previous search
+        :param search_results: results of a single search page
+        :return: True if the page holds no new uploads
+        """
+        if self.newest_id < 1:
+            return False
+        for search_result in search_results:
+            result_id = search_result.get('id')
+            if result_id is None or int(result_id) > self.newest_id:
+                return False
+        return True
+
+    def advance(self, search_results: List[Dict]) -> None:
+        """
+        Moves the high-water mark to the newest result found
+        :param search_results: every result of the search
+        """
+        for search_result in search_results:
+            result_id = search_result.get('id')
+            if result_id is not None and int(result_id) > self.newest_id:
+                self.newest_id = int(result_id)
+                self.newest_date = search_result.get('date')
+
+    def is_up_to_date(self, backlog: Optional[int], aired_episode_count: Optional[int], now: float,
+                      max_age: float) -> bool:
+        """
+        Checks if searching again can't find anything new, which is the case when the backlog hasn't moved since
+        the previous search and every aired episode was already in plex or found by that search
+        :param backlog: current episode backlog of the media entry
+        :param aired_episode_count: number of episodes aired so far, None if unknown
+        :param now: current unix time
+        :param max_age: seconds after which the show is searched for regardless
+        :return: True if the search can be skipped
+        """
+        if self.last_searched_at is None or now - self.last_searched_at >= max_age:
+            return False
+        if backlog is None or backlog != self.last_backlog or aired_episode_count is None:
+            return False
+        episodes_present = set(self.episodes_present)
+        return all(episode in episodes_present for episode in range(1, aired_episode_count + 1))
+
+    def __iter__(self):
+        yield 'mediaId', self.mediaId
+        yield 'query', self.query
+        yield 'newest_id', self.newest_id
+        yield 'newest_date', self.newest_date
+        yield 'resolved_episodes', self.resolved_episodes
+        yield 'last_backlog', self.last_backlog
+        yield 'episodes_present', self.episodes_present
+        yield 'last_searched_at', self.last_searched_at
+
+
+class ShowSearchStateStore:
+    """
+    Persists the search state of each show between runs, so paged searches can stop
+    as soon as they reach results which were already seen by a previous run
+    """
+
+    def __init__(
+            self,
+            backend: str = TINYDB_BACKEND,
+            storage: Optional[DocumentStorage] = None,
+            database_name: str = SEARCH_STATE_DATABASE
+    ) -> None:
+        super().__init__()
+        self.storage: DocumentStorage = storage if storage is not None else create_document_storage(
+            backend, database_name, 'mediaId', ['mediaId']
+        )
+
+    def get(self, media_id: int, query: str) -> ShowSearchState:
+        """
+        :param media_id: anilist media id of the show
+        :param query: search terms of the show, a previous state for other search terms is discarded
+        :return: the stored state or a new state
+        """
+        documents = self.storage.find_by('mediaId', media_id)
+        if documents and documents[0].get('query') == query:
+            document = documents[0]
+            return ShowSearchState(
+                mediaId=media_id,
+                query=query,
+                newest_id=int(document.get('newest_id') or 0),
+                newest_date=document.get('newest_date'),
+                resolved_episodes=list(document.get('resolved_episodes') or list()),
+                last_backlog=document.get('last_backlog'),
+                episodes_present=list(document.get('episodes_present') or list()),
+                last_searched_at=document.get('last_searched_at')
+            )
+        return ShowSearchState(media_id, query)
+
+    def save(self, search_state: ShowSearchState) -> None:
+        self.storage.upsert(dict(search_state))
@@ -1,2 +1,3 @@
 from .core import PlexController
+from .data import EpisodeIndex, EpisodeIndexCache
 from plexapi.video import Show, Episode, Season
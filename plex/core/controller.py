@@ -1,35 +1,99 @@
-import inspect
 import json
 import logging
-from difflib import SequenceMatcher
+from threading import Lock
 from typing import List, Optional
-from unidecode import unidecode
 from plexapi.library import ShowSection
 from plexapi.server import PlexServer
 from plexapi.video import Show
 
 from anilist import MediaEntry
-from app import StorageUtil, EventLogHelper
+from app import StorageUtil, EventLogHelper, TitleMatcher, Resilience
 
-from ..data import SearchResult
+from ..data import SearchResult, PlexLibrarySnapshot, EpisodeIndexCache
 
 
 class PlexController:
+    __host = 'plex'
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            resilience: Optional[Resilience] = None,
+            section_library_name: Optional[str] = None,
+            episode_cache: Optional[EpisodeIndexCache] = None,
+            plex: Optional[PlexServer] = None
+    ) -> None:
+        """
+        :param section_library_name: show section to use instead of the one in plex.json
+        :param episode_cache: episode indexes shared with other controllers of the same server
+        :param plex: connection shared with other controllers of the same server
+        """
         super().__init__()
+        self.__anime_section: Optional[ShowSection] = None
+        self.__snapshot: Optional[PlexLibrarySnapshot] = None
+        self.__section_lock = Lock()
+        self.resilience: Resilience = resilience if resilience is not None else Resilience()
+        self.episode_cache: EpisodeIndexCache = episode_cache if episode_cache is not None else EpisodeIndexCache(
+            lambda show: self.resilience.call(self.__host, show.episodes)
+        )
+        self.plex: Optional[PlexServer] = plex
         try:
             self.config = json.loads(StorageUtil.read_file('config', 'plex.json'))
-            auth = json.loads(StorageUtil.read_file("auth", "credentials.json"))
-            self.plex = PlexServer(auth["url"], auth["token"])
+            if section_library_name is not None:
+                self.config['section_library_name'] = section_library_name
+            if self.plex is None:
+                auth = json.loads(StorageUtil.read_file("auth", "credentials.json"))
+                self.plex = PlexServer(auth["url"], auth["token"])
         except Exception as e:
             EventLogHelper.log_error(
-                f"Encountered exception while initializing controller -> {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
+                "Encountered exception while initializing controller -> %s",
+                log_level=logging.CRITICAL,
+                args=(e,)
             )
 
+    def is_snapshot_enabled(self) -> bool:
+        return self.config.get('library_snapshot', True)
+
+    def get_match_threshold(self) -> float:
+        return self.config.get('match_threshold', .85)
+
+    def get_anime_section(self) -> Optional[ShowSection]:
+        """
+        Fetches the configured show section once and reuses it for the rest of the run
+        :return: plex show section
+        """
+        with self.__section_lock:
+            if self.__anime_section is None:
+                self.__anime_section = self.resilience.call(
+                    self.__host, self.plex.library.section, self.config['section_library_name']
+                )
+            return self.__anime_section
+
+    def get_library_snapshot(self) -> Optional[PlexLibrarySnapshot]:
+        """
+        Loads every show in the configured section with a single request the first time it is called
+        :return: snapshot of the show section
+        """
+        anime_section = self.get_anime_section()
+        with self.__section_lock:
+            if self.__snapshot is None and anime_section is not None:
+                self.__snapshot = self.resilience.call(self.__host, PlexLibrarySnapshot.load, anime_section)
+                EventLogHelper.log_info(
+                    "Loaded library snapshot of `%s` with %s shows", args=(anime_section.title, len(self.__snapshot))
+                )
+            return self.__snapshot
+
+    def refresh(self) -> None:
+        """
+        Drops the library snapshot and the episode indexes so that the next lookup sees the current library
+        """
+        with self.__section_lock:
+            self.__snapshot = None
+        self.episode_cache.clear()
+
+    def __count_episodes(self, show: Show) -> int:
+        leaf_count = PlexLibrarySnapshot.leaf_count(show)
+        return leaf_count if leaf_count is not None else len(self.episode_cache.get(show))
+
     def find_all_by_title(self, media_entry: MediaEntry, add_missing) -> List[Optional[Show]]:
         """
         Search for plex shows within a configuration given library name
@@ -39,32 +103,37 @@ class PlexController:
         """
         all_shows = list()
         try:
-            anime_section: Optional[ShowSection] = self.plex.library.section(self.config['section_library_name'])
+            anime_section: Optional[ShowSection] = self.get_anime_section()
             if anime_section is not None:
-                search_result: SearchResult = self.__search_for_shows(anime_section, media_entry)
+                if self.is_snapshot_enabled():
+                    search_result: SearchResult = self.get_library_snapshot().search(
+                        media_entry.generate_search_terms(), self.get_match_threshold()
+                    )
+                    if search_result.search_results:
+                        EventLogHelper.log_info(
+                            "Search term match found `%s` -> `%s` | scores: %s",
+                            args=(search_result.search_match_term, search_result.search_results,
+                                  search_result.search_match_scores)
+                        )
+                else:
+                    search_result: SearchResult = self.__search_for_shows(anime_section, media_entry)
                 if search_result.search_results:
                     for show in search_result.search_results:
-                        show_episodes_count = len(show.episodes())
+                        show_episodes_count = self.__count_episodes(show)
                         episodes = media_entry.media.episodes
-                        if show_episodes_count >= episodes:
+                        if episodes is not None and show_episodes_count >= episodes:
                             continue
                         all_shows.append(show)
                 else:
                     print()
                     search_term = media_entry.media.title.userPreferred
                     EventLogHelper.log_warning(
-                        f"Search term not found `{search_term}`, adding to missing shows list",
-                        self.__class__.__name__,
-                        inspect.currentframe().f_code.co_name
+                        "Search term not found `%s`, adding to missing shows list", args=(search_term,)
                     )
                     print()
                     add_missing()
         except Exception as e:
-            EventLogHelper.log_info(
-                f"{e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
-            )
+            EventLogHelper.log_info("%s", args=(e,))
         return all_shows
 
     def get_seasons_for_show(self, show: Optional[Show]):
@@ -74,23 +143,17 @@ class PlexController:
         pass
 
     @staticmethod
-    def __matches_search_term(show_title: Optional[str], search_term: Optional[str]) -> bool:
-        if show_title and search_term:
-            show_title_uni = unidecode(show_title).lower()
-            search_term_uni = unidecode(search_term).lower()
-            match_ratio = SequenceMatcher(a=show_title_uni, b=search_term_uni).ratio()
-            return match_ratio >= .98
-        return False
+    def __matches_search_term(show_title: Optional[str], search_term: Optional[str], threshold: float = .85) -> bool:
+        return TitleMatcher.similarity(show_title, search_term) >= threshold
 
-    @staticmethod
-    def __search_for_shows(anime_section: ShowSection, media_entry: MediaEntry) -> SearchResult:
+    def __search_for_shows(self, anime_section: ShowSection, media_entry: MediaEntry) -> SearchResult:
         search_results: List[Show] = list()
         search_match_term_match: str = ""
 
         search_terms: List[str] = media_entry.generate_search_terms()
 
         for search_term in search_terms:
-            search_results = anime_section.search(title=search_term)
+            search_results = self.resilience.call(self.__host, anime_section.search, title=search_term)
             if search_results:
                 search_match_term_match = search_term
                 break
@@ -98,15 +161,19 @@ class PlexController:
         filtered_search_results: List[Show] = list(
             filter(
                 lambda show: PlexController.__matches_search_term(
-                    show.title, search_match_term_match
+                    show.title, search_match_term_match, self.get_match_threshold()
                 ), search_results)
         )
+        if len(filtered_search_results) > 1:
+            # only the closest title is kept, sequels and specials with similar titles are different shows
+            title_matcher = TitleMatcher()
+            for show in filtered_search_results:
+                title_matcher.add(show, [show.title])
+            filtered_search_results = [title_matcher.best_match([search_match_term_match]).item]
 
         if filtered_search_results:
             EventLogHelper.log_info(
-                f"Search term match found `{search_match_term_match}` -> `{filtered_search_results}`",
-                "PlexController",
-                inspect.currentframe().f_code.co_name
+                "Search term match found `%s` -> `%s`", args=(search_match_term_match, filtered_search_results)
             )
 
         return SearchResult(
@@ -1 +1,3 @@
 from .model import SearchResult
+from .library import PlexLibrarySnapshot
+from .episode import EpisodeIndex, EpisodeIndexCache
@@ -0,0 +1,87 @@
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from plexapi.video import Show
+
+
+@dataclass()
+class EpisodeIndex:
+    rating_key: int
+    episode_numbers: Set[int] = field(default_factory=set)
+    season_episodes: Set[Tuple[int, int]] = field(default_factory=set)
+    seasons: Set[int] = field(default_factory=set)
+
+    def contains(self, episode_number: int, season_number: Optional[int] = None) -> bool:
+        """
+        Checks if the episode is present in plex
+        :param episode_number: episode index to look for
+        :param season_number: optional season the episode should belong to
+        :return: True if the episode exists otherwise False
+        """
+        if season_number is None:
+            return episode_number in self.episode_numbers
+        return (season_number, episode_number) in self.season_episodes
+
+    def __len__(self) -> int:
+        return len(self.season_episodes)
+
+
+class EpisodeIndexCache:
+    """
+    Per-run cache of the episodes present in plex for each show keyed by rating key,
+    each show's episode list is fetched from plex at most once
+    """
+
+    def __init__(self, fetch_episodes: Optional[Callable[[Show], List]] = None) -> None:
+        super().__init__()
+        self.fetch_episodes: Callable[[Show], List] = fetch_episodes if fetch_episodes is not None \
+            else lambda show: show.episodes()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.__lock = Lock()
+        self.__indexes: Dict[int, EpisodeIndex] = dict()
+
+    def __build_index(self, show: Show) -> EpisodeIndex:
+        episode_index = EpisodeIndex(int(show.ratingKey))
+        for episode in self.fetch_episodes(show):
+            if episode.index is None:
+                continue
+            season_number = int(episode.parentIndex) if episode.parentIndex is not None else 1
+            episode_index.episode_numbers.add(int(episode.index))
+            episode_index.season_episodes.add((season_number, int(episode.index)))
+            episode_index.seasons.add(season_number)
+        return episode_index
+
+    def get(self, show: Show) -> EpisodeIndex:
+        """
+        Returns the episode index for the show, fetching the episodes from plex on the first request
+        :param show: plex show
+        :return: index of the episodes present in plex
+        """
+        rating_key = int(show.ratingKey)
+        with self.__lock:
+            episode_index = self.__indexes.get(rating_key)
+            if episode_index is not None:
+                self.hits += 1
+                return episode_index
+            self.misses += 1
+        episode_index = self.__build_index(show)
+        with self.__lock:
+            return self.__indexes.setdefault(rating_key, episode_index)
+
+    def invalidate(self, show: Show) -> None:
+        with self.__lock:
+            self.__indexes.pop(int(show.ratingKey), None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__indexes.clear()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"shows: {len(self.__indexes)} | hits: {self.hits} | misses: {self.misses} " \
+               f"| hit rate: {self.hit_rate():.2%}"
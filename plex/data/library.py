@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional, Iterable
+
+from plexapi.library import ShowSection
+from plexapi.video import Show
+
+from app import TitleMatcher
+from .model import SearchResult
+
+
+class PlexLibrarySnapshot:
+    """
+    In-memory copy of a plex show section, loaded with a single request per run and indexed by normalized
+    title so that search terms can be resolved locally instead of issuing a search request for each term
+    """
+
+    def __init__(self, shows: List[Show]) -> None:
+        super().__init__()
+        self.shows: List[Show] = shows
+        self.title_matcher = TitleMatcher()
+        self.__rating_key_index: Dict[int, Show] = dict()
+        for show in shows:
+            self.__rating_key_index[int(show.ratingKey)] = show
+            self.title_matcher.add(show, self.titles_of(show))
+
+    @staticmethod
+    def load(anime_section: ShowSection) -> 'PlexLibrarySnapshot':
+        """
+        Fetches every show in the section, the listing already includes titles, rating keys and leaf counts
+        :param anime_section: plex show section configured in plex.json
+        :return: snapshot of the section
+        """
+        return PlexLibrarySnapshot(anime_section.all())
+
+    @staticmethod
+    def titles_of(show: Show) -> Iterable[str]:
+        for title in (show.title, getattr(show, 'originalTitle', None)):
+            if title:
+                yield title
+
+    @staticmethod
+    def leaf_count(show: Show) -> Optional[int]:
+        leaf_count = getattr(show, 'leafCount', None)
+        return int(leaf_count) if leaf_count is not None else None
+
+    def get(self, rating_key: int) -> Optional[Show]:
+        return self.__rating_key_index.get(int(rating_key))
+
+    def search(self, search_terms: List[str], threshold: float) -> SearchResult:
+        """
+        Matches all search terms against the snapshot in one pass and keeps only the best scoring show,
+        exact matches of the normalized title take precedence over fuzzy matches scoring at least `threshold`
+        :param search_terms: search terms generated from a media entry
+        :param threshold: minimum similarity score of a fuzzy match
+        :return: the matching show and the search term it matched
+        """
+        title_match = self.title_matcher.best_match(search_terms, threshold)
+        if title_match is None:
+            return SearchResult(list(), "")
+        return SearchResult([title_match.item], title_match.search_term, [title_match.score])
+
+    def __len__(self) -> int:
+        return len(self.shows)
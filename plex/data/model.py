@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 from plexapi.video import Show
 
@@ -8,3 +8,4 @@ from plexapi.video import Show
 class SearchResult:
     search_results: List[Show]
     search_match_term: str
+    search_match_scores: Optional[List[float]] = None
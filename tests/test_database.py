@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+import app  # noqa: F401, app has to be imported before the other packages
+from app.util.database import DocumentStorage, TinyDocumentStorage
+
+
+class TinyDocumentStorageTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = TinyDocumentStorage(os.path.join(self.directory.name, 'anilist.db'), 'id', ['id'])
+
+    def tearDown(self) -> None:
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_bulk_write_replaces_the_whole_document(self):
+        self.storage.bulk_write([{'id': 1, 'status': 'CURRENT', 'notes': 'dropped field'}], list())
+        self.storage.bulk_write([{'id': 1, 'status': 'CURRENT'}], list())
+        self.assertEqual([{'id': 1, 'status': 'CURRENT'}], self.storage.all())
+
+    def test_upsert_replaces_the_whole_document(self):
+        self.storage.upsert({'id': 1, 'status': 'CURRENT', 'notes': 'dropped field'})
+        self.storage.upsert({'id': 1, 'status': 'PAUSED'})
+        self.storage.upsert({'id': 2, 'status': 'CURRENT'})
+        self.assertEqual([{'id': 1, 'status': 'PAUSED'}, {'id': 2, 'status': 'CURRENT'}], self.storage.all())
+
+    def test_storage_interface_cannot_be_instantiated(self):
+        with self.assertRaises(TypeError):
+            # noinspection PyAbstractClass
+            DocumentStorage('id', ['id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
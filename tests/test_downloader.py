@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from typing import Iterator
+
+from requests.exceptions import ChunkedEncodingError
+
+import app  # noqa: F401, app has to be imported before the other packages
+from app import RateLimiter, Resilience
+from nyaa import TorrentDownloader
+
+
+class _AnimeInfo:
+    file_name = '[HorribleSubs] Show - 01 [720p]'
+
+
+class _Torrent:
+    """
+    Stands in for a torrent info, the downloader only reads these fields
+    """
+    name = '[HorribleSubs] Show - 01 [720p].mkv'
+    download_url = 'https://nyaa.si/download/1150000.torrent'
+    magnet = None
+    hash = None
+    anime_info = _AnimeInfo()
+
+
+class _BrokenResponse:
+    """
+    Response whose connection drops after the first chunk
+    """
+    headers = dict()
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        yield b'd8:announce'
+        raise ChunkedEncodingError('Connection broken')
+
+    def close(self) -> None:
+        pass
+
+
+class _BrokenSession:
+
+    def get(self, **kwargs) -> _BrokenResponse:
+        return _BrokenResponse()
+
+
+class TorrentDownloaderTest(unittest.TestCase):
+
+    def test_interrupted_download_leaves_no_partial_file(self):
+        downloader = TorrentDownloader(RateLimiter(0), Resilience(max_attempts=1))
+        downloader.session = _BrokenSession()
+        with tempfile.TemporaryDirectory() as directory:
+            # noinspection PyTypeChecker
+            self.assertFalse(downloader.download(_Torrent(), directory))
+            self.assertEqual([], os.listdir(directory))
+        self.assertEqual(1, downloader.failed_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import unittest
+from typing import List
+
+import app  # noqa: F401, app has to be imported before the other packages
+from app import RateLimiter
+from nyaa import NyaaController, NyaaFeedReader, AppConfig, FeedState
+
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'nyaa', 'fixtures', 'anime_english_feed.xml'
+)
+
+
+class _WatchedShow:
+    """
+    Stands in for a media entry, the feed matcher only reads the media id and the search terms
+    """
+
+    def __init__(self, media_id: int, search_terms: List[str]) -> None:
+        self.mediaId = media_id
+        self.search_terms = search_terms
+
+    def generate_search_terms(self) -> List[str]:
+        return self.search_terms
+
+
+class NyaaFeedTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        reader = NyaaFeedReader(RateLimiter(0))
+        self.feed_page = reader.fetch(f"file://{os.path.abspath(FIXTURE_PATH)}")
+        self.config = AppConfig(
+            torrent_monitor_directory='',
+            torrent_download_directory='',
+            torrent_preferred_quality='[720p]',
+            torrent_preferred_group='[HorribleSubs]',
+            torrent_queued_postfix='',
+            torrent_keep_file_after_queuing=False
+        )
+
+    def test_parses_fixture_items_newest_first(self):
+        item_ids = [int(item['id']) for item in self.feed_page.items]
+        self.assertEqual(6, len(item_ids))
+        self.assertEqual(sorted(item_ids, reverse=True), item_ids)
+        self.assertEqual(item_ids[0], self.feed_page.newest_id)
+        self.assertEqual(item_ids[-1], self.feed_page.oldest_id)
+        first_item = self.feed_page.items[0]
+        self.assertEqual('[HorribleSubs] Boku no Hero Academia - 64 [720p].mkv', first_item['name'])
+        self.assertEqual(f"magnet:?xt=urn:btih:{first_item['hash']}", first_item['magnet'])
+
+    def test_items_after_mark(self):
+        second_id = int(self.feed_page.items[1]['id'])
+        feed_state = FeedState('fixture', second_id, None)
+        self.assertEqual([self.feed_page.items[0]], self.feed_page.items_after(feed_state))
+        self.assertFalse(self.feed_page.has_gap(feed_state))
+        self.assertTrue(self.feed_page.has_gap(FeedState('fixture', self.feed_page.oldest_id - 10, None)))
+        self.assertFalse(self.feed_page.has_gap(FeedState('fixture', 0, None)))
+
+    def test_matches_preferred_releases_to_watched_shows(self):
+        watched_shows = [
+            _WatchedShow(1, ['My Hero Academia', 'Boku no Hero Academia']),
+            _WatchedShow(2, ['Demon Slayer', 'Kimetsu no Yaiba']),
+            _WatchedShow(3, ['Attack on Titan', 'Shingeki no Kyojin'])
+        ]
+        releases = NyaaController().match_feed_releases(self.feed_page.items, watched_shows, self.config)
+        self.assertEqual({1, 2}, set(releases.keys()))
+        self.assertEqual(['[HorribleSubs] Boku no Hero Academia - 64 [720p].mkv'], [
+            torrent_info.name for torrent_info in releases[1]
+        ])
+        self.assertEqual(['[HorribleSubs] Kimetsu no Yaiba - 10 [720p].mkv'], [
+            torrent_info.name for torrent_info in releases[2]
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
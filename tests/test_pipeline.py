@@ -0,0 +1,30 @@
+import unittest
+from time import sleep
+
+import app  # noqa: F401, app has to be imported before the other packages
+from app.core.pipeline import Pipeline, PipelineStage
+
+
+class PipelineTest(unittest.TestCase):
+
+    @staticmethod
+    def __slow_double(item: int):
+        sleep(.05)
+        yield item * 2
+
+    def test_parallel_stage_reports_speedup(self):
+        collected = list()
+        parallel_stage = PipelineStage('nyaa', self.__slow_double, 4)
+        pipeline = Pipeline([parallel_stage, PipelineStage('queue', collected.append)])
+        pipeline.run(range(8))
+
+        self.assertEqual(list(range(0, 16, 2)), sorted(collected))
+        report = parallel_stage.report()
+        self.assertEqual(8, report.task_count)
+        self.assertGreaterEqual(report.busy_time, .4)
+        self.assertLess(report.wall_time, report.busy_time)
+        self.assertGreater(report.speedup(), 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import socket
+import unittest
+
+import app  # noqa: F401, app has to be imported before the other packages
+from app import RateLimiter, Resilience
+from benchmark.fake_transmission import FakeTransmissionServer, generate_torrents
+from transmission import TransmissionController
+
+
+class QueueTorrentsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeTransmissionServer().start()
+        host, port = self.server.server_address
+        self.controller = TransmissionController(
+            rate_limiter=RateLimiter(0),
+            resilience=Resilience(max_attempts=1),
+            credentials={'host': host, 'port': port}
+        )
+        self.torrents = generate_torrents(5)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_existing_torrents_are_reported_as_duplicates(self):
+        for torrent in self.torrents[:2]:
+            self.server.torrents[torrent.hash] = torrent.magnet
+        # noinspection PyTypeChecker
+        queue_results = self.controller.queue_torrents(self.torrents + [self.torrents[2]])
+        self.assertEqual([True] * 6, [result.queued for result in queue_results])
+        self.assertEqual([True, True, False, False, False, True], [result.duplicate for result in queue_results])
+        self.assertEqual({'torrent-get': 1, 'torrent-add': 3}, {
+            method: count for method, count in self.server.request_counts.items() if method != '409'
+        })
+
+    def test_rejected_torrent_fails_without_stopping_the_batch(self):
+        self.server.rejected.add(self.torrents[3].download_url)
+        # noinspection PyTypeChecker
+        queue_results = self.controller.queue_torrents(self.torrents)
+        self.assertEqual([True, True, True, False, True], [result.queued for result in queue_results])
+        self.assertIn('invalid or corrupt torrent file', queue_results[3].error)
+        self.assertEqual([None] * 4, [result.error for index, result in enumerate(queue_results) if index != 3])
+
+    def test_unreachable_transmission_fails_every_torrent(self):
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            port = unused.getsockname()[1]
+        controller = TransmissionController(
+            rate_limiter=RateLimiter(0),
+            resilience=Resilience(max_attempts=1),
+            credentials={'host': '127.0.0.1', 'port': port}
+        )
+        # noinspection PyTypeChecker
+        queue_results = controller.queue_torrents(self.torrents)
+        self.assertEqual([False] * 5, [result.queued for result in queue_results])
+        self.assertTrue(all(result.error for result in queue_results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,2 @@
-from .core import TransmissionController
+from .core import TransmissionController, TransmissionRpcSession, TransmissionRpcError
+from .data import QueueResult
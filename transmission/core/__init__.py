@@ -1 +1,2 @@
 from .controller import TransmissionController
+from .rpc import TransmissionRpcSession, TransmissionRpcError
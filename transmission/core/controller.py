@@ -1,40 +1,50 @@
-import inspect
+import base64
 import json
 import logging
+import os
 
-from time import sleep
+from typing import Optional, Dict, List, Any
 
-# noinspection PyPackageRequirements
-from clutch.core import Client
-from app import StorageUtil, EventLogHelper
+from app import StorageUtil, EventLogHelper, RateLimiter, Resilience
+from nyaa import TorrentInfo, TorrentDownloader
+from .rpc import TransmissionRpcSession
+from ..data import QueueResult
 
 
 class TransmissionController:
+    __host = 'transmission'
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            resilience: Optional[Resilience] = None,
+            credentials: Optional[Dict[str, Any]] = None
+    ) -> None:
         super().__init__()
+        self.rate_limiter: RateLimiter = rate_limiter if rate_limiter is not None else RateLimiter(.5)
+        self.resilience: Resilience = resilience if resilience is not None else Resilience()
         try:
-            __config = json.loads(
-                StorageUtil.read_file('auth', 'credentials.json')
-            )
-            if __config is not None:
-                credentials = __config["transmission"]
-                self.client = Client(
-                    host=credentials["host"],
-                    port=credentials["port"],
-                    username=credentials["username"],
-                    password=credentials["password"]
+            if credentials is None:
+                __config = json.loads(
+                    StorageUtil.read_file('auth', 'credentials.json')
                 )
-            else:
-                self.client = Client()
+                credentials = __config.get("transmission", dict()) if __config is not None else dict()
+            self.rpc = TransmissionRpcSession(
+                TransmissionRpcSession.create_url(credentials),
+                credentials.get("username"),
+                credentials.get("password")
+            )
         except Exception as e:
             EventLogHelper.log_error(
-                f"Encountered exception while initializing controller -> {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name,
-                logging.CRITICAL
+                "Encountered exception while initializing controller -> %s",
+                log_level=logging.CRITICAL,
+                args=(e,)
             )
 
+    def __add(self, **kwargs) -> Dict[str, Any]:
+        self.rate_limiter.acquire()
+        return self.rpc.add(**kwargs)
+
     def add_torrent_magnet(self, filename: str) -> bool:
         """
         adds a magnet link instead of the actual torrent file contents
@@ -42,20 +52,11 @@ class TransmissionController:
         :return: True if the operation was a success otherwise False
         """
         try:
-            torrent = self.client.torrent.add(filename=filename)
-            sleep(.5)
-            EventLogHelper.log_info(
-                f"Added torrent file url to torrent client -> {torrent} | {filename}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
-            )
+            torrent = self.resilience.call(self.__host, self.__add, filename=filename)
+            EventLogHelper.log_info("Added torrent file url to torrent client -> %s | %s", args=(torrent, filename))
             return True
         except Exception as e:
-            EventLogHelper.log_warning(
-                f"Unable to add torrent to transmission -> {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
-            )
+            EventLogHelper.log_warning("Unable to add torrent to transmission -> %s", args=(e,))
             return False
 
     def add_torrent(self, file_path: str, file_name: str):
@@ -66,19 +67,53 @@ class TransmissionController:
         :return: True if the operation was a success otherwise False
         """
         try:
-            file_contents = StorageUtil.read_file(file_path, file_name)
-            torrent = self.client.torrent.add(metainfo=file_contents)
-            sleep(1.5)
-            EventLogHelper.log_info(
-                f"Added torrent file to download client -> {torrent} | {file_path}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
-            )
+            with open(os.path.join(StorageUtil.create_base_path(file_path), file_name), 'rb') as reader:
+                file_contents = base64.b64encode(reader.read()).decode('ascii')
+            torrent = self.resilience.call(self.__host, self.__add, metainfo=file_contents)
+            EventLogHelper.log_info("Added torrent file to download client -> %s | %s", args=(torrent, file_path))
             return True
         except Exception as e:
-            EventLogHelper.log_warning(
-                f"Unable to add torrent to transmission -> {e}",
-                self.__class__.__name__,
-                inspect.currentframe().f_code.co_name
-            )
+            EventLogHelper.log_warning("Unable to add torrent to transmission -> %s", args=(e,))
             return False
+
+    def queue_torrents(self, torrent_infos: List[TorrentInfo]) -> List[QueueResult]:
+        """
+        Adds a batch of torrents with a single lookup of the torrents transmission already has,
+        every request of the batch reuses the same connection and session id and the whole batch takes
+        a single token of the rate limiter
+        :param torrent_infos: torrents to hand over to transmission
+        :return: result for each torrent in the same order
+        """
+        if not torrent_infos:
+            return list()
+        try:
+            self.rate_limiter.acquire()
+            existing_hashes = set(self.resilience.call(self.__host, self.rpc.get_hashes))
+        except Exception as e:
+            EventLogHelper.log_warning("Unable to fetch torrents from transmission -> %s", args=(e,))
+            return [QueueResult(torrent_info, False, error=f"{e}") for torrent_info in torrent_infos]
+
+        queue_results: List[QueueResult] = list()
+        for torrent_info in torrent_infos:
+            info_hash = TorrentDownloader.expected_info_hash(torrent_info)
+            if info_hash is not None and info_hash in existing_hashes:
+                queue_results.append(QueueResult(torrent_info, True, duplicate=True))
+                continue
+            try:
+                # a batch takes a single token, the rpc is local and its session is reused for every add
+                arguments = self.resilience.call(
+                    self.__host, self.rpc.add, filename=torrent_info.download_url or torrent_info.magnet
+                )
+                queue_results.append(QueueResult(torrent_info, True, duplicate='torrent-duplicate' in arguments))
+                if info_hash is not None:
+                    existing_hashes.add(info_hash)
+            except Exception as e:
+                queue_results.append(QueueResult(torrent_info, False, error=f"{e}"))
+
+        EventLogHelper.log_info(
+            "Queued %s of %s torrents | already in transmission: %s | failed: %s",
+            args=(sum(1 for result in queue_results if result.queued and not result.duplicate), len(queue_results),
+                  sum(1 for result in queue_results if result.duplicate),
+                  sum(1 for result in queue_results if not result.queued))
+        )
+        return queue_results
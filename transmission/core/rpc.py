@@ -0,0 +1,85 @@
+import json
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from requests import Response, Session
+
+
+class TransmissionRpcError(RuntimeError):
+    """
+    Raised when transmission answers a request with a result other than `success`
+    """
+
+
+class TransmissionRpcSession:
+    """
+    Keeps a single keep-alive connection and the `X-Transmission-Session-Id` token for every rpc call,
+    the token is only refreshed when transmission answers with 409
+    """
+    __session_id_header = 'X-Transmission-Session-Id'
+
+    def __init__(
+            self,
+            url: str,
+            username: Optional[str] = None,
+            password: Optional[str] = None,
+            timeout: float = 30.0
+    ) -> None:
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+        self.request_count: int = 0
+        self.session = Session()
+        if username:
+            self.session.auth = (username, password)
+        self.__lock = Lock()
+
+    @staticmethod
+    def create_url(credentials: Dict[str, Any]) -> str:
+        """
+        Builds the rpc url from the transmission section of credentials.json
+        :param credentials: host, port and optionally path of the rpc endpoint
+        :return: rpc url
+        """
+        host = str(credentials.get('host', 'localhost'))
+        if not host.startswith('http'):
+            host = f"http://{host}"
+        return f"{host}:{credentials.get('port', 9091)}{credentials.get('path', '/transmission/rpc')}"
+
+    def __post(self, payload: str) -> Response:
+        self.request_count += 1
+        return self.session.post(self.url, data=payload, timeout=self.timeout)
+
+    def call(self, method: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Sends a single rpc request over the shared connection
+        :param method: rpc method e.g. `torrent-add`
+        :param arguments: arguments of the method
+        :return: the `arguments` of the response
+        """
+        payload = json.dumps({'method': method, 'arguments': arguments or dict()})
+        with self.__lock:
+            response = self.__post(payload)
+            if response.status_code == 409:
+                self.session.headers[self.__session_id_header] = response.headers[self.__session_id_header]
+                response = self.__post(payload)
+        response.raise_for_status()
+        body = response.json()
+        if body.get('result') != 'success':
+            raise TransmissionRpcError(f"`{method}` failed -> {body.get('result')}")
+        return body.get('arguments', dict())
+
+    def get_hashes(self) -> List[str]:
+        """
+        :return: info hashes of every torrent known to transmission in lowercase
+        """
+        torrents = self.call('torrent-get', {'fields': ['hashString']}).get('torrents', list())
+        return [torrent['hashString'].lower() for torrent in torrents if torrent.get('hashString')]
+
+    def add(self, filename: Optional[str] = None, metainfo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Adds a torrent from a magnet link or url, or from base64 encoded .torrent contents
+        :return: the `torrent-added` or `torrent-duplicate` entry of the response
+        """
+        arguments = {'filename': filename} if filename is not None else {'metainfo': metainfo}
+        return self.call('torrent-add', arguments)
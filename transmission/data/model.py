@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass()
+class QueueResult:
+    torrent_info: Any
+    queued: bool
+    duplicate: bool = False
+    error: Optional[str] = None
+
+    def __iter__(self):
+        yield 'queued', self.queued
+        yield 'duplicate', self.duplicate
+        yield 'error', self.error